@@ -0,0 +1,306 @@
+"""
+Local HTTP/JSON API for Manager Hub & TAG Training
+
+Lets other tools (HR spreadsheet jobs, scripts) read team data without
+parsing the files under data/ themselves. Every team is served from a
+read-only DataStore kept in a shared pool, so requests never load files
+and never write to them; the app keeps writing as usual and the API picks
+up its changes.
+
+Each request compares the team's files with the ones its pooled store was
+loaded from (a few stat calls). When they have changed, one request
+reloads the store while the others keep answering from the previous one.
+List and record responses carry an ETag (also sent as X-Data-Version)
+that changes whenever the collection does, so clients can poll with
+If-None-Match and get an empty 304 until something changes.
+
+Endpoints:
+    GET /api/teams
+    GET /api/teams/<team_id>/<collection>?member_id=3&status=Booked&limit=50&offset=0
+    GET /api/teams/<team_id>/<collection>/<record_id>
+
+List filters are the same as DataStore.query(): field=value (repeat a
+parameter to match any of several values), field_from= and field_before=
+for ranges, plus order_by, descending=true, limit (max 1000), offset and
+archive=true to include archived records.
+
+Usage:
+    python api_server.py                       # http://127.0.0.1:8765
+    python api_server.py --port 9000 --data-dir data
+"""
+
+import argparse
+import hashlib
+import threading
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from codec import dumps
+from data_utils import ARCHIVE_DIR, ARCHIVE_MANIFEST, COLLECTIONS, DataStore
+from records import RECORD_TYPES
+from roster import ROSTER_FILE, Roster
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+# Query parameters that are not record filters
+PAGING_PARAMS = ('limit', 'offset', 'order_by', 'descending', 'archive')
+
+PooledStore = namedtuple('PooledStore', 'stamps store')
+
+
+def file_stamp(path):
+    """(size, mtime_ns) of a file, or None if it does not exist."""
+    try:
+        stat = Path(path).stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def team_stamps(team_dir):
+    """{collection: stamp} for a team's files, plus the archive manifest."""
+    team_dir = Path(team_dir)
+    stamps = {collection: file_stamp(team_dir / filename) for collection, filename in COLLECTIONS.items()}
+    stamps[ARCHIVE_MANIFEST] = file_stamp(team_dir / ARCHIVE_DIR / ARCHIVE_MANIFEST)
+    return stamps
+
+
+def version_tag(*stamps):
+    return hashlib.blake2b(repr(stamps).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class StorePool:
+    """Read-only team stores shared by every request thread."""
+
+    def __init__(self, data_dir):
+        self.data_dir = Path(data_dir)
+        self._lock = threading.Lock()
+        self._roster = Roster(self.data_dir, read_only=True)
+        self.roster_stamp = file_stamp(self.data_dir / ROSTER_FILE)
+        self._stores = {}
+        self._loading = {}
+
+    def roster(self):
+        stamp = file_stamp(self.data_dir / ROSTER_FILE)
+        if stamp != self.roster_stamp:
+            with self._lock:
+                if stamp != self.roster_stamp:
+                    self._roster = Roster(self.data_dir, read_only=True)
+                    self.roster_stamp = stamp
+        return self._roster
+
+    def team(self, team_id):
+        """PooledStore for a team, reloaded if its files have changed.
+
+        Raises KeyError for an unknown team.
+        """
+        roster = self.roster()
+        roster.team(team_id)
+        team_dir = roster.team_dir(team_id)
+        pooled = self._stores.get(team_id)
+        if pooled is not None and pooled.stamps == team_stamps(team_dir):
+            return pooled
+        with self._lock:
+            loading = self._loading.setdefault(team_id, threading.Lock())
+        if pooled is not None and not loading.acquire(blocking=False):
+            # Another request is already reloading; answer from the current store
+            return pooled
+        if pooled is None:
+            loading.acquire()
+        try:
+            pooled = self._stores.get(team_id)
+            stamps = team_stamps(team_dir)
+            if pooled is None or pooled.stamps != stamps:
+                store = DataStore(team_dir, change_log=False, read_only=True,
+                                  migrations=[roster.member_migration(team_id, save=False)])
+                pooled = self._stores[team_id] = PooledStore(stamps, store)
+            return pooled
+        finally:
+            loading.release()
+
+
+def param_value(text):
+    """Query-string value as the JSON type it spells (int, float, bool, null) or a string."""
+    if text in ('true', 'false'):
+        return text == 'true'
+    if text == 'null':
+        return None
+    for parse in (int, float):
+        try:
+            return parse(text)
+        except ValueError:
+            pass
+    return text
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so polling clients reuse one connection
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+    server_version = 'ManagerHubAPI/1.0'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        params = parse_qs(url.query)
+        try:
+            if parts in ([], ['health']):
+                self.send_json({'status': 'ok'})
+            elif parts == ['api', 'teams']:
+                self.list_teams()
+            elif len(parts) == 4 and parts[:2] == ['api', 'teams']:
+                self.list_records(parts[2], parts[3], params)
+            elif len(parts) == 5 and parts[:2] == ['api', 'teams']:
+                self.get_record(parts[2], parts[3], parts[4])
+            else:
+                raise ApiError(404, f"No such endpoint: {url.path}")
+        except ApiError as e:
+            self.send_json({'error': str(e)}, status=e.status)
+
+    def list_teams(self):
+        roster = self.server.pool.roster()
+        tag = version_tag(self.server.pool.roster_stamp)
+        if self.not_modified(tag):
+            return
+        teams = [{'id': team['id'], 'name': team['name'], 'manager': team['manager'],
+                  'members': [{'id': m, 'name': roster.name(m)} for m in team['members']]}
+                 for team in roster.teams]
+        self.send_json({'teams': teams}, tag=tag)
+
+    def team_collection(self, team_id, collection):
+        if collection not in COLLECTIONS:
+            raise ApiError(404, f"No such collection: {collection}")
+        try:
+            pooled = self.server.pool.team(team_id)
+        except KeyError:
+            raise ApiError(404, f"No such team: {team_id}") from None
+        tag = version_tag(pooled.stamps[collection], pooled.stamps[ARCHIVE_MANIFEST])
+        return pooled.store, tag
+
+    def list_records(self, team_id, collection, params):
+        store, tag = self.team_collection(team_id, collection)
+        if self.not_modified(tag):
+            return
+        try:
+            limit = min(int(params.get('limit', [DEFAULT_LIMIT])[0]), MAX_LIMIT)
+            offset = int(params.get('offset', [0])[0])
+        except ValueError:
+            raise ApiError(400, "limit and offset must be integers") from None
+        if limit < 0 or offset < 0:
+            raise ApiError(400, "limit and offset must not be negative")
+        filters = {}
+        for key, values in params.items():
+            if key not in PAGING_PARAMS:
+                values = [param_value(v) for v in values]
+                filters[key] = values[0] if len(values) == 1 else values
+        order_by = params.get('order_by', [None])[0]
+        if order_by is not None and order_by not in RECORD_TYPES[collection].field_names():
+            raise ApiError(400, f"Cannot order {collection} by '{order_by}'")
+        try:
+            # One extra record tells whether there is a next page
+            records = store.query(collection, order_by=order_by,
+                                  descending=params.get('descending', ['false'])[0] == 'true',
+                                  include_archive=params.get('archive', ['false'])[0] == 'true',
+                                  limit=limit + 1, offset=offset, **filters)
+        except TypeError as e:
+            raise ApiError(400, str(e)) from None
+        next_offset = offset + limit if len(records) > limit else None
+        self.send_json({'team': team_id, 'collection': collection, 'offset': offset, 'limit': limit,
+                        'next_offset': next_offset, 'items': [r.to_json() for r in records[:limit]]},
+                       tag=tag)
+
+    def get_record(self, team_id, collection, record_id):
+        store, tag = self.team_collection(team_id, collection)
+        if self.not_modified(tag):
+            return
+        try:
+            record_id = int(record_id)
+        except ValueError:
+            raise ApiError(404, f"No such record: {record_id}") from None
+        record = store.get(collection, record_id)
+        if record is None:
+            # Archived records are only read when asked for by id
+            record = next((r for r in store.archived(collection) if r['id'] == record_id), None)
+        if record is None:
+            raise ApiError(404, f"No {collection} record {record_id} in team {team_id}")
+        self.send_json(record.to_json(), tag=tag)
+
+    def not_modified(self, tag):
+        """Answer 304 if the client already has this version."""
+        if self.headers.get('If-None-Match') != f'"{tag}"':
+            return False
+        self.send_response(304)
+        self.send_version_headers(tag)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        return True
+
+    def send_version_headers(self, tag):
+        self.send_header('ETag', f'"{tag}"')
+        self.send_header('X-Data-Version', tag)
+        self.send_header('Cache-Control', 'no-cache')
+
+    def send_json(self, payload, status=200, tag=None):
+        body = dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if tag is not None:
+            self.send_version_headers(tag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ApiServer(ThreadingHTTPServer):
+    """One thread per connection, all sharing one StorePool."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address, pool, verbose=False):
+        super().__init__(address, ApiHandler)
+        self.pool = pool
+        self.verbose = verbose
+
+
+def make_server(data_dir='data', host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False):
+    """Build (but do not start) a server; port 0 picks a free port."""
+    return ApiServer((host, port), StorePool(data_dir), verbose)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Manager Hub data over a local JSON API")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--verbose', action='store_true', help="Log every request")
+    args = parser.parse_args()
+
+    server = make_server(args.data_dir, args.host, args.port, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"✅ Manager Hub API on http://{host}:{port}/api/teams")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
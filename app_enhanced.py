@@ -1,10 +1,23 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
-import json
-import os
+from datetime import date, datetime, timedelta
+from contextlib import nullcontext
 from pathlib import Path
 
+from approvals import QUEUE_ORDERS, approved_spend, decide, pending_count, pending_queue
+from bulk_import import IMPORT_COLUMNS, IMPORT_LABELS, ImportFileError, column_help, import_csv, template_csv
+from columnar import load_frame, records_to_frame, source_fingerprint, write_columns
+from data_utils import ARCHIVE_AFTER_DAYS, HistoryError, UndoStack
+from intervals import LiveIntervals
+from jobs import JobManager
+from recommend import LiveRecommendations
+from reconcile import STATUSES, expected_claims, read_expenses, reconcile, results_frame
+from records import (ActionCategory, ActionOwner, Attendance, CheckinTag, CheckinType, Level,
+                     Location, Priority, ResourceType, SkillCategory, TrainingType, skill_completed)
+from roster import ROSTER_FILE, Roster, area_rollup, open_team, read_team
+from ui_helpers import export_csv, job_result, render_notes
+from views import CADENCE_WINDOW_DAYS, CHECKIN_CADENCE_DAYS, RENEWABLE_TYPES
+
 # Page config
 st.set_page_config(
     page_title="Manager Hub & TAG Training",
@@ -17,67 +30,118 @@ st.set_page_config(
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 
-# Initialize session state for data persistence
-if 'checkins' not in st.session_state:
-    st.session_state.checkins = []
-if 'actions' not in st.session_state:
-    st.session_state.actions = []
-if 'training_plans' not in st.session_state:
-    st.session_state.training_plans = []
-if 'training_matrix' not in st.session_state:
-    st.session_state.training_matrix = []
-if 'sytner_bookings' not in st.session_state:
-    st.session_state.sytner_bookings = []
-if 'learning_resources' not in st.session_state:
-    st.session_state.learning_resources = []
-if 'team_members' not in st.session_state:
-    st.session_state.team_members = ['Alice Johnson', 'Bob Smith', 'Carol Williams', 'David Brown']
+# Reloaded whenever roster.json changes on disk
+@st.cache_resource
+def get_roster(roster_mtime):
+    return Roster(DATA_DIR)
 
-# Load data from JSON files if they exist
-def load_data():
-    try:
-        files = {
-            'checkins': 'checkins.json',
-            'actions': 'actions.json',
-            'training_plans': 'training_plans.json',
-            'training_matrix': 'training_matrix.json',
-            'sytner_bookings': 'sytner_bookings.json',
-            'learning_resources': 'learning_resources.json'
-        }
-        
-        for key, filename in files.items():
-            file_path = DATA_DIR / filename
-            if file_path.exists():
-                with open(file_path, 'r') as f:
-                    st.session_state[key] = json.load(f)
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
+# One store per team, shared by every session on that team; sessions only
+# hold a snapshot reference. Aggregates follow the store's change feed
+# instead of rescanning it.
+# Archiving is an explicit step (sidebar Maintenance, or data_utils.py
+# archive), so opening a team never rewrites its files.
+@st.cache_resource
+def get_team(team_id, _roster):
+    return open_team(_roster, team_id)
 
-# Save data to JSON files
-def save_data():
-    try:
-        files = {
-            'checkins': 'checkins.json',
-            'actions': 'actions.json',
-            'training_plans': 'training_plans.json',
-            'training_matrix': 'training_matrix.json',
-            'sytner_bookings': 'sytner_bookings.json',
-            'learning_resources': 'learning_resources.json'
-        }
-        
-        for key, filename in files.items():
-            with open(DATA_DIR / filename, 'w') as f:
-                json.dump(st.session_state[key], f, indent=2)
-    except Exception as e:
-        st.error(f"Error saving data: {e}")
+# Other teams' approval queues are read without opening them for writing,
+# reloaded whenever their training plans change on disk
+@st.cache_resource(max_entries=64)
+def get_team_reader(team_id, _roster, plans_fingerprint):
+    return read_team(_roster, team_id)
+
+@st.cache_resource
+def get_intervals(team_id, _roster):
+    return LiveIntervals(get_team(team_id, _roster)[0])
+
+@st.cache_resource
+def get_recommendations(team_id, _roster):
+    return LiveRecommendations(get_team(team_id, _roster)[0])
 
-# Load data on startup
-load_data()
+# Background jobs shared by every session; results are keyed by data version
+@st.cache_resource
+def get_jobs():
+    return JobManager()
+
+roster_path = DATA_DIR / ROSTER_FILE
+roster = get_roster(roster_path.stat().st_mtime if roster_path.exists() else None)
 
 # Sidebar navigation
 st.sidebar.title("👥 Manager Hub & TAG Training")
 st.sidebar.markdown("---")
 
+team_names = {team['id']: f"{team['name']} ({team['manager']})" for team in roster.teams}
+team_ids = list(team_names)
+requested_team = st.query_params.get('team')
+team_id = st.sidebar.selectbox(
+    "Team",
+    team_ids,
+    index=team_ids.index(requested_team) if requested_team in team_names else 0,
+    format_func=team_names.get
+)
+st.query_params['team'] = team_id
+
+try:
+    store, aggregates = get_team(team_id, roster)
+except Exception as e:
+    st.error(f"Error loading data: {e}")
+    st.stop()
+
+team_members = roster.members(team_id)
+member_name = roster.name
+
+# Undo/redo covers this session's own changes to this team
+undo_key = f"undo_{team_id}"
+if undo_key not in st.session_state or st.session_state[undo_key].store is not store:
+    st.session_state[undo_key] = UndoStack(store)
+undo = st.session_state[undo_key]
+
+def writable_stores(tids):
+    """{team_id: store} opened for writing, for decisions on other teams' plans."""
+    return {tid: store if tid == team_id else get_team(tid, roster)[0] for tid in tids}
+
+def member_filter_label(member_id):
+    return "All" if member_id is None else member_name(member_id)
+
+def filter_value(choice):
+    """Query filter for a selectbox choice; "All" means no filter."""
+    return None if choice == "All" else choice
+
+def build_matrix_view(progress, store, member_name, member, category, status, as_of=None):
+    """Job: filtered Matrix View table and its CSV, optionally as it stood at a past time."""
+    if as_of is None:
+        matrix_df = load_frame(store, 'training_matrix')
+    else:
+        matrix_df = records_to_frame('training_matrix', store.as_of(as_of).training_matrix)
+    if member is not None:
+        matrix_df = matrix_df[matrix_df['member_id'] == member]
+    if category != "All":
+        matrix_df = matrix_df[matrix_df['category'] == category]
+    if status == "Completed":
+        matrix_df = matrix_df[matrix_df['completed']]
+    elif status == "In Progress":
+        matrix_df = matrix_df[~matrix_df['completed']]
+    progress(0.5, "building table")
+    
+    view_df = pd.DataFrame({
+        'Team Member': matrix_df['member_id'].map(member_name),
+        'Skill': matrix_df['skill_name'],
+        'Category': matrix_df['category'],
+        'Current': matrix_df['current_level'],
+        'Required': matrix_df['required_level'],
+        'Priority': matrix_df['priority'],
+        'Target': matrix_df['target_date'],
+        'Status': matrix_df['completed'].map({True: '✅ Complete', False: '🔄 In Progress'})
+    })
+    return view_df, view_df.to_csv(index=False)
+
+jobs = get_jobs()
+
+# Snapshot for this run - immutable, so filters never need to copy it
+data = store.snapshot()
+
+st.sidebar.markdown("---")
+
 page = st.sidebar.radio(
     "Navigation",
     [
@@ -88,23 +152,56 @@ page = st.sidebar.radio(
         "📋 Training Matrix",
         "🏢 Sytner Training",
         "📚 Learning Resources",
-        "📈 Reports"
+        "📥 Bulk Import",
+        "🧾 Expense Reconciliation",
+        "📈 Reports",
+        "🗺️ Area Overview"
     ]
 )
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("### Quick Stats")
-total_actions = len([a for a in st.session_state.actions if a['status'] != 'Completed'])
-overdue_actions = len([a for a in st.session_state.actions if a['status'] == 'Overdue'])
-active_training = len([t for t in st.session_state.training_plans if t['status'] == 'In Progress'])
-upcoming_sytner = len([s for s in st.session_state.sytner_bookings 
-                       if datetime.fromisoformat(s['start_date']).date() >= datetime.now().date()
-                       and s['status'] != 'Completed'])
+quick_stats = aggregates.quick_stats()
+total_actions = quick_stats['active_actions']
+overdue_actions = quick_stats['overdue_actions']
+active_training = quick_stats['active_training']
+upcoming_sytner = quick_stats['upcoming_sytner']
 
 st.sidebar.metric("Active Actions", total_actions)
 st.sidebar.metric("Overdue Actions", overdue_actions, delta=-overdue_actions if overdue_actions > 0 else 0)
 st.sidebar.metric("Active Training", active_training)
 st.sidebar.metric("Upcoming Sytner", upcoming_sytner)
+
+if store.rejected:
+    st.sidebar.warning(f"⚠️ {len(store.rejected)} invalid records were set aside in rejected.jsonl")
+
+col_undo, col_redo = st.sidebar.columns(2)
+with col_undo:
+    undo_label = undo.undo_label()
+    if st.button("↩️ Undo", disabled=undo_label is None, help=undo_label and f"Undo: {undo_label}",
+                 use_container_width=True):
+        try:
+            undo.undo()
+            st.rerun()
+        except HistoryError as e:
+            st.sidebar.error(f"❌ Can't undo {undo_label}: {e}")
+with col_redo:
+    redo_label = undo.redo_label()
+    if st.button("↪️ Redo", disabled=redo_label is None, help=redo_label and f"Redo: {redo_label}",
+                 use_container_width=True):
+        try:
+            undo.redo()
+            st.rerun()
+        except HistoryError as e:
+            st.sidebar.error(f"❌ Can't redo {redo_label}: {e}")
+
+with st.sidebar.expander("🗄️ Maintenance"):
+    st.caption(f"Move closed records older than {ARCHIVE_AFTER_DAYS} days to the archive. "
+               "Totals and All Time views still include them.")
+    if st.button("Archive Old Records", use_container_width=True):
+        moved = store.archive()
+        write_columns(store)
+        st.success(f"✅ Archived {sum(moved.values())} record(s)")
 # ============================================
 # DASHBOARD PAGE
 # ============================================
@@ -116,12 +213,13 @@ if page == "📊 Dashboard":
     col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
-        st.metric("Team Members", len(st.session_state.team_members))
+        st.metric("Team Members", len(team_members))
     
     with col2:
-        recent_checkins = len([c for c in st.session_state.checkins 
-                              if (datetime.now() - datetime.fromisoformat(c['date'])).days <= 7])
-        st.metric("Check-ins (7d)", recent_checkins)
+        recent_checkins = aggregates.recent_checkins(7)
+        due_checkins = sum(c.overdue for c in aggregates.cadence(team_members))
+        st.metric("Check-ins (7d)", recent_checkins,
+                  f"{due_checkins} due a check-in" if due_checkins else None, delta_color="off")
     
     with col3:
         st.metric("Active Actions", total_actions)
@@ -139,38 +237,36 @@ if page == "📊 Dashboard":
     
     with col1:
         st.subheader("🔔 Recent Check-ins")
-        if st.session_state.checkins:
-            sorted_checkins = sorted(st.session_state.checkins, 
-                                   key=lambda x: x['date'], reverse=True)[:5]
+        if data.checkins:
+            sorted_checkins = store.query('checkins', order_by='date', descending=True, limit=5)
             for checkin in sorted_checkins:
-                with st.expander(f"{checkin['team_member']} - {checkin['date']}"):
+                with st.expander(f"{member_name(checkin['member_id'])} - {checkin['date']}"):
                     st.write(f"**Type:** {checkin['type']}")
                     st.write(checkin['notes'])
         else:
             st.info("No check-ins recorded yet")
         
         st.subheader("📚 Recent Learning Activity")
-        if st.session_state.learning_resources:
-            recent_resources = sorted(st.session_state.learning_resources,
-                                    key=lambda x: x.get('assigned_date', ''), reverse=True)[:3]
+        if data.learning_resources:
+            recent_resources = store.query('learning_resources', order_by='assigned_date',
+                                           descending=True, limit=3)
             for resource in recent_resources:
                 status_emoji = "✅" if resource['status'] == 'Completed' else "📖"
-                st.markdown(f"{status_emoji} **{resource['team_member']}** - {resource['title']}")
+                st.markdown(f"{status_emoji} **{member_name(resource['member_id'])}** - {resource['title']}")
                 st.caption(f"Type: {resource['type']}")
         else:
             st.info("No learning resources assigned yet")
     
     with col2:
         st.subheader("⚠️ Actions Requiring Attention")
-        if st.session_state.actions:
-            priority_actions = [a for a in st.session_state.actions 
-                              if a['status'] in ['Not Started', 'Overdue']]
-            priority_actions = sorted(priority_actions, key=lambda x: x['due_date'])[:5]
+        if data.actions:
+            priority_actions = store.query('actions', status=['Not Started', 'Overdue'],
+                                           order_by='due_date', limit=5)
             
             if priority_actions:
                 for action in priority_actions:
                     status_color = "🔴" if action['status'] == 'Overdue' else "🟡"
-                    st.markdown(f"{status_color} **{action['team_member']}** - {action['action']}")
+                    st.markdown(f"{status_color} **{member_name(action['member_id'])}** - {action['action']}")
                     st.caption(f"Due: {action['due_date']} | Priority: {action['priority']}")
             else:
                 st.success("All actions are on track!")
@@ -178,15 +274,14 @@ if page == "📊 Dashboard":
             st.info("No actions tracked yet")
         
         st.subheader("🏢 Upcoming Sytner Training")
-        if st.session_state.sytner_bookings:
-            upcoming = [s for s in st.session_state.sytner_bookings
-                       if datetime.fromisoformat(s['start_date']).date() >= datetime.now().date()
-                       and s['status'] != 'Completed']
-            upcoming = sorted(upcoming, key=lambda x: x['start_date'])[:3]
+        if data.sytner_bookings:
+            upcoming = store.query('sytner_bookings', start_date_from=datetime.now().date(),
+                                   status=['Booked', 'In Progress', 'Cancelled'],
+                                   order_by='start_date', limit=3)
             
             if upcoming:
                 for booking in upcoming:
-                    st.markdown(f"📅 **{booking['team_member']}** - {booking['course_name']}")
+                    st.markdown(f"📅 **{member_name(booking['member_id'])}** - {booking['course_name']}")
                     st.caption(f"Date: {booking['start_date']} | Location: {booking['location']}")
             else:
                 st.info("No upcoming Sytner training")
@@ -197,20 +292,16 @@ if page == "📊 Dashboard":
     
     # Training Matrix Overview
     st.subheader("📋 Training Matrix Completion Overview")
-    if st.session_state.training_matrix:
+    if data.training_matrix:
         matrix_data = []
-        for member in st.session_state.team_members:
-            member_matrix = [m for m in st.session_state.training_matrix if m['team_member'] == member]
-            if member_matrix:
-                completed = len([m for m in member_matrix if m['completed']])
-                total = len(member_matrix)
-                percentage = (completed / total * 100) if total > 0 else 0
-                matrix_data.append({
-                    'Team Member': member,
-                    'Completed': completed,
-                    'Total': total,
-                    'Progress': f"{percentage:.0f}%"
-                })
+        for member, completed, total in aggregates.matrix_completion(team_members):
+            percentage = (completed / total * 100) if total > 0 else 0
+            matrix_data.append({
+                'Team Member': member_name(member),
+                'Completed': completed,
+                'Total': total,
+                'Progress': f"{percentage:.0f}%"
+            })
         
         if matrix_data:
             df = pd.DataFrame(matrix_data)
@@ -231,7 +322,7 @@ elif page == "📝 Check-in Notes":
     st.title("📝 Check-in Notes")
     st.markdown("Record informal check-ins and conversations between formal 1-2-1s")
     
-    tab1, tab2 = st.tabs(["➕ Add Check-in", "📋 View Check-ins"])
+    tab1, tab2, tab3 = st.tabs(["➕ Add Check-in", "📋 View Check-ins", "⏰ Cadence"])
     
     with tab1:
         st.subheader("Record a New Check-in")
@@ -240,17 +331,17 @@ elif page == "📝 Check-in Notes":
             col1, col2 = st.columns(2)
             
             with col1:
-                team_member = st.selectbox("Team Member", st.session_state.team_members)
+                team_member = st.selectbox("Team Member", team_members, format_func=member_name)
                 checkin_date = st.date_input("Date", datetime.now())
                 checkin_type = st.selectbox(
                     "Type",
-                    ["Quick Catch-up", "Progress Update", "Concern/Issue", "Wellbeing Check", "Training Discussion", "Other"]
+                    list(CheckinType)
                 )
             
             with col2:
                 tags = st.multiselect(
                     "Tags (optional)",
-                    ["Performance", "Development", "Wellbeing", "Project", "Training", "Conflict", "Recognition"]
+                    list(CheckinTag)
                 )
                 follow_up = st.checkbox("Requires Follow-up")
             
@@ -261,8 +352,7 @@ elif page == "📝 Check-in Notes":
             
             if submitted:
                 new_checkin = {
-                    'id': len(st.session_state.checkins) + 1,
-                    'team_member': team_member,
+                    'member_id': team_member,
                     'date': checkin_date.isoformat(),
                     'type': checkin_type,
                     'notes': notes,
@@ -270,9 +360,9 @@ elif page == "📝 Check-in Notes":
                     'follow_up': follow_up,
                     'created_at': datetime.now().isoformat()
                 }
-                st.session_state.checkins.append(new_checkin)
-                save_data()
-                st.success(f"✅ Check-in recorded for {team_member}")
+                with undo.track("Add check-in"):
+                    store.append('checkins', new_checkin)
+                st.success(f"✅ Check-in recorded for {member_name(team_member)}")
                 st.rerun()
     
     with tab2:
@@ -280,40 +370,74 @@ elif page == "📝 Check-in Notes":
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            filter_member = st.selectbox("Filter by Team Member", ["All"] + st.session_state.team_members)
+            filter_member = st.selectbox("Filter by Team Member", [None] + team_members, format_func=member_filter_label)
         with col2:
             filter_type = st.selectbox("Filter by Type", ["All", "Quick Catch-up", "Progress Update", "Concern/Issue", "Wellbeing Check", "Training Discussion", "Other"])
         with col3:
             filter_days = st.selectbox("Time Period", ["Last 7 days", "Last 30 days", "Last 90 days", "All Time"])
         
-        filtered_checkins = st.session_state.checkins.copy()
-        
-        if filter_member != "All":
-            filtered_checkins = [c for c in filtered_checkins if c['team_member'] == filter_member]
-        
-        if filter_type != "All":
-            filtered_checkins = [c for c in filtered_checkins if c['type'] == filter_type]
+        days_map = {"Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90, "All Time": None}
+        days = days_map[filter_days]
+        # Only All Time needs history older than the archive window
+        sorted_checkins = store.query(
+            'checkins',
+            member=filter_member,
+            type=filter_value(filter_type),
+            date_from=None if days is None else datetime.now().date() - timedelta(days=days),
+            order_by='date',
+            descending=True,
+            include_archive=days is None
+        )
         
-        if filter_days != "All Time":
-            days_map = {"Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90}
-            days = days_map[filter_days]
-            cutoff_date = datetime.now() - timedelta(days=days)
-            filtered_checkins = [c for c in filtered_checkins 
-                               if datetime.fromisoformat(c['date']) >= cutoff_date]
-        
-        if filtered_checkins:
-            sorted_checkins = sorted(filtered_checkins, key=lambda x: x['date'], reverse=True)
+        if sorted_checkins:
             st.markdown(f"**{len(sorted_checkins)} check-in(s) found**")
             
             for checkin in sorted_checkins:
-                with st.expander(f"{'🔔' if checkin.get('follow_up') else '📝'} {checkin['team_member']} - {checkin['date']} - {checkin['type']}"):
+                with st.expander(f"{'🔔' if checkin['follow_up'] else '📝'} {member_name(checkin['member_id'])} - {checkin['date']} - {checkin['type']}"):
                     st.write(checkin['notes'])
-                    if checkin.get('tags'):
+                    if checkin['tags']:
                         st.markdown("**Tags:** " + ", ".join(checkin['tags']))
-                    if checkin.get('follow_up'):
+                    if checkin['follow_up']:
                         st.warning("⚠️ Requires follow-up")
+                        # Archived check-ins are read-only
+                        if store.get('checkins', checkin['id']) is not None:
+                            if st.button("✅ Follow-up Done", key=f"follow_up_{checkin['id']}"):
+                                with undo.track("Follow-up done"):
+                                    store.update('checkins', checkin['id'], follow_up=False)
+                                st.rerun()
         else:
             st.info("No check-ins found matching the filters")
+    
+    with tab3:
+        st.subheader("Check-in Cadence")
+        
+        cadence_days = st.number_input("Check in with everyone at least every (days)", min_value=1, max_value=90,
+                                       value=CHECKIN_CADENCE_DAYS, key="cadence_days")
+        team_cadence = aggregates.cadence(team_members, cadence_days)
+        due = [c for c in team_cadence if c.overdue]
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Due a Check-in", len(due))
+        with col2:
+            st.metric("Open Follow-ups", sum(c.open_follow_ups for c in team_cadence))
+        with col3:
+            st.metric(f"Check-ins ({CADENCE_WINDOW_DAYS}d)", sum(c.recent_checkins for c in team_cadence))
+        
+        cadence_df = pd.DataFrame([{
+            'Status': '🔴 Due' if c.overdue else '🟢 On Track',
+            'Team Member': member_name(c.member_id),
+            'Last Check-in': c.last_checkin or 'Never',
+            'Days Since': c.days_since,
+            f'Check-ins ({CADENCE_WINDOW_DAYS}d)': c.recent_checkins,
+            'Per Month': round(c.per_month, 1),
+            'Open Follow-ups': c.open_follow_ups
+        } for c in sorted(team_cadence, key=lambda c: (not c.overdue, -(c.days_since or 10 ** 6)))])
+        if not cadence_df.empty:
+            cadence_df['Days Since'] = cadence_df['Days Since'].astype('Int64')
+            st.dataframe(cadence_df, use_container_width=True, hide_index=True)
+        else:
+            st.info("No team members yet")
 
 # ============================================
 # ACTIONS PAGE
@@ -328,13 +452,13 @@ elif page == "✅ Actions":
         with st.form("action_form"):
             col1, col2 = st.columns(2)
             with col1:
-                action_member = st.selectbox("Team Member", st.session_state.team_members)
+                action_member = st.selectbox("Team Member", team_members, format_func=member_name)
                 action_text = st.text_input("Action")
-                action_priority = st.selectbox("Priority", ["Low", "Medium", "High"])
+                action_priority = st.selectbox("Priority", list(Priority))
             with col2:
-                action_owner = st.selectbox("Owner", ["Manager", "Team Member", "Both"])
+                action_owner = st.selectbox("Owner", list(ActionOwner))
                 action_due = st.date_input("Due Date", datetime.now() + timedelta(days=7))
-                action_category = st.selectbox("Category", ["Development", "Performance", "Project", "Training", "Admin", "Other"])
+                action_category = st.selectbox("Category", list(ActionCategory))
             
             action_notes = st.text_area("Additional Notes (optional)", height=100)
             submitted = st.form_submit_button("Create Action", use_container_width=True)
@@ -342,8 +466,7 @@ elif page == "✅ Actions":
             if submitted:
                 status = "Overdue" if action_due < datetime.now().date() else "Not Started"
                 new_action = {
-                    'id': len(st.session_state.actions) + 1,
-                    'team_member': action_member,
+                    'member_id': action_member,
                     'action': action_text,
                     'priority': action_priority,
                     'owner': action_owner,
@@ -351,44 +474,35 @@ elif page == "✅ Actions":
                     'category': action_category,
                     'notes': action_notes,
                     'status': status,
-                    'created_at': datetime.now().isoformat(),
-                    'updates': []
+                    'created_at': datetime.now().isoformat()
                 }
-                st.session_state.actions.append(new_action)
-                save_data()
-                st.success(f"✅ Action created for {action_member}")
+                with undo.track("Add action"):
+                    store.append('actions', new_action)
+                st.success(f"✅ Action created for {member_name(action_member)}")
                 st.rerun()
     
     with tab2:
-        for action in st.session_state.actions:
-            if action['status'] != 'Completed':
-                due_date = datetime.fromisoformat(action['due_date']).date()
-                if due_date < datetime.now().date():
-                    action['status'] = 'Overdue'
+        store.mark_overdue_actions()
         
         col1, col2, col3 = st.columns(3)
         with col1:
-            filter_action_member = st.selectbox("Team Member", ["All"] + st.session_state.team_members, key="action_filter")
+            filter_action_member = st.selectbox("Team Member", [None] + team_members, format_func=member_filter_label, key="action_filter")
         with col2:
             filter_status = st.selectbox("Status", ["All", "Not Started", "In Progress", "Overdue", "Completed"])
         with col3:
             filter_priority = st.selectbox("Priority", ["All", "High", "Medium", "Low"])
         
-        filtered_actions = st.session_state.actions.copy()
-        if filter_action_member != "All":
-            filtered_actions = [a for a in filtered_actions if a['team_member'] == filter_action_member]
-        if filter_status != "All":
-            filtered_actions = [a for a in filtered_actions if a['status'] == filter_status]
-        if filter_priority != "All":
-            filtered_actions = [a for a in filtered_actions if a['priority'] == filter_priority]
+        sorted_actions = store.query('actions', member=filter_action_member,
+                                     status=filter_value(filter_status),
+                                     priority=filter_value(filter_priority),
+                                     order_by='due_date')
         
-        if filtered_actions:
-            sorted_actions = sorted(filtered_actions, key=lambda x: x['due_date'])
+        if sorted_actions:
             st.markdown(f"**{len(sorted_actions)} action(s) found**")
             
             for action in sorted_actions:
                 status_emoji = {'Not Started': '⚪', 'In Progress': '🟡', 'Completed': '✅', 'Overdue': '🔴'}
-                with st.expander(f"{status_emoji.get(action['status'], '⚪')} {action['team_member']} - {action['action']} (Due: {action['due_date']})"):
+                with st.expander(f"{status_emoji.get(action['status'], '⚪')} {member_name(action['member_id'])} - {action['action']} (Due: {action['due_date']})"):
                     col1, col2 = st.columns([2, 1])
                     with col1:
                         st.markdown(f"**Action:** {action['action']}")
@@ -409,10 +523,10 @@ elif page == "✅ Actions":
                     update_note = st.text_input("Add Update (optional)", key=f"update_{action['id']}")
                     
                     if st.button("Save Update", key=f"save_{action['id']}"):
-                        action['status'] = new_status
-                        if update_note:
-                            action['updates'].append({'date': datetime.now().isoformat(), 'note': update_note})
-                        save_data()
+                        with undo.track("Update action"):
+                            store.update('actions', action['id'], status=new_status)
+                            if update_note:
+                                store.notes.append('actions', action['id'], update_note)
                         st.success("Action updated!")
                         st.rerun()
         else:
@@ -424,7 +538,9 @@ elif page == "🎓 TAG Training Hub":
     st.title("🎓 TAG Training Hub (Training and Guidance)")
     st.markdown("Comprehensive training management for your team")
     
-    tab1, tab2, tab3 = st.tabs(["➕ Create Plan", "📋 Manage Plans", "📊 Team Overview"])
+    pending_approvals = pending_count({team_id: store})
+    tab1, tab2, tab3, tab4 = st.tabs(["➕ Create Plan", "📋 Manage Plans", "📊 Team Overview",
+                                      f"🟡 Approvals ({pending_approvals})"])
     
     with tab1:
         st.subheader("Create Individual Training Plan")
@@ -433,17 +549,16 @@ elif page == "🎓 TAG Training Hub":
             col1, col2 = st.columns(2)
             
             with col1:
-                training_member = st.selectbox("Team Member", st.session_state.team_members)
+                training_member = st.selectbox("Team Member", team_members, format_func=member_name)
                 course_name = st.text_input("Training/Course Name")
                 training_type = st.selectbox(
                     "Type",
-                    ["Online Course", "In-Person Training", "Certification", "Mentoring", 
-                     "Self-Study", "Sytner Training", "On-the-Job", "Other"]
+                    list(TrainingType)
                 )
                 start_date = st.date_input("Start Date", datetime.now())
             
             with col2:
-                priority = st.selectbox("Priority", ["Low", "Medium", "High"], key="training_priority")
+                priority = st.selectbox("Priority", list(Priority), key="training_priority")
                 end_date = st.date_input("Target Completion", datetime.now() + timedelta(days=90))
                 cost = st.number_input("Estimated Cost (£)", min_value=0.0, step=50.0, value=0.0)
                 approval_required = st.checkbox("Requires Manager Approval")
@@ -458,8 +573,7 @@ elif page == "🎓 TAG Training Hub":
             
             if submitted:
                 new_training = {
-                    'id': len(st.session_state.training_plans) + 1,
-                    'team_member': training_member,
+                    'member_id': training_member,
                     'course_name': course_name,
                     'type': training_type,
                     'start_date': start_date.isoformat(),
@@ -472,12 +586,11 @@ elif page == "🎓 TAG Training Hub":
                     'approval_status': 'Pending' if approval_required else 'Approved',
                     'status': 'Not Started',
                     'progress': 0,
-                    'created_at': datetime.now().isoformat(),
-                    'notes': []
+                    'created_at': datetime.now().isoformat()
                 }
-                st.session_state.training_plans.append(new_training)
-                save_data()
-                st.success(f"✅ Training plan created for {training_member}")
+                with undo.track("Add training plan"):
+                    store.append('training_plans', new_training)
+                st.success(f"✅ Training plan created for {member_name(training_member)}")
                 st.rerun()
     
     with tab2:
@@ -485,61 +598,58 @@ elif page == "🎓 TAG Training Hub":
         
         col1, col2 = st.columns(2)
         with col1:
-            filter_training_member = st.selectbox("Filter by Team Member", ["All"] + st.session_state.team_members, key="training_filter")
+            filter_training_member = st.selectbox("Filter by Team Member", [None] + team_members, format_func=member_filter_label, key="training_filter")
         with col2:
             filter_training_status = st.selectbox("Filter by Status", ["All", "Not Started", "In Progress", "Completed", "Cancelled"])
         
-        filtered_training = st.session_state.training_plans.copy()
-        if filter_training_member != "All":
-            filtered_training = [t for t in filtered_training if t['team_member'] == filter_training_member]
-        if filter_training_status != "All":
-            filtered_training = [t for t in filtered_training if t['status'] == filter_training_status]
+        filtered_training = store.query('training_plans', member=filter_training_member,
+                                        status=filter_value(filter_training_status))
         
         if filtered_training:
-            total_cost = sum(t.get('cost', 0) for t in filtered_training)
+            total_cost = sum(t['cost'] for t in filtered_training)
             st.info(f"📊 {len(filtered_training)} training plan(s) | Total Cost: £{total_cost:,.2f}")
             
             for training in filtered_training:
                 status_emoji = {'Not Started': '⚪', 'In Progress': '🟡', 'Completed': '✅', 'Cancelled': '❌'}
                 approval_badge = ""
-                if training.get('approval_required'):
-                    if training.get('approval_status') == 'Pending':
+                if training['approval_required']:
+                    if training['approval_status'] == 'Pending':
                         approval_badge = " 🟡 Pending Approval"
-                    elif training.get('approval_status') == 'Approved':
+                    elif training['approval_status'] == 'Approved':
                         approval_badge = " ✅ Approved"
-                    elif training.get('approval_status') == 'Rejected':
+                    elif training['approval_status'] == 'Rejected':
                         approval_badge = " ❌ Rejected"
                 
-                with st.expander(f"{status_emoji.get(training['status'], '⚪')} {training['team_member']} - {training['course_name']}{approval_badge}"):
+                with st.expander(f"{status_emoji.get(training['status'], '⚪')} {member_name(training['member_id'])} - {training['course_name']}{approval_badge}"):
                     col1, col2 = st.columns([2, 1])
                     
                     with col1:
                         st.markdown(f"**Course:** {training['course_name']}")
                         st.markdown(f"**Type:** {training['type']}")
                         st.markdown(f"**Objectives:** {training['objectives']}")
-                        if training.get('business_case'):
+                        if training['business_case']:
                             st.markdown(f"**Business Case:** {training['business_case']}")
                     
                     with col2:
                         st.markdown(f"**Priority:** {training['priority']}")
                         st.markdown(f"**Start:** {training['start_date']}")
                         st.markdown(f"**End:** {training['end_date']}")
-                        st.markdown(f"**Cost:** £{training.get('cost', 0):,.2f}")
+                        st.markdown(f"**Cost:** £{training['cost']:,.2f}")
                     
-                    if training.get('approval_required') and training.get('approval_status') == 'Pending':
+                    if training['approval_required'] and training['approval_status'] == 'Pending':
                         st.markdown("---")
                         st.markdown("**Manager Approval Required**")
                         col_approve, col_reject = st.columns(2)
                         with col_approve:
                             if st.button("✅ Approve", key=f"approve_{training['id']}", use_container_width=True):
-                                training['approval_status'] = 'Approved'
-                                save_data()
+                                with undo.track("Approve training"):
+                                    store.update('training_plans', training['id'], approval_status='Approved')
                                 st.success("Training approved!")
                                 st.rerun()
                         with col_reject:
                             if st.button("❌ Reject", key=f"reject_{training['id']}", use_container_width=True):
-                                training['approval_status'] = 'Rejected'
-                                save_data()
+                                with undo.track("Reject training"):
+                                    store.update('training_plans', training['id'], approval_status='Rejected')
                                 st.error("Training rejected")
                                 st.rerun()
                     
@@ -554,63 +664,113 @@ elif page == "🎓 TAG Training Hub":
                     training_note = st.text_input("Add Note", key=f"training_note_{training['id']}")
                     
                     if st.button("Update Training", key=f"update_training_{training['id']}"):
-                        training['progress'] = new_progress
-                        training['status'] = new_training_status
-                        if training_note:
-                            training['notes'].append({'date': datetime.now().isoformat(), 'note': training_note})
-                        save_data()
+                        with undo.track("Update training"):
+                            store.update('training_plans', training['id'], progress=new_progress, status=new_training_status)
+                            if training_note:
+                                store.notes.append('training_plans', training['id'], training_note)
                         st.success("Training updated!")
                         st.rerun()
                     
-                    if training.get('notes'):
-                        st.markdown("**Notes:**")
-                        for note in training['notes']:
-                            st.caption(f"{note['date']}: {note['note']}")
+                    render_notes(store.notes, 'training_plans', training['id'])
         else:
             st.info("No training plans found")
     
     with tab3:
         st.subheader("Team Training Overview")
         
-        if st.session_state.training_plans:
+        if data.training_plans:
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                total_plans = len(st.session_state.training_plans)
+                total_plans = aggregates.get('plans')
                 st.metric("Total Plans", total_plans)
             with col2:
-                in_progress = len([t for t in st.session_state.training_plans if t['status'] == 'In Progress'])
+                in_progress = aggregates.get('plans_status', 'In Progress')
                 st.metric("In Progress", in_progress)
             with col3:
-                completed = len([t for t in st.session_state.training_plans if t['status'] == 'Completed'])
+                completed = aggregates.get('plans_status', 'Completed')
                 st.metric("Completed", completed)
             with col4:
-                total_investment = sum(t.get('cost', 0) for t in st.session_state.training_plans)
+                total_investment = aggregates.get('training_cost')
                 st.metric("Total Investment", f"£{total_investment:,.0f}")
             
             st.markdown("---")
             
-            training_data = []
-            for member in st.session_state.team_members:
-                member_training = [t for t in st.session_state.training_plans if t['team_member'] == member]
-                if member_training:
-                    total = len(member_training)
-                    in_prog = len([t for t in member_training if t['status'] == 'In Progress'])
-                    completed = len([t for t in member_training if t['status'] == 'Completed'])
-                    avg_progress = sum(t['progress'] for t in member_training) / total if total > 0 else 0
-                    
-                    training_data.append({
-                        'Team Member': member,
-                        'Total Plans': total,
-                        'In Progress': in_prog,
-                        'Completed': completed,
-                        'Avg Progress': f"{avg_progress:.0f}%"
-                    })
+            training_data = aggregates.training_overview(team_members, member_name)
             
             if training_data:
                 df = pd.DataFrame(training_data)
                 st.dataframe(df, use_container_width=True, hide_index=True)
         else:
             st.info("No training plans to display")
+    
+    with tab4:
+        st.subheader("Approval Queue")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            queue_order = st.selectbox("Sort by", list(QUEUE_ORDERS), format_func=lambda order: QUEUE_ORDERS[order][0],
+                                       key="approval_order")
+        with col2:
+            all_teams = len(team_ids) > 1 and st.checkbox("Include every team", key="approval_all_teams")
+        
+        approval_stores = {team_id: store}
+        queue_versions = [store.snapshot().version]
+        if all_teams:
+            for tid in team_ids:
+                if tid != team_id:
+                    fingerprint = str(source_fingerprint(roster.team_dir(tid), 'training_plans'))
+                    approval_stores[tid] = get_team_reader(tid, roster, fingerprint)
+                    queue_versions.append(fingerprint)
+        queue = pending_queue(approval_stores, queue_order)
+        
+        if queue:
+            queue_df = pd.DataFrame({
+                'Select': False,
+                'Team': [team_names[tid] for tid, _ in queue],
+                'Team Member': [member_name(plan['member_id']) for _, plan in queue],
+                'Course': [plan['course_name'] for _, plan in queue],
+                'Type': [plan['type'].value for _, plan in queue],
+                'Priority': [plan['priority'].value for _, plan in queue],
+                'Start': [plan['start_date'] for _, plan in queue],
+                'Cost (£)': [plan['cost'] for _, plan in queue]
+            })
+            if not all_teams:
+                queue_df = queue_df.drop(columns='Team')
+            # Keyed by data version, so ticks never carry over to a changed queue
+            versions = "_".join(map(str, queue_versions))
+            edited = st.data_editor(queue_df, hide_index=True, use_container_width=True,
+                                    disabled=[c for c in queue_df.columns if c != 'Select'],
+                                    key=f"approval_queue_{queue_order}_{all_teams}_{versions}")
+            selected_rows = list(edited.index[edited['Select']])
+            selected = [(queue[i][0], queue[i][1]['id']) for i in selected_rows]
+            selected_cost = sum(queue[i][1]['cost'] for i in selected_rows)
+            approved_this_year = approved_spend(approval_stores)
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Pending", f"£{queue_df['Cost (£)'].sum():,.0f}", f"{len(queue)} plan(s)", delta_color="off")
+            with col2:
+                st.metric("Selected", f"£{selected_cost:,.0f}", f"{len(selected)} plan(s)", delta_color="off")
+            with col3:
+                st.metric("Approved This Year", f"£{approved_this_year:,.0f}")
+            with col4:
+                st.metric("If Selected Approved", f"£{approved_this_year + selected_cost:,.0f}",
+                          f"+£{selected_cost:,.0f}", delta_color="inverse")
+            
+            col_approve, col_reject = st.columns(2)
+            with col_approve:
+                if st.button("✅ Approve Selected", disabled=not selected, use_container_width=True):
+                    # Undo covers this team's own queue; decisions across teams are final
+                    with undo.track("Approve selected") if not all_teams else nullcontext():
+                        decide(writable_stores(tid for tid, _ in selected), selected, 'Approved')
+                    st.rerun()
+            with col_reject:
+                if st.button("❌ Reject Selected", disabled=not selected, use_container_width=True):
+                    with undo.track("Reject selected") if not all_teams else nullcontext():
+                        decide(writable_stores(tid for tid, _ in selected), selected, 'Rejected')
+                    st.rerun()
+        else:
+            st.success("✅ Nothing waiting for approval")
 
 # ============================================
 # TRAINING MATRIX PAGE
@@ -619,7 +779,7 @@ elif page == "📋 Training Matrix":
     st.title("📋 Training Matrix")
     st.markdown("Track required skills and competencies for each team member")
     
-    tab1, tab2, tab3 = st.tabs(["➕ Add Skills", "✅ Track Progress", "📊 Matrix View"])
+    tab1, tab2, tab3, tab4 = st.tabs(["➕ Add Skills", "✅ Track Progress", "📊 Matrix View", "💡 Recommendations"])
     
     with tab1:
         st.subheader("Add Skills to Training Matrix")
@@ -628,16 +788,15 @@ elif page == "📋 Training Matrix":
             col1, col2 = st.columns(2)
             
             with col1:
-                matrix_member = st.selectbox("Team Member", st.session_state.team_members, key="matrix_member")
+                matrix_member = st.selectbox("Team Member", team_members, format_func=member_name, key="matrix_member")
                 skill_name = st.text_input("Skill/Competency Name")
                 skill_category = st.selectbox("Category", 
-                    ["Technical", "Soft Skills", "Leadership", "Product Knowledge", 
-                     "Systems/Tools", "Compliance", "Safety", "Other"])
+                    list(SkillCategory))
             
             with col2:
-                required_level = st.selectbox("Required Level", ["Basic", "Intermediate", "Advanced", "Expert"])
-                current_level = st.selectbox("Current Level", ["None", "Basic", "Intermediate", "Advanced", "Expert"])
-                priority = st.selectbox("Priority", ["Low", "Medium", "High"], key="matrix_priority")
+                required_level = st.selectbox("Required Level", list(Level)[1:])
+                current_level = st.selectbox("Current Level", list(Level))
+                priority = st.selectbox("Priority", list(Priority), key="matrix_priority")
             
             target_date = st.date_input("Target Completion Date", datetime.now() + timedelta(days=90))
             training_method = st.text_input("Training Method", placeholder="e.g., Online course, shadowing, certification")
@@ -645,10 +804,9 @@ elif page == "📋 Training Matrix":
             submitted = st.form_submit_button("Add to Matrix", use_container_width=True)
             
             if submitted:
-                completed = (current_level == required_level)
+                completed = skill_completed(current_level, required_level)
                 new_matrix_item = {
-                    'id': len(st.session_state.training_matrix) + 1,
-                    'team_member': matrix_member,
+                    'member_id': matrix_member,
                     'skill_name': skill_name,
                     'category': skill_category,
                     'required_level': required_level,
@@ -658,20 +816,19 @@ elif page == "📋 Training Matrix":
                     'training_method': training_method,
                     'completed': completed,
                     'completion_date': datetime.now().isoformat() if completed else None,
-                    'created_at': datetime.now().isoformat(),
-                    'notes': []
+                    'created_at': datetime.now().isoformat()
                 }
-                st.session_state.training_matrix.append(new_matrix_item)
-                save_data()
-                st.success(f"✅ Skill added to {matrix_member}'s training matrix")
+                with undo.track("Add skill"):
+                    store.append('training_matrix', new_matrix_item)
+                st.success(f"✅ Skill added to {member_name(matrix_member)}'s training matrix")
                 st.rerun()
     
     with tab2:
         st.subheader("Update Skill Progress")
         
-        filter_matrix_member = st.selectbox("Select Team Member", st.session_state.team_members, key="matrix_progress_filter")
+        filter_matrix_member = st.selectbox("Select Team Member", team_members, format_func=member_name, key="matrix_progress_filter")
         
-        member_matrix = [m for m in st.session_state.training_matrix if m['team_member'] == filter_matrix_member]
+        member_matrix = store.query('training_matrix', member=filter_matrix_member)
         
         if member_matrix:
             for skill in member_matrix:
@@ -698,77 +855,90 @@ elif page == "📋 Training Matrix":
                         index=["None", "Basic", "Intermediate", "Advanced", "Expert"].index(skill['current_level']),
                         key=f"level_{skill['id']}")
                     
-                    mark_complete = st.checkbox("Mark as Completed", value=skill['completed'], key=f"complete_{skill['id']}")
+                    # Completion follows the levels, as everywhere else
+                    mark_complete = skill_completed(Level(new_current_level), skill['required_level'])
+                    if mark_complete and not skill['completed']:
+                        st.caption(f"Saving at {new_current_level} marks this skill completed")
                     skill_note = st.text_input("Add Note", key=f"skill_note_{skill['id']}")
                     
                     if st.button("Update Skill", key=f"update_skill_{skill['id']}"):
-                        skill['current_level'] = new_current_level
-                        skill['completed'] = mark_complete
-                        if mark_complete and not skill.get('completion_date'):
-                            skill['completion_date'] = datetime.now().isoformat()
-                        if skill_note:
-                            skill['notes'].append({'date': datetime.now().isoformat(), 'note': skill_note})
-                        save_data()
+                        changes = {'current_level': new_current_level, 'completed': mark_complete}
+                        if mark_complete and not skill['completion_date']:
+                            changes['completion_date'] = datetime.now().isoformat()
+                        elif not mark_complete:
+                            changes['completion_date'] = None
+                        with undo.track("Update skill"):
+                            store.update('training_matrix', skill['id'], **changes)
+                            if skill_note:
+                                store.notes.append('training_matrix', skill['id'], skill_note)
                         st.success("Skill updated!")
                         st.rerun()
                     
-                    if skill.get('notes'):
-                        st.markdown("**Notes:**")
-                        for note in skill['notes']:
-                            st.caption(f"{note['date']}: {note['note']}")
+                    render_notes(store.notes, 'training_matrix', skill['id'])
         else:
-            st.info(f"No skills in training matrix for {filter_matrix_member}")
+            st.info(f"No skills in training matrix for {member_name(filter_matrix_member)}")
     
     with tab3:
         st.subheader("Complete Training Matrix View")
         
-        if st.session_state.training_matrix:
-            matrix_data = []
-            for item in st.session_state.training_matrix:
-                matrix_data.append({
-                    'Team Member': item['team_member'],
-                    'Skill': item['skill_name'],
-                    'Category': item['category'],
-                    'Current': item['current_level'],
-                    'Required': item['required_level'],
-                    'Priority': item['priority'],
-                    'Target': item['target_date'],
-                    'Status': '✅ Complete' if item['completed'] else '🔄 In Progress'
-                })
-            
-            df = pd.DataFrame(matrix_data)
-            
-            col1, col2, col3 = st.columns(3)
+        if data.training_matrix:
+            col1, col2, col3, col4 = st.columns(4)
             with col1:
-                filter_member = st.selectbox("Filter Team Member", ["All"] + st.session_state.team_members, key="matrix_view_filter")
+                filter_member = st.selectbox("Filter Team Member", [None] + team_members, format_func=member_filter_label, key="matrix_view_filter")
             with col2:
                 filter_category = st.selectbox("Filter Category", ["All", "Technical", "Soft Skills", "Leadership", 
                     "Product Knowledge", "Systems/Tools", "Compliance", "Safety", "Other"])
             with col3:
                 filter_status = st.selectbox("Filter Status", ["All", "Completed", "In Progress"])
+            with col4:
+                as_of_day = st.date_input("As Of", datetime.now().date(), max_value=datetime.now().date(),
+                                          key="matrix_as_of")
+            # End of a past day; today shows the current matrix
+            as_of = None if as_of_day >= datetime.now().date() else datetime.combine(as_of_day, datetime.max.time())
             
-            filtered_df = df.copy()
-            if filter_member != "All":
-                filtered_df = filtered_df[filtered_df['Team Member'] == filter_member]
-            if filter_category != "All":
-                filtered_df = filtered_df[filtered_df['Category'] == filter_category]
-            if filter_status == "Completed":
-                filtered_df = filtered_df[filtered_df['Status'] == '✅ Complete']
-            elif filter_status == "In Progress":
-                filtered_df = filtered_df[filtered_df['Status'] == '🔄 In Progress']
-            
-            st.dataframe(filtered_df, use_container_width=True, hide_index=True)
-            
-            csv = filtered_df.to_csv(index=False)
-            st.download_button(
-                "📥 Download Matrix as CSV",
-                csv,
-                "training_matrix.csv",
-                "text/csv",
-                use_container_width=True
+            matrix_view = job_result(
+                jobs, (team_id, 'matrix_view', data.version, filter_member, filter_category, filter_status, as_of),
+                build_matrix_view, store, member_name, filter_member, filter_category, filter_status, as_of,
+                label="Building matrix"
             )
+            if matrix_view is not None:
+                filtered_df, csv = matrix_view
+                st.dataframe(filtered_df, use_container_width=True, hide_index=True)
+                
+                st.download_button(
+                    "📥 Download Matrix as CSV",
+                    csv,
+                    "training_matrix.csv",
+                    "text/csv",
+                    use_container_width=True
+                )
         else:
             st.info("No training matrix data to display")
+    
+    with tab4:
+        st.subheader("Suggested Resources for Open Skill Gaps")
+        st.markdown("Learning resources and Sytner courses that colleagues completed, ranked by how closely they match each gap")
+        
+        recommend_member = st.selectbox("Team Member", [None] + team_members, format_func=member_filter_label, key="recommend_member")
+        gaps = store.query('training_matrix', member=recommend_member, completed=False, order_by='target_date')
+        suggestions = get_recommendations(team_id, roster).recommendations(gaps)
+        
+        if suggestions:
+            for gap, rows in suggestions:
+                st.markdown(f"**{member_name(gap['member_id'])} - {gap['skill_name']}** "
+                            f"({gap['category']}, {gap['current_level']} → {gap['required_level']}, due {gap['target_date']})")
+                if rows:
+                    st.dataframe(pd.DataFrame({
+                        'Suggestion': [r.title for r in rows],
+                        'Source': ["Learning Resource" if r.collection == 'learning_resources' else "Sytner Course" for r in rows],
+                        'Type/Location': [r.kind for r in rows],
+                        'Cost (£)': [round(r.cost, 2) for r in rows],
+                        'Colleagues Completed': [r.colleagues for r in rows]
+                    }), use_container_width=True, hide_index=True)
+                else:
+                    st.caption("No completed resources or courses match this skill yet")
+        else:
+            st.success("✅ No open skill gaps")
           # ============================================
 # SYTNER TRAINING PAGE
 # ============================================
@@ -776,7 +946,8 @@ elif page == "🏢 Sytner Training":
     st.title("🏢 Sytner Training Bookings")
     st.markdown("Manage Sytner-specific training courses and bookings")
     
-    tab1, tab2 = st.tabs(["➕ Book Training", "📋 Manage Bookings"])
+    tab1, tab2, tab3 = st.tabs(["➕ Book Training", "📋 Manage Bookings", "📆 Capacity"])
+    intervals = get_intervals(team_id, roster)
     
     with tab1:
         st.subheader("Book Sytner Training")
@@ -785,10 +956,10 @@ elif page == "🏢 Sytner Training":
             col1, col2 = st.columns(2)
             
             with col1:
-                sytner_member = st.selectbox("Team Member", st.session_state.team_members, key="sytner_member")
+                sytner_member = st.selectbox("Team Member", team_members, format_func=member_name, key="sytner_member")
                 sytner_course = st.text_input("Course Name", placeholder="e.g., Sales Excellence Programme")
                 sytner_location = st.selectbox("Location", 
-                    ["Head Office", "Regional Centre", "Virtual", "On-site", "External Venue", "Other"])
+                    list(Location))
                 start_date = st.date_input("Start Date", datetime.now() + timedelta(days=14), key="sytner_start")
             
             with col2:
@@ -800,13 +971,27 @@ elif page == "🏢 Sytner Training":
             
             course_objectives = st.text_area("Course Objectives", height=80)
             booking_ref = st.text_input("Booking Reference (optional)")
+            book_anyway = st.checkbox("Book even if it clashes with other training")
             
             submitted = st.form_submit_button("Book Training", use_container_width=True)
             
+            clashes = []
+            if submitted:
+                if end_date < start_date:
+                    st.error("End date is before the start date")
+                    submitted = False
+                else:
+                    clashes = intervals.clashes(sytner_member, start_date, end_date)
+            if clashes:
+                st.warning(f"⚠️ {member_name(sytner_member)} is already booked on these dates:")
+                for clash in clashes:
+                    st.caption(f"{clash.label} ({clash.start} to {clash.end})")
+                if not book_anyway:
+                    st.info("Tick 'Book even if it clashes' to book anyway")
+                    submitted = False
             if submitted:
                 new_booking = {
-                    'id': len(st.session_state.sytner_bookings) + 1,
-                    'team_member': sytner_member,
+                    'member_id': sytner_member,
                     'course_name': sytner_course,
                     'location': sytner_location,
                     'start_date': start_date.isoformat(),
@@ -822,37 +1007,34 @@ elif page == "🏢 Sytner Training":
                     'feedback': None,
                     'created_at': datetime.now().isoformat()
                 }
-                st.session_state.sytner_bookings.append(new_booking)
-                save_data()
-                st.success(f"✅ Sytner training booked for {sytner_member}")
+                with undo.track("Book Sytner training"):
+                    store.append('sytner_bookings', new_booking)
+                st.success(f"✅ Sytner training booked for {member_name(sytner_member)}")
                 st.rerun()
     
     with tab2:
         st.subheader("Manage Sytner Training Bookings")
         
-        if st.session_state.sytner_bookings:
+        if data.sytner_bookings:
             col1, col2 = st.columns(2)
             with col1:
                 filter_sytner_member = st.selectbox("Filter by Team Member", 
-                    ["All"] + st.session_state.team_members, key="sytner_filter")
+                    [None] + team_members, format_func=member_filter_label, key="sytner_filter")
             with col2:
                 filter_sytner_status = st.selectbox("Filter by Status", 
                     ["All", "Booked", "In Progress", "Completed", "Cancelled"])
             
-            filtered_bookings = st.session_state.sytner_bookings.copy()
-            if filter_sytner_member != "All":
-                filtered_bookings = [b for b in filtered_bookings if b['team_member'] == filter_sytner_member]
-            if filter_sytner_status != "All":
-                filtered_bookings = [b for b in filtered_bookings if b['status'] == filter_sytner_status]
+            filtered_bookings = store.query('sytner_bookings', member=filter_sytner_member,
+                                            status=filter_value(filter_sytner_status))
             
             if filtered_bookings:
-                total_cost = sum(b['cost'] + b.get('expenses_estimate', 0) for b in filtered_bookings)
+                total_cost = sum(b['cost'] + b['expenses_estimate'] for b in filtered_bookings)
                 st.info(f"📊 {len(filtered_bookings)} booking(s) | Total Cost: £{total_cost:,.2f}")
                 
                 for booking in filtered_bookings:
                     status_emoji = {'Booked': '📅', 'In Progress': '🔄', 'Completed': '✅', 'Cancelled': '❌'}
                     
-                    with st.expander(f"{status_emoji.get(booking['status'], '📅')} {booking['team_member']} - {booking['course_name']} ({booking['start_date']})"):
+                    with st.expander(f"{status_emoji.get(booking['status'], '📅')} {member_name(booking['member_id'])} - {booking['course_name']} ({booking['start_date']})"):
                         col1, col2 = st.columns(2)
                         
                         with col1:
@@ -865,8 +1047,8 @@ elif page == "🏢 Sytner Training":
                             st.markdown(f"**Status:** {booking['status']}")
                             st.markdown(f"**Cost:** £{booking['cost']:,.2f}")
                             if booking['travel_required']:
-                                st.markdown(f"**Expenses:** £{booking.get('expenses_estimate', 0):,.2f}")
-                            if booking.get('booking_ref'):
+                                st.markdown(f"**Expenses:** £{booking['expenses_estimate']:,.2f}")
+                            if booking['booking_ref']:
                                 st.markdown(f"**Booking Ref:** {booking['booking_ref']}")
                         
                         st.markdown("---")
@@ -877,19 +1059,20 @@ elif page == "🏢 Sytner Training":
                             key=f"sytner_status_{booking['id']}")
                         
                         if new_status == "Completed":
-                            attendance = st.radio("Attendance", ["Attended", "Partial", "Did Not Attend"], 
+                            attendance = st.radio("Attendance", list(Attendance), 
                                 key=f"attendance_{booking['id']}")
                             feedback = st.text_area("Course Feedback", key=f"feedback_{booking['id']}")
                         
                         if st.button("Update Booking", key=f"update_sytner_{booking['id']}"):
-                            booking['status'] = new_status
+                            changes = {'status': new_status}
                             if new_status == "Completed":
-                                booking['completion_date'] = datetime.now().isoformat()
+                                changes['completion_date'] = datetime.now().isoformat()
                                 if 'attendance' in locals():
-                                    booking['attendance'] = attendance
+                                    changes['attendance'] = attendance
                                 if 'feedback' in locals():
-                                    booking['feedback'] = feedback
-                            save_data()
+                                    changes['feedback'] = feedback
+                            with undo.track("Update booking"):
+                                store.update('sytner_bookings', booking['id'], **changes)
                             st.success("Booking updated!")
                             st.rerun()
                         
@@ -897,6 +1080,37 @@ elif page == "🏢 Sytner Training":
                             st.info("💷 Remember to submit expenses claim for travel/accommodation")
         else:
             st.info("No Sytner training bookings yet")
+    
+    with tab3:
+        st.subheader("Staff Away per Day")
+        st.caption("Sytner bookings and in-person training plans")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            calendar_start = st.date_input("From", datetime.now(), key="capacity_start")
+        with col2:
+            calendar_weeks = st.selectbox("Weeks", [2, 4, 8, 13, 26], index=2)
+        calendar_end = calendar_start + timedelta(weeks=calendar_weeks, days=-1)
+        
+        away = intervals.away_calendar(calendar_start, calendar_end, set(team_members))
+        calendar_df = pd.DataFrame({
+            'Day': [day for day, _ in away],
+            'Staff Away': [len(member_ids) for _, member_ids in away]
+        }).set_index('Day')
+        st.bar_chart(calendar_df)
+        
+        half_team = max(1, len(team_members) // 2)
+        busy_days = [(day, member_ids) for day, member_ids in away if len(member_ids) >= half_team]
+        if busy_days:
+            st.warning(f"⚠️ {len(busy_days)} day(s) with half the team or more away")
+            busy_df = pd.DataFrame([{
+                'Day': day.strftime('%a %d %b %Y'),
+                'Away': len(member_ids),
+                'Who': ', '.join(member_name(member_id) for member_id in member_ids)
+            } for day, member_ids in busy_days])
+            st.dataframe(busy_df, use_container_width=True, hide_index=True)
+        else:
+            st.success("✅ At least half the team is in every day")
 
 # ============================================
 # LEARNING RESOURCES PAGE
@@ -905,7 +1119,7 @@ elif page == "📚 Learning Resources":
     st.title("📚 Learning Resources")
     st.markdown("Track books, licenses, courses, and other learning materials")
     
-    tab1, tab2 = st.tabs(["➕ Add Resource", "📋 Manage Resources"])
+    tab1, tab2, tab3 = st.tabs(["➕ Add Resource", "📋 Manage Resources", "📅 Renewals"])
     
     with tab1:
         st.subheader("Add Learning Resource")
@@ -914,11 +1128,10 @@ elif page == "📚 Learning Resources":
             col1, col2 = st.columns(2)
             
             with col1:
-                resource_member = st.selectbox("Assign to", st.session_state.team_members, key="resource_member")
+                resource_member = st.selectbox("Assign to", team_members, format_func=member_name, key="resource_member")
                 resource_title = st.text_input("Title/Name")
                 resource_type = st.selectbox("Type", 
-                    ["Book", "Online Course", "License/Subscription", "Certification", 
-                     "Conference", "Video Course", "Other"])
+                    list(ResourceType))
                 provider = st.text_input("Provider/Publisher", placeholder="e.g., Udemy, O'Reilly, LinkedIn Learning")
             
             with col2:
@@ -933,8 +1146,7 @@ elif page == "📚 Learning Resources":
             
             if submitted:
                 new_resource = {
-                    'id': len(st.session_state.learning_resources) + 1,
-                    'team_member': resource_member,
+                    'member_id': resource_member,
                     'title': resource_title,
                     'type': resource_type,
                     'provider': provider,
@@ -945,32 +1157,28 @@ elif page == "📚 Learning Resources":
                     'description': description,
                     'status': 'Not Started',
                     'completion_date': None,
-                    'created_at': datetime.now().isoformat(),
-                    'notes': []
+                    'created_at': datetime.now().isoformat()
                 }
-                st.session_state.learning_resources.append(new_resource)
-                save_data()
-                st.success(f"✅ Learning resource added for {resource_member}")
+                with undo.track("Add learning resource"):
+                    store.append('learning_resources', new_resource)
+                st.success(f"✅ Learning resource added for {member_name(resource_member)}")
                 st.rerun()
     
     with tab2:
         st.subheader("Manage Learning Resources")
         
-        if st.session_state.learning_resources:
+        if data.learning_resources:
             col1, col2 = st.columns(2)
             with col1:
                 filter_resource_member = st.selectbox("Filter by Team Member", 
-                    ["All"] + st.session_state.team_members, key="resource_filter")
+                    [None] + team_members, format_func=member_filter_label, key="resource_filter")
             with col2:
                 filter_resource_type = st.selectbox("Filter by Type", 
                     ["All", "Book", "Online Course", "License/Subscription", "Certification", 
                      "Conference", "Video Course", "Other"])
             
-            filtered_resources = st.session_state.learning_resources.copy()
-            if filter_resource_member != "All":
-                filtered_resources = [r for r in filtered_resources if r['team_member'] == filter_resource_member]
-            if filter_resource_type != "All":
-                filtered_resources = [r for r in filtered_resources if r['type'] == filter_resource_type]
+            filtered_resources = store.query('learning_resources', member=filter_resource_member,
+                                             type=filter_value(filter_resource_type))
             
             if filtered_resources:
                 total_investment = sum(r['cost'] for r in filtered_resources)
@@ -979,7 +1187,7 @@ elif page == "📚 Learning Resources":
                 for resource in filtered_resources:
                     status_emoji = {'Not Started': '📚', 'In Progress': '📖', 'Completed': '✅'}
                     
-                    with st.expander(f"{status_emoji.get(resource['status'], '📚')} {resource['team_member']} - {resource['title']} ({resource['type']})"):
+                    with st.expander(f"{status_emoji.get(resource['status'], '📚')} {member_name(resource['member_id'])} - {resource['title']} ({resource['type']})"):
                         col1, col2 = st.columns(2)
                         
                         with col1:
@@ -1006,22 +1214,160 @@ elif page == "📚 Learning Resources":
                         resource_note = st.text_input("Add Note", key=f"resource_note_{resource['id']}")
                         
                         if st.button("Update Resource", key=f"update_resource_{resource['id']}"):
-                            resource['status'] = new_resource_status
-                            if new_resource_status == 'Completed' and not resource.get('completion_date'):
-                                resource['completion_date'] = datetime.now().isoformat()
-                            if resource_note:
-                                resource['notes'].append({'date': datetime.now().isoformat(), 'note': resource_note})
-                            save_data()
+                            changes = {'status': new_resource_status}
+                            if new_resource_status == 'Completed' and not resource['completion_date']:
+                                changes['completion_date'] = datetime.now().isoformat()
+                            with undo.track("Update learning resource"):
+                                store.update('learning_resources', resource['id'], **changes)
+                                if resource_note:
+                                    store.notes.append('learning_resources', resource['id'], resource_note)
                             st.success("Resource updated!")
                             st.rerun()
                         
-                        if resource.get('notes'):
-                            st.markdown("**Notes:**")
-                            for note in resource['notes']:
-                                st.caption(f"{note['date']}: {note['note']}")
+                        render_notes(store.notes, 'learning_resources', resource['id'])
         else:
             st.info("No learning resources tracked yet")
-          # ============================================
+    
+    with tab3:
+        st.subheader("Expiries & Renewal Forecast")
+        
+        horizon = st.radio("Expiring within", [30, 90, 365], format_func=lambda d: f"{d} days",
+                           horizontal=True, key="renewal_horizon")
+        today = datetime.now().date()
+        # Listed from the expiry date index; totals come from the date-bucketed aggregates
+        expiring = store.query('learning_resources', expiry_date_from=today,
+                               expiry_date_before=today + timedelta(days=horizon + 1), order_by='expiry_date')
+        forecast = aggregates.renewal_forecast(horizon)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Expiring", sum(count for _, count, _ in forecast))
+        with col2:
+            st.metric("Renewals", sum(1 for r in expiring if r['type'] in RENEWABLE_TYPES))
+        with col3:
+            st.metric("Projected Renewal Spend", f"£{sum(cost for _, _, cost in forecast):,.2f}")
+        
+        if expiring:
+            expiring_df = pd.DataFrame([{
+                'Expires': r['expiry_date'],
+                'Days Left': (date.fromisoformat(r['expiry_date'][:10]) - today).days,
+                'Team Member': member_name(r['member_id']),
+                'Title': r['title'],
+                'Type': r['type'].value,
+                'Provider': r['provider'],
+                'Cost (£)': r['cost'],
+                'Renews': r['type'] in RENEWABLE_TYPES
+            } for r in expiring])
+            st.dataframe(expiring_df, use_container_width=True, hide_index=True)
+            st.download_button("📥 Download Expiries as CSV", expiring_df.to_csv(index=False),
+                               f"expiries_{horizon}d.csv", "text/csv", use_container_width=True)
+            
+            forecast_df = pd.DataFrame(forecast, columns=['Month', 'Expiring', 'Renewal Spend (£)'])
+            st.markdown("**Renewal spend by month**")
+            st.bar_chart(forecast_df.set_index('Month')['Renewal Spend (£)'])
+            st.download_button("📥 Download Forecast as CSV", forecast_df.to_csv(index=False),
+                               f"renewal_forecast_{horizon}d.csv", "text/csv", use_container_width=True)
+        else:
+            st.info(f"Nothing expires in the next {horizon} days")
+        
+        if len(team_ids) > 1:
+            st.markdown("**By team**")
+            per_team, _ = area_rollup(roster)
+            team_forecast_df = pd.DataFrame([{
+                'Team': team_names[tid],
+                'Expiring': sum(count for _, count, _ in per_team[tid].renewal_forecast(horizon)),
+                'Renewal Spend (£)': sum(cost for _, _, cost in per_team[tid].renewal_forecast(horizon))
+            } for tid in team_ids])
+            st.dataframe(team_forecast_df, use_container_width=True, hide_index=True)
+            st.download_button("📥 Download Team Forecast as CSV", team_forecast_df.to_csv(index=False),
+                               f"renewal_forecast_by_team_{horizon}d.csv", "text/csv", use_container_width=True)
+
+# ============================================
+# BULK IMPORT PAGE
+# ============================================
+elif page == "📥 Bulk Import":
+    st.title("📥 Bulk Import")
+    st.markdown("Add many records at once from a CSV file, one row per record")
+    
+    import_collection = st.selectbox("Import into", list(IMPORT_COLUMNS), format_func=IMPORT_LABELS.get)
+    
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.download_button("📄 Download CSV Template", template_csv(import_collection),
+                           f"{import_collection}_template.csv", "text/csv", use_container_width=True)
+    with col2:
+        with st.expander("Columns"):
+            for line in column_help(import_collection):
+                st.caption(line)
+    
+    uploaded = st.file_uploader("CSV file", type="csv", key=f"import_{import_collection}")
+    
+    if uploaded is not None:
+        col1, col2 = st.columns(2)
+        with col1:
+            check = st.button("🔍 Check File", use_container_width=True)
+        with col2:
+            run_import = st.button("📥 Import Valid Rows", type="primary", use_container_width=True)
+        
+        if check or run_import:
+            uploaded.seek(0)
+            try:
+                with st.spinner("Checking rows..."):
+                    result = import_csv(store, roster, team_id, import_collection, uploaded, dry_run=not run_import)
+            except ImportFileError as e:
+                st.error(f"❌ {e}")
+            else:
+                if run_import:
+                    st.success(f"✅ Imported {result.imported} of {result.rows} rows")
+                else:
+                    st.info(f"{result.imported} of {result.rows} rows are ready to import")
+                if result.ignored_columns:
+                    st.warning(f"⚠️ Ignored columns: {', '.join(result.ignored_columns)}")
+                if result.errors:
+                    st.error(f"❌ {result.error_count} rows have problems and are not imported")
+                    st.dataframe(pd.DataFrame(result.errors, columns=['Row', 'Problem']),
+                                 use_container_width=True, hide_index=True)
+
+# ============================================
+# EXPENSE RECONCILIATION PAGE
+# ============================================
+elif page == "🧾 Expense Reconciliation":
+    st.title("🧾 Expense Reconciliation")
+    st.markdown("Check Sytner travel estimates and expense-linked learning resources against an expense system export")
+    
+    expected = expected_claims(store)
+    st.caption(f"{len(expected)} items expect an expense claim")
+    
+    expense_file = st.file_uploader("Expense export (CSV with employee, date and amount columns)", type="csv")
+    
+    if expense_file is not None:
+        try:
+            with st.spinner("Matching expense lines..."):
+                expenses = read_expenses(expense_file, roster, team_id)
+                results_df = results_frame(reconcile(expected, expenses), member_name)
+        except ImportFileError as e:
+            st.error(f"❌ {e}")
+        else:
+            st.caption(f"{expenses.total:,} expense lines, {len(expenses.frame):,} for members of this team")
+            if expenses.ambiguous_members:
+                st.warning(f"⚠️ Claims for names shared by two team members are left unmatched: "
+                           f"{', '.join(expenses.ambiguous_members)}")
+            if expenses.unknown_members:
+                with st.expander(f"{len(expenses.unknown_members)} names not on this team"):
+                    st.write(", ".join(expenses.unknown_members))
+            
+            counts = results_df['Status'].value_counts()
+            for column, status in zip(st.columns(len(STATUSES)), STATUSES):
+                with column:
+                    st.metric(status, int(counts.get(status, 0)))
+            
+            show_statuses = st.multiselect("Show", list(STATUSES), default=[s for s in STATUSES if s != 'Matched'])
+            st.dataframe(results_df[results_df['Status'].isin(show_statuses)],
+                         use_container_width=True, hide_index=True)
+            st.download_button("📥 Download Reconciliation as CSV", results_df.to_csv(index=False),
+                               "expense_reconciliation.csv", "text/csv", use_container_width=True)
+
+# ============================================
 # REPORTS PAGE
 # ============================================
 elif page == "📈 Reports":
@@ -1030,32 +1376,18 @@ elif page == "📈 Reports":
     
     report_period = st.selectbox("Report Period", ["Last 30 days", "Last 90 days", "Last 6 months", "All Time"])
     
-    days_map = {"Last 30 days": 30, "Last 90 days": 90, "Last 6 months": 180, "All Time": 999999}
+    days_map = {"Last 30 days": 30, "Last 90 days": 90, "Last 6 months": 180, "All Time": None}
     days = days_map[report_period]
-    cutoff_date = datetime.now() - timedelta(days=days)
-    
+    if days is None:
+        since = date.min
+    else:
+        since = (datetime.now() - timedelta(days=days)).date() + timedelta(days=1)
     st.markdown("---")
     
     # Team Activity Overview
     st.subheader("Team Activity Overview")
     
-    activity_data = []
-    for member in st.session_state.team_members:
-        checkins = len([c for c in st.session_state.checkins 
-                       if c['team_member'] == member and datetime.fromisoformat(c['date']) >= cutoff_date])
-        actions = len([a for a in st.session_state.actions if a['team_member'] == member])
-        training_plans = len([t for t in st.session_state.training_plans 
-                             if t['team_member'] == member and t['status'] == 'In Progress'])
-        matrix_items = len([m for m in st.session_state.training_matrix 
-                           if m['team_member'] == member and not m['completed']])
-        
-        activity_data.append({
-            'Team Member': member,
-            'Check-ins': checkins,
-            'Active Actions': actions,
-            'Training Plans': training_plans,
-            'Matrix Items': matrix_items
-        })
+    activity_data = aggregates.activity(team_members, since, member_name)
     
     if activity_data:
         df = pd.DataFrame(activity_data)
@@ -1068,71 +1400,93 @@ elif page == "📈 Reports":
     
     with col1:
         st.subheader("Training Investment")
-        training_cost = sum(t.get('cost', 0) for t in st.session_state.training_plans)
-        sytner_cost = sum(b['cost'] + b.get('expenses_estimate', 0) for b in st.session_state.sytner_bookings)
-        resources_cost = sum(r['cost'] for r in st.session_state.learning_resources)
-        total_cost = training_cost + sytner_cost + resources_cost
+        investment = aggregates.investment()
         
-        st.metric("Training Plans", f"£{training_cost:,.2f}")
-        st.metric("Sytner Training", f"£{sytner_cost:,.2f}")
-        st.metric("Learning Resources", f"£{resources_cost:,.2f}")
-        st.metric("Total Investment", f"£{total_cost:,.2f}")
+        st.metric("Training Plans", f"£{investment['training']:,.2f}")
+        st.metric("Sytner Training", f"£{investment['sytner']:,.2f}")
+        st.metric("Learning Resources", f"£{investment['resources']:,.2f}")
+        st.metric("Total Investment", f"£{investment['total']:,.2f}")
     
     with col2:
         st.subheader("Completion Metrics")
         
-        if st.session_state.training_plans:
-            total_plans = len(st.session_state.training_plans)
-            completed_plans = len([t for t in st.session_state.training_plans if t['status'] == 'Completed'])
-            completion_rate = (completed_plans / total_plans * 100) if total_plans > 0 else 0
-            st.metric("Training Plans", f"{completed_plans}/{total_plans}", f"{completion_rate:.0f}%")
-        
-        if st.session_state.training_matrix:
-            total_matrix = len(st.session_state.training_matrix)
-            completed_matrix = len([m for m in st.session_state.training_matrix if m['completed']])
-            matrix_rate = (completed_matrix / total_matrix * 100) if total_matrix > 0 else 0
-            st.metric("Matrix Skills", f"{completed_matrix}/{total_matrix}", f"{matrix_rate:.0f}%")
-        
-        if st.session_state.sytner_bookings:
-            total_sytner = len(st.session_state.sytner_bookings)
-            completed_sytner = len([s for s in st.session_state.sytner_bookings if s['status'] == 'Completed'])
-            sytner_rate = (completed_sytner / total_sytner * 100) if total_sytner > 0 else 0
-            st.metric("Sytner Courses", f"{completed_sytner}/{total_sytner}", f"{sytner_rate:.0f}%")
+        for label, completed, total in aggregates.completion():
+            st.metric(label, f"{completed}/{total}", f"{completed / total * 100:.0f}%")
     
     st.markdown("---")
     
     # Export Section
     st.subheader("📥 Export Data")
     
-    col1, col2, col3, col4 = st.columns(4)
+    exports = [
+        ("Export Check-ins", 'checkins', "checkins_export.csv"),
+        ("Export Training Plans", 'training_plans', "training_plans_export.csv"),
+        ("Export Matrix", 'training_matrix', "training_matrix_export.csv"),
+        ("Export Sytner", 'sytner_bookings', "sytner_training_export.csv")
+    ]
+    for column, (label, collection, filename) in zip(st.columns(4), exports):
+        with column:
+            if st.button(label, use_container_width=True):
+                st.session_state[f"export_{collection}"] = True
+            if st.session_state.get(f"export_{collection}"):
+                # Exports include archived history and are built in the background;
+                # the same data version reuses the finished CSV
+                csv = job_result(jobs, (team_id, 'export', collection, data.version),
+                                 export_csv, store, collection, member_name, label="Building CSV")
+                if csv:
+                    st.download_button("Download CSV", csv, filename, "text/csv", key=f"download_{collection}")
+
+# ============================================
+# AREA OVERVIEW PAGE
+# ============================================
+elif page == "🗺️ Area Overview":
+    st.title("🗺️ Area Overview")
+    st.markdown("Roll-up across every team, built from each team's saved summary")
     
-    with col1:
-        if st.button("Export Check-ins", use_container_width=True):
-            if st.session_state.checkins:
-                df = pd.DataFrame(st.session_state.checkins)
-                csv = df.to_csv(index=False)
-                st.download_button("Download CSV", csv, "checkins_export.csv", "text/csv")
+    per_team, area_totals = area_rollup(roster)
+    week_ago = datetime.now().date() - timedelta(days=7)
     
+    col1, col2, col3, col4, col5 = st.columns(5)
+    area_stats = area_totals.quick_stats()
+    with col1:
+        st.metric("Teams", len(per_team))
     with col2:
-        if st.button("Export Training Plans", use_container_width=True):
-            if st.session_state.training_plans:
-                df = pd.DataFrame(st.session_state.training_plans)
-                csv = df.to_csv(index=False)
-                st.download_button("Download CSV", csv, "training_plans_export.csv", "text/csv")
-    
+        st.metric("Team Members", sum(len(team['members']) for team in roster.teams))
     with col3:
-        if st.button("Export Matrix", use_container_width=True):
-            if st.session_state.training_matrix:
-                df = pd.DataFrame(st.session_state.training_matrix)
-                csv = df.to_csv(index=False)
-                st.download_button("Download CSV", csv, "training_matrix_export.csv", "text/csv")
-    
+        st.metric("Active Actions", area_stats['active_actions'])
     with col4:
-        if st.button("Export Sytner", use_container_width=True):
-            if st.session_state.sytner_bookings:
-                df = pd.DataFrame(st.session_state.sytner_bookings)
-                csv = df.to_csv(index=False)
-                st.download_button("Download CSV", csv, "sytner_training_export.csv", "text/csv")
+        st.metric("Overdue Actions", area_stats['overdue_actions'])
+    with col5:
+        st.metric("Total Investment", f"£{area_totals.investment()['total']:,.0f}")
+    
+    st.markdown("---")
+    
+    team_rows = []
+    for team in roster.teams:
+        team_aggregates = per_team[team['id']]
+        team_stats = team_aggregates.quick_stats()
+        matrix_total = team_aggregates.get('matrix')
+        matrix_completed = team_aggregates.get('matrix_completed')
+        team_rows.append({
+            'Team': team['name'],
+            'Manager': team['manager'],
+            'Members': len(team['members']),
+            'Check-ins (7d)': team_aggregates.checkins_since(week_ago),
+            'Due a Check-in': sum(c.overdue for c in team_aggregates.cadence(team['members'])),
+            'Open Follow-ups': sum(team_aggregates.get('member_follow_ups', m) for m in team['members']),
+            'Active Actions': team_stats['active_actions'],
+            'Overdue Actions': team_stats['overdue_actions'],
+            'Active Training': team_stats['active_training'],
+            'Upcoming Sytner': team_stats['upcoming_sytner'],
+            'Matrix Completion': f"{(matrix_completed / matrix_total * 100) if matrix_total else 0:.0f}%",
+            'Investment': f"£{team_aggregates.investment()['total']:,.2f}"
+        })
+    
+    if team_rows:
+        df = pd.DataFrame(team_rows)
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        st.download_button("📥 Download Area Overview as CSV", df.to_csv(index=False),
+            "area_overview.csv", "text/csv", use_container_width=True)
 
 # Footer
 st.sidebar.markdown("---")
@@ -0,0 +1,69 @@
+"""
+Training plan approval queue for Manager Hub & TAG Training
+
+Pending plans are read from the approval_status index of each team's
+store, so building the queue only touches pending plans however many
+plans there are. Plans can come from one team or several, and a batch of
+decisions is written as one update per team.
+"""
+
+import heapq
+from datetime import date
+
+from records import Priority
+
+QUEUE_LIMIT = 500
+
+# Queue order -> (label, sort key for (team_id, plan))
+QUEUE_ORDERS = {
+    'cost': ("Cost (highest first)", lambda item: (-item[1]['cost'], item[1]['start_date'])),
+    'start_date': ("Start date (soonest first)", lambda item: (item[1]['start_date'], -item[1]['cost'])),
+    'priority': ("Priority (highest first)",
+                 lambda item: (-item[1]['priority'].code, item[1]['start_date'], -item[1]['cost']))
+}
+
+
+def pending_count(stores):
+    return sum(len(store.query('training_plans', approval_status='Pending')) for store in stores.values())
+
+
+def pending_queue(stores, order='cost', limit=QUEUE_LIMIT):
+    """[(team_id, plan)] waiting for approval in {team_id: store}, in queue order."""
+    _, key = QUEUE_ORDERS[order]
+    items = []
+    for team_id, store in stores.items():
+        if order == 'priority':
+            plans = []
+            for priority in sorted(Priority, key=lambda p: -p.code):
+                plans += store.query('training_plans', approval_status='Pending', priority=priority,
+                                     order_by='start_date', limit=limit - len(plans))
+                if len(plans) >= limit:
+                    break
+        else:
+            plans = store.query('training_plans', approval_status='Pending', order_by=order,
+                                descending=order == 'cost', limit=limit)
+        items += [(team_id, plan) for plan in plans]
+    return heapq.nsmallest(limit, items, key=key)
+
+
+def approved_spend(stores, since=None):
+    """Cost of approved plans starting on or after since (default 1 January this year)."""
+    since = since or date(date.today().year, 1, 1)
+    return sum(plan['cost']
+               for store in stores.values()
+               for plan in store.query('training_plans', approval_status='Approved', start_date_from=since))
+
+
+def decide(stores, selected, decision):
+    """Set approval_status to decision for [(team_id, plan_id)], one write per team.
+
+    Plans that are no longer pending (decided in another session) are left alone.
+    """
+    by_team = {}
+    for team_id, plan_id in selected:
+        plan = stores[team_id].get('training_plans', plan_id)
+        if plan is not None and plan['approval_status'] == 'Pending':
+            by_team.setdefault(team_id, {})[plan_id] = {'approval_status': decision}
+    for team_id, changes in by_team.items():
+        stores[team_id].update_many('training_plans', changes)
+    return sum(len(changes) for changes in by_team.values())
@@ -0,0 +1,401 @@
+"""
+Incremental backups for Manager Hub & TAG Training
+
+Backs up the data directory into a content-addressed repository:
+
+    backups/
+        chunks/ab/ab12...    zlib-compressed chunk, named by the BLAKE2b of its contents
+        snapshots/<id>.json  every file in the data directory and the chunks it is made of
+
+Files are cut into chunks on line boundaries, and where a line ends a
+chunk depends only on that line's contents. Collection files are one
+record per line and the change feed only grows, so editing a few records
+changes only the chunks around them and the rest are shared with earlier
+snapshots. Files whose size and mtime match the previous snapshot are not
+read at all. The .jsonl files (change feed, notes, rejected records) are
+only ever appended to, so when one has grown in place only its end is
+read, from the start of its last chunk in the previous snapshot, provided
+that chunk still hashes the same. A nightly backup therefore reads, hashes
+and stores roughly what changed that day.
+
+Every collection file is replaced atomically by the app, so each file in a
+snapshot is a complete version of itself. Restores check every chunk and
+every file against their hashes (for an appended file, the hash of its
+list of chunks). The columnar copies and report packs are
+derived from the JSON files and are not backed up.
+
+Usage:
+    python backup.py backup                       # data/ -> backups/
+    python backup.py list
+    python backup.py restore --at "2026-10-01 23:00" --target restored
+    python backup.py verify
+    python backup.py prune --keep 30
+"""
+
+import argparse
+import hashlib
+import time
+import zlib
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+
+from codec import atomic_write, read_json, write_json
+
+DEFAULT_REPO = 'backups'
+CHUNKS_DIR = 'chunks'
+SNAPSHOTS_DIR = 'snapshots'
+COMPRESSION_LEVEL = 6
+# A line ends a chunk when the low bits of its CRC are zero (about one line
+# in 256), once the chunk is MIN_CHUNK bytes; no chunk grows past MAX_CHUNK
+BOUNDARY_MASK = 0xFF
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 1024 * 1024
+# Derived from the JSON files, so rebuilt rather than backed up
+SKIP_DIRS = ('columns', 'reports')
+SKIP_SUFFIXES = ('.tmp',)
+# Only ever appended to by the app, so a grown file is read from where it was
+APPEND_ONLY_SUFFIXES = ('.jsonl',)
+# A file that changes while it is read is read again, this many times
+READ_ATTEMPTS = 3
+
+BackupStats = namedtuple('BackupStats', 'snapshot_id files files_read chunks new_chunks bytes_read bytes_stored seconds')
+VerifyResult = namedtuple('VerifyResult', 'snapshots chunks missing corrupt')
+
+
+class BackupError(Exception):
+    pass
+
+
+def chunk_hash(data):
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def file_hash(data):
+    return hashlib.blake2b(data, digest_size=32).hexdigest()
+
+
+def chunks_hash(digests):
+    """Hash of a file's chunk list, for files only read from where they were appended to."""
+    return file_hash(''.join(digests).encode('ascii'))
+
+
+def split_chunks(data):
+    """Cut data into chunks at content-defined line boundaries."""
+    chunks = []
+    start = 0
+    pos = 0
+    end = len(data)
+    while pos < end:
+        newline = data.find(b'\n', pos, start + MAX_CHUNK)
+        if newline == -1:
+            pos = min(end, start + MAX_CHUNK)
+            chunks.append(data[start:pos])
+            start = pos
+            continue
+        line_end = newline + 1
+        if line_end - start >= MIN_CHUNK and zlib.crc32(data[pos:line_end]) & BOUNDARY_MASK == 0:
+            chunks.append(data[start:line_end])
+            start = line_end
+        pos = line_end
+    if start < end:
+        chunks.append(data[start:])
+    return chunks
+
+
+def parse_when(text):
+    """datetime for --at; a bare date means the end of that day."""
+    when = datetime.fromisoformat(text)
+    if len(text) <= 10:
+        when = when.replace(hour=23, minute=59, second=59)
+    return when
+
+
+def data_files(data_dir, skip=None):
+    """{relative posix path: Path} for every file to back up."""
+    data_dir = Path(data_dir).resolve()
+    files = {}
+    for path in sorted(data_dir.rglob('*')):
+        relative = path.relative_to(data_dir)
+        if (not path.is_file() or path.name.endswith(SKIP_SUFFIXES)
+                or any(part in SKIP_DIRS for part in relative.parts[:-1])
+                or (skip is not None and skip in path.parents)):
+            continue
+        files[relative.as_posix()] = path
+    return files
+
+
+def _read_stable(path, offset=0):
+    """(bytes from offset on, stat) of a file, re-read if it changes underneath us."""
+    for _ in range(READ_ATTEMPTS):
+        before = path.stat()
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        after = path.stat()
+        if ((before.st_size, before.st_mtime_ns) == (after.st_size, after.st_mtime_ns)
+                and offset + len(data) == after.st_size):
+            return data, after
+    raise BackupError(f"{path} kept changing while it was read")
+
+
+class BackupRepo:
+    """A content-addressed backup repository."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.chunks_dir = self.path / CHUNKS_DIR
+        self.snapshots_dir = self.path / SNAPSHOTS_DIR
+        self.chunks_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+
+    def snapshots(self):
+        """Snapshot ids, oldest first."""
+        return sorted(path.stem for path in self.snapshots_dir.glob('*.json'))
+
+    def load(self, snapshot_id):
+        try:
+            return read_json(self.snapshots_dir / f"{snapshot_id}.json")
+        except FileNotFoundError:
+            raise BackupError(f"No snapshot {snapshot_id}") from None
+
+    def resolve(self, snapshot_id=None, at=None):
+        """The given snapshot, the latest one taken at or before `at`, or the latest."""
+        if snapshot_id is not None:
+            self.load(snapshot_id)
+            return snapshot_id
+        for candidate in reversed(self.snapshots()):
+            if at is None or datetime.fromisoformat(self.load(candidate)['created']) <= at:
+                return candidate
+        raise BackupError("No snapshot" + (f" taken by {at:%Y-%m-%d %H:%M}" if at else "s yet"))
+
+    def _chunk_path(self, digest):
+        return self.chunks_dir / digest[:2] / digest
+
+    def has_chunk(self, digest):
+        return self._chunk_path(digest).exists()
+
+    def put_chunk(self, digest, data):
+        """Store a chunk unless it is already there; returns the bytes written."""
+        path = self._chunk_path(digest)
+        if path.exists():
+            return 0
+        path.parent.mkdir(exist_ok=True)
+        packed = zlib.compress(data, COMPRESSION_LEVEL)
+        atomic_write(path, lambda f: f.write(packed))
+        return len(packed)
+
+    def get_chunk(self, digest):
+        try:
+            data = zlib.decompress(self._chunk_path(digest).read_bytes())
+        except FileNotFoundError:
+            raise BackupError(f"Chunk {digest} is missing") from None
+        except zlib.error:
+            raise BackupError(f"Chunk {digest} is corrupt") from None
+        if chunk_hash(data) != digest:
+            raise BackupError(f"Chunk {digest} is corrupt")
+        return data
+
+    def _appended(self, path, stat, entry):
+        """(unchanged chunk digests, the bytes after them, stat) for an append-only file
+        that has grown since entry was taken, or None to read it whole.
+        """
+        if entry.get('inode') != stat.st_ino or stat.st_size <= entry['size'] or not entry['chunks']:
+            return None
+        try:
+            last = self.get_chunk(entry['chunks'][-1])
+        except BackupError:
+            return None
+        # Chunk boundaries only depend on where the chunk started, so chunking
+        # from the start of the last chunk cuts what follows as a full read would
+        tail, stat = _read_stable(path, entry['size'] - len(last))
+        if chunk_hash(tail[:len(last)]) != entry['chunks'][-1]:
+            return None
+        return entry['chunks'][:-1], tail, stat
+
+    def backup(self, data_dir):
+        """Snapshot data_dir, reading only files changed since the last snapshot."""
+        started = time.perf_counter()
+        previous = self.snapshots()
+        previous_files = self.load(previous[-1])['files'] if previous else {}
+        files = {}
+        files_read = bytes_read = bytes_stored = new_chunks = 0
+        for name, path in data_files(data_dir, skip=self.path.resolve()).items():
+            stat = path.stat()
+            entry = previous_files.get(name)
+            if entry is not None and (entry['size'], entry['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+                files[name] = entry
+                continue
+            appended = None
+            if entry is not None and name.endswith(APPEND_ONLY_SUFFIXES):
+                appended = self._appended(path, stat, entry)
+            if appended is not None:
+                digests, data, stat = appended
+            else:
+                digests = []
+                data, stat = _read_stable(path)
+            files_read += 1
+            bytes_read += len(data)
+            for chunk in split_chunks(data):
+                digest = chunk_hash(chunk)
+                stored = self.put_chunk(digest, chunk)
+                new_chunks += stored > 0
+                bytes_stored += stored
+                digests.append(digest)
+            files[name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'inode': stat.st_ino,
+                           'chunks': digests}
+            if appended is not None:
+                files[name]['chunks_hash'] = chunks_hash(digests)
+            else:
+                files[name]['hash'] = file_hash(data)
+
+        now = datetime.now()
+        snapshot_id = now.strftime('%Y%m%d-%H%M%S')
+        suffix = 1
+        while (self.snapshots_dir / f"{snapshot_id}.json").exists():
+            snapshot_id = f"{now:%Y%m%d-%H%M%S}-{suffix}"
+            suffix += 1
+        # Written last, so an interrupted backup leaves only unreferenced chunks
+        write_json(self.snapshots_dir / f"{snapshot_id}.json", {
+            'id': snapshot_id,
+            'created': now.isoformat(timespec='seconds'),
+            'data_dir': str(Path(data_dir).resolve()),
+            'stats': {'files_read': files_read, 'bytes_read': bytes_read,
+                      'new_chunks': new_chunks, 'bytes_stored': bytes_stored},
+            'files': files
+        })
+        chunks = sum(len(entry['chunks']) for entry in files.values())
+        return BackupStats(snapshot_id, len(files), files_read, chunks, new_chunks,
+                           bytes_read, bytes_stored, time.perf_counter() - started)
+
+    def restore(self, snapshot_id, target, force=False):
+        """Write a snapshot's files into target; returns (files, bytes).
+
+        A non-empty target needs force, and then backed-up files that were
+        not in the snapshot are removed.
+        """
+        target = Path(target)
+        files = self.load(snapshot_id)['files']
+        if target.exists() and any(target.iterdir()) and not force:
+            raise BackupError(f"{target} is not empty (use --force to restore over it)")
+        total = 0
+        for name, entry in files.items():
+            data = b''.join(self.get_chunk(digest) for digest in entry['chunks'])
+            if 'hash' in entry:
+                matches = file_hash(data) == entry['hash']
+            else:
+                matches = chunks_hash(entry['chunks']) == entry['chunks_hash']
+            if len(data) != entry['size'] or not matches:
+                raise BackupError(f"{name} does not match its hash in snapshot {snapshot_id}")
+            path = target / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write(path, lambda f: f.write(data))
+            total += len(data)
+        if target.exists():
+            for name, path in data_files(target, skip=self.path.resolve()).items():
+                if name not in files:
+                    path.unlink()
+        return len(files), total
+
+    def referenced(self, snapshot_ids=None):
+        digests = set()
+        for snapshot_id in self.snapshots() if snapshot_ids is None else snapshot_ids:
+            for entry in self.load(snapshot_id)['files'].values():
+                digests.update(entry['chunks'])
+        return digests
+
+    def verify(self, snapshot_ids=None, quick=False):
+        """Check every chunk the snapshots use exists and, unless quick, matches its hash."""
+        snapshot_ids = self.snapshots() if snapshot_ids is None else snapshot_ids
+        digests = self.referenced(snapshot_ids)
+        missing, corrupt = [], []
+        for digest in sorted(digests):
+            if not self.has_chunk(digest):
+                missing.append(digest)
+            elif not quick:
+                try:
+                    self.get_chunk(digest)
+                except BackupError:
+                    corrupt.append(digest)
+        return VerifyResult(len(snapshot_ids), len(digests), missing, corrupt)
+
+    def prune(self, keep):
+        """Keep the newest `keep` snapshots and delete chunks no snapshot uses.
+
+        Returns (snapshots removed, chunks removed, bytes freed).
+        """
+        snapshot_ids = self.snapshots()
+        removed = snapshot_ids[:max(0, len(snapshot_ids) - keep)]
+        for snapshot_id in removed:
+            (self.snapshots_dir / f"{snapshot_id}.json").unlink()
+        used = self.referenced()
+        chunks = freed = 0
+        for path in self.chunks_dir.glob('*/*'):
+            if path.name not in used:
+                freed += path.stat().st_size
+                path.unlink()
+                chunks += 1
+        return len(removed), chunks, freed
+
+
+def _mb(size):
+    return f"{size / 1e6:.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up and restore Manager Hub data")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--repo', default=DEFAULT_REPO, help="Backup repository folder")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('backup', help="Take a snapshot of the data directory")
+    subparsers.add_parser('list', help="List snapshots")
+    restore_parser = subparsers.add_parser('restore', help="Restore a snapshot into a folder")
+    restore_parser.add_argument('snapshot', nargs='?', help="Snapshot id (default the latest)")
+    restore_parser.add_argument('--at', type=parse_when, help="Latest snapshot taken by this time (YYYY-MM-DD [HH:MM])")
+    restore_parser.add_argument('--target', required=True, help="Folder to restore into")
+    restore_parser.add_argument('--force', action='store_true', help="Restore over a non-empty folder")
+    verify_parser = subparsers.add_parser('verify', help="Check the chunks every snapshot needs")
+    verify_parser.add_argument('snapshot', nargs='?', help="Only this snapshot")
+    verify_parser.add_argument('--quick', action='store_true', help="Only check the chunks exist")
+    prune_parser = subparsers.add_parser('prune', help="Drop old snapshots and unused chunks")
+    prune_parser.add_argument('--keep', type=int, required=True, help="Snapshots to keep")
+    args = parser.parse_args()
+
+    repo = BackupRepo(args.repo)
+    try:
+        if args.command == 'backup':
+            if not Path(args.data_dir).is_dir():
+                raise BackupError(f"No data directory at {args.data_dir}")
+            stats = repo.backup(args.data_dir)
+            print(f"✅ Snapshot {stats.snapshot_id}: {stats.files} files in {stats.seconds:.2f}s")
+            print(f"   - Read {stats.files_read} changed file(s), {_mb(stats.bytes_read)}")
+            print(f"   - Stored {stats.new_chunks} new of {stats.chunks} chunks, {_mb(stats.bytes_stored)} compressed")
+        elif args.command == 'list':
+            for snapshot_id in repo.snapshots():
+                snapshot = repo.load(snapshot_id)
+                size = sum(entry['size'] for entry in snapshot['files'].values())
+                print(f"   - {snapshot_id}  {snapshot['created']}  {len(snapshot['files'])} files, {_mb(size)} "
+                      f"(+{_mb(snapshot['stats']['bytes_stored'])} stored)")
+        elif args.command == 'restore':
+            snapshot_id = repo.resolve(args.snapshot, args.at)
+            files, size = repo.restore(snapshot_id, args.target, args.force)
+            print(f"✅ Restored snapshot {snapshot_id} to {args.target}: {files} files, {_mb(size)}")
+        elif args.command == 'verify':
+            result = repo.verify([repo.resolve(args.snapshot)] if args.snapshot else None, args.quick)
+            for digest in result.missing:
+                print(f"   - Missing chunk {digest}")
+            for digest in result.corrupt:
+                print(f"   - Corrupt chunk {digest}")
+            if result.missing or result.corrupt:
+                raise BackupError(f"{len(result.missing)} missing and {len(result.corrupt)} corrupt chunk(s)")
+            print(f"✅ {result.snapshots} snapshot(s), {result.chunks} chunks OK")
+        elif args.command == 'prune':
+            snapshots, chunks, freed = repo.prune(max(args.keep, 1))
+            print(f"✅ Removed {snapshots} snapshot(s) and {chunks} unused chunk(s), freed {_mb(freed)}")
+    except BackupError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
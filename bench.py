@@ -0,0 +1,185 @@
+"""
+Benchmarks for Manager Hub & TAG Training data paths
+
+Builds a synthetic team from the demo data scaled up to --rows records
+per collection in a temporary directory, then times each path. The
+backup section takes a full and a nightly (a few records changed) backup
+and checks a restore matches the data byte for byte.
+
+Usage:
+    python bench.py
+    python bench.py --rows 100000 --repeat 5
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+import codec
+from backup import BackupRepo, data_files
+from columnar import load_frame, read_columns, write_columns
+from data_utils import COLLECTIONS, DataStore
+from roster import Roster
+
+GENERATOR = Path(__file__).resolve().parent / 'generate_enhanced_data.py'
+MEMBERS = 50
+EXPORTS = ('checkins', 'training_plans', 'training_matrix', 'sytner_bookings')
+
+
+def build_team(work_dir, rows):
+    """Demo team with every collection cycled out to `rows` records."""
+    subprocess.run([sys.executable, str(GENERATOR)], cwd=work_dir, check=True, stdout=subprocess.DEVNULL)
+    roster = Roster(Path(work_dir) / 'data')
+    team_dir = roster.team_dir('default')
+    store = DataStore(team_dir, change_log=False, migrations=[roster.member_migration('default')])
+    snapshot = store.snapshot()
+    for collection in COLLECTIONS:
+        templates = snapshot[collection]
+        store._save(collection, tuple(
+            templates[i % len(templates)].replace(id=i + 1, member_id=i % MEMBERS + 1)
+            for i in range(rows)))
+    return team_dir
+
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def codec_results(path, repeat):
+    """Load/save throughput and peak memory for one collection file, per JSON backend."""
+    records = list(codec.iter_array(path))
+    pretty_path = path.with_name('pretty.json')
+    with open(pretty_path, 'w') as f:
+        json.dump(records, f, indent=2)
+    mb = path.stat().st_size / 1e6
+
+    def legacy_load():
+        with open(pretty_path, 'r') as f:
+            json.load(f)
+
+    def legacy_save():
+        with open(pretty_path, 'w') as f:
+            json.dump(records, f, indent=2)
+
+    rows = [('stdlib json, indent=2', 'load', best_of(repeat, legacy_load), peak_memory(legacy_load)),
+            ('stdlib json, indent=2', 'save', best_of(repeat, legacy_save), None)]
+    backends = [('codec (stdlib)', None)]
+    if codec.orjson is not None:
+        backends.append(('codec (orjson)', codec.orjson))
+    installed = codec.orjson
+    try:
+        for name, backend in backends:
+            codec.orjson = backend
+            load = lambda: codec.read_json(path)
+            stream = lambda: sum(1 for _ in codec.iter_array(path))
+            save = lambda: codec.write_array(path, records)
+            rows.append((name, 'load', best_of(repeat, load), peak_memory(load)))
+            rows.append((name, 'stream', best_of(repeat, stream), peak_memory(stream)))
+            rows.append((name, 'save', best_of(repeat, save), None))
+    finally:
+        codec.orjson = installed
+    return mb, rows
+
+
+def backup_results(data_dir, repo_dir, store, changed=10):
+    """[(step, seconds, bytes read, bytes stored)] for a full and a nightly backup, then a checked restore."""
+    repo = BackupRepo(repo_dir)
+    rows = []
+    stats = repo.backup(data_dir)
+    rows.append(('Full backup', stats.seconds, stats.bytes_read, stats.bytes_stored))
+    actions = store.snapshot().actions
+    store.update_many('actions', {a['id']: {'notes': 'Nightly change'}
+                                  for a in actions[::max(1, len(actions) // changed)][:changed]})
+    stats = repo.backup(data_dir)
+    rows.append((f'Nightly backup ({changed} actions changed)', stats.seconds, stats.bytes_read, stats.bytes_stored))
+
+    target = Path(repo_dir).parent / 'restored'
+    start = time.perf_counter()
+    repo.restore(stats.snapshot_id, target)
+    rows.append(('Restore', time.perf_counter() - start, None, None))
+    restored = data_files(target)
+    for name, path in data_files(data_dir, skip=repo.path.resolve()).items():
+        if path.read_bytes() != restored[name].read_bytes():
+            raise AssertionError(f"Restored {name} differs from the original")
+    return rows
+
+
+def matrix_view(df):
+    df = df[(df['category'] == 'Technical') & ~df['completed']]
+    return df.groupby('member_id').size()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Manager Hub data paths")
+    parser.add_argument('--rows', type=int, default=20000, help="Records per collection")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        team_dir = build_team(work_dir, args.rows)
+        size = sum((team_dir / filename).stat().st_size for filename in COLLECTIONS.values())
+        print(f"📊 {args.rows:,} records per collection, {size / 1e6:.1f} MB of JSON")
+
+        store = DataStore(team_dir, change_log=False)
+        results = {}
+        results['Cold start: load JSON store'] = best_of(
+            args.repeat, lambda: DataStore(team_dir, change_log=False))
+        results['Write columnar copy'] = best_of(args.repeat, lambda: write_columns(store))
+        results['Cold start: map columnar copy'] = best_of(
+            args.repeat, lambda: [read_columns(team_dir, c) for c in COLLECTIONS])
+
+        def json_reports():
+            snapshot = DataStore(team_dir, change_log=False).snapshot(include_archive=True)
+            frames = {c: pd.DataFrame([r.to_json() for r in snapshot[c]]) for c in EXPORTS}
+            matrix_view(frames['training_matrix'])
+
+        def columnar_reports():
+            frames = {c: read_columns(team_dir, c) for c in EXPORTS}
+            matrix_view(frames['training_matrix'])
+
+        results['Reports + Matrix View from JSON'] = best_of(args.repeat, json_reports)
+        results['Reports + Matrix View from columns'] = best_of(args.repeat, columnar_reports)
+        results['Matrix View, warm store (load_frame)'] = best_of(
+            args.repeat, lambda: matrix_view(load_frame(store, 'training_matrix')))
+
+        backup_rows = backup_results(Path(work_dir) / 'data', Path(work_dir) / 'backups', store)
+        mb, codec_rows = codec_results(team_dir / COLLECTIONS['checkins'], args.repeat)
+
+    width = max(len(name) for name in results)
+    for name, seconds in results.items():
+        print(f"   - {name:<{width}}  {seconds * 1000:9.1f} ms")
+
+    print(f"\n📊 checkins.json, {mb:.1f} MB compact (rates in compact MB/s)")
+    for name, operation, seconds, peak in codec_rows:
+        peak_text = f"  peak {peak / 1e6:7.1f} MB" if peak is not None else ""
+        print(f"   - {name:<22} {operation:<6}  {mb / seconds:7.1f} MB/s{peak_text}")
+
+    print("\n📊 Backups (restore checked byte for byte)")
+    for name, seconds, read, stored in backup_rows:
+        sizes = f"  read {read / 1e6:6.1f} MB, stored {stored / 1e6:6.2f} MB" if read is not None else ""
+        print(f"   - {name:<36} {seconds * 1000:9.1f} ms{sizes}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+"""
+Bulk CSV import for Manager Hub & TAG Training
+
+Adds training matrix items, actions, Sytner bookings or learning
+resources from a CSV file (one row per record), e.g. a new compliance
+skill for every member of a team. The file is read in chunks of
+CHUNK_ROWS rows and each chunk is checked column by column with pandas:
+enum values, dates, amounts, yes/no flags and team members. Rows that
+fail are reported with their spreadsheet row number; every other row is
+added in one store transaction, so an import is a single new version and
+a single file write however many rows it has. Checked rows are handed to
+the store a chunk at a time rather than gathered first, so besides the
+records themselves an import holds one chunk in memory.
+
+Members are given by name (team_member) or id (member_id) and must be on
+the team. Dates are YYYY-MM-DD or DD/MM/YYYY. Header names are matched
+case-insensitively, and spaces count as underscores.
+
+Usage:
+    python bulk_import.py training_matrix compliance.csv --team north
+    python bulk_import.py actions actions.csv --team north --dry-run
+    python bulk_import.py learning_resources --template > resources.csv
+"""
+
+import argparse
+import sys
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from data_utils import StoreLockedError
+from records import (ActionCategory, ActionOwner, ActionStatus, BookingStatus, IsoDate, Level,
+                     Location, Priority, ResourceStatus, ResourceType, SkillCategory, skill_completed)
+from roster import Roster, open_team, read_team
+
+CHUNK_ROWS = 5000
+# Row errors kept for the report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+REQUIRED = object()
+
+# collection -> {column: (type, default)}; REQUIRED columns must be present
+# and filled in, the others fall back to their default when missing or
+# blank (None means the default is worked out from other columns)
+IMPORT_COLUMNS = {
+    'training_matrix': {
+        'skill_name': (str, REQUIRED),
+        'category': (SkillCategory, REQUIRED),
+        'required_level': (Level, REQUIRED),
+        'current_level': (Level, 'None'),
+        'priority': (Priority, 'Medium'),
+        'target_date': (IsoDate, REQUIRED),
+        'training_method': (str, '')
+    },
+    'actions': {
+        'action': (str, REQUIRED),
+        'priority': (Priority, 'Medium'),
+        'owner': (ActionOwner, 'Manager'),
+        'due_date': (IsoDate, REQUIRED),
+        'category': (ActionCategory, 'Other'),
+        'status': (ActionStatus, None),
+        'notes': (str, '')
+    },
+    'sytner_bookings': {
+        'course_name': (str, REQUIRED),
+        'location': (Location, REQUIRED),
+        'start_date': (IsoDate, REQUIRED),
+        'end_date': (IsoDate, REQUIRED),
+        'cost': (float, 0.0),
+        'travel_required': (bool, False),
+        'expenses_estimate': (float, 0.0),
+        'objectives': (str, ''),
+        'booking_ref': (str, ''),
+        'status': (BookingStatus, 'Booked')
+    },
+    'learning_resources': {
+        'title': (str, REQUIRED),
+        'type': (ResourceType, REQUIRED),
+        'provider': (str, ''),
+        'cost': (float, 0.0),
+        'assigned_date': (IsoDate, None),
+        'expiry_date': (IsoDate, None),
+        'link_to_expenses': (bool, False),
+        'description': (str, ''),
+        'status': (ResourceStatus, 'Not Started')
+    }
+}
+
+IMPORT_LABELS = {
+    'training_matrix': "Training matrix skills",
+    'actions': "Actions",
+    'sytner_bookings': "Sytner bookings",
+    'learning_resources': "Learning resources"
+}
+
+# Fields that identify a record, so the same row is not imported twice
+UNIQUE_FIELDS = {
+    'training_matrix': (('member_id', 'skill_name'), "the member already has this skill")
+}
+
+MEMBER_COLUMNS = ('team_member', 'member_id')
+FLAG_VALUES = {'true': True, 'yes': True, 'y': True, '1': True,
+               'false': False, 'no': False, 'n': False, '0': False}
+
+ImportResult = namedtuple('ImportResult', 'rows imported errors error_count ignored_columns')
+
+
+class ImportFileError(ValueError):
+    """The file as a whole cannot be imported (no header, missing columns)."""
+
+
+def template_csv(collection):
+    """Header row for a collection's import file."""
+    return ','.join(('team_member',) + tuple(IMPORT_COLUMNS[collection])) + '\n'
+
+
+def column_help(collection):
+    """One line per column: name, whether it is required, allowed values."""
+    lines = ["team_member (or member_id): required"]
+    for column, (kind, default) in IMPORT_COLUMNS[collection].items():
+        if default is REQUIRED:
+            text = "required"
+        elif default is None or default == '':
+            text = "optional"
+        else:
+            text = f"default {default}"
+        if isinstance(kind, type) and issubclass(kind, str) and kind is not str:
+            text += f"; one of {', '.join(member.value for member in kind)}"
+        elif kind is IsoDate:
+            text += "; YYYY-MM-DD or DD/MM/YYYY"
+        elif kind is bool:
+            text += "; yes/no"
+        lines.append(f"{column}: {text}")
+    return lines
+
+
+def normalise_header(name):
+    return str(name).strip().lower().replace(' ', '_')
+
+
+def read_chunks(source):
+    """DataFrames of CHUNK_ROWS rows of text, with normalised headers."""
+    try:
+        with pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS,
+                         encoding='utf-8-sig') as reader:
+            for chunk in reader:
+                chunk.columns = [normalise_header(c) for c in chunk.columns]
+                yield chunk
+    except pd.errors.EmptyDataError:
+        raise ImportFileError("The file is empty") from None
+    except (UnicodeDecodeError, pd.errors.ParserError) as e:
+        raise ImportFileError(f"Could not read the file as CSV: {e}") from None
+
+
+def parse_dates(values):
+    """ISO date strings for values in either accepted format (NaN where neither fits)."""
+    parsed = pd.to_datetime(values, format='%Y-%m-%d', errors='coerce')
+    uk = pd.to_datetime(values, format='%d/%m/%Y', errors='coerce')
+    return parsed.fillna(uk).dt.strftime('%Y-%m-%d')
+
+
+class _Chunk:
+    """Validated copy of one chunk of rows, plus the problems found per row."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.values = pd.DataFrame(index=raw.index)
+        self.problems = defaultdict(list)
+
+    def flag(self, mask, messages):
+        """Record messages (a string or a per-row Series) for the rows in mask."""
+        if not mask.any():
+            return
+        if isinstance(messages, str):
+            for index in mask.index[mask]:
+                self.problems[index].append(messages)
+        else:
+            for index, message in messages[mask].items():
+                self.problems[index].append(message)
+
+    def column(self, name):
+        if name in self.raw.columns:
+            return self.raw[name].str.strip()
+        return pd.Series('', index=self.raw.index)
+
+
+def _check_column(chunk, column, kind, default):
+    text = chunk.column(column)
+    blank = text == ''
+    if default is REQUIRED:
+        chunk.flag(blank, f"{column} is required")
+    elif default is not None:
+        text = text.mask(blank, str(default))
+    filled = text != ''
+
+    if kind is str:
+        chunk.values[column] = text
+    elif kind is IsoDate:
+        dates = parse_dates(text)
+        chunk.flag(filled & dates.isna(), f"{column} '" + text + "' is not a date")
+        chunk.values[column] = dates
+    elif kind is float:
+        numbers = pd.to_numeric(text, errors='coerce')
+        chunk.flag(filled & numbers.isna(), f"{column} '" + text + "' is not a number")
+        chunk.flag(numbers < 0, f"{column} is negative")
+        chunk.values[column] = numbers.astype(float)
+    elif kind is bool:
+        flags = text.str.lower().map(FLAG_VALUES)
+        chunk.flag(filled & flags.isna(), f"{column} '" + text + "' is not yes/no")
+        chunk.values[column] = flags.eq(True)
+    else:
+        allowed = [member.value for member in kind]
+        chunk.flag(filled & ~text.isin(allowed), f"unknown {column} '" + text + "'")
+        chunk.values[column] = text
+
+
+def _check_member(chunk, roster, team_id):
+    members = roster.members(team_id)
+    if 'team_member' in chunk.raw.columns:
+        names = chunk.column('team_member')
+        ids_by_name = {}
+        for member_id in reversed(members):
+            ids_by_name[roster.name(member_id)] = member_id
+        ids = names.map(ids_by_name)
+        chunk.flag(ids.isna(), "unknown team member '" + names + "'")
+    else:
+        text = chunk.column('member_id')
+        ids = pd.to_numeric(text, errors='coerce')
+        chunk.flag(~ids.isin(members), "member_id '" + text + "' is not on this team")
+    chunk.values['member_id'] = ids
+
+
+def _derive(collection, chunk, today, now):
+    """Fill in fields worked out from other columns, and cross-column checks."""
+    values = chunk.values
+    today_iso = today.isoformat()
+    if collection == 'training_matrix':
+        values['completed'] = skill_completed(values['current_level'], values['required_level'])
+        values['completion_date'] = values['completed'].map({True: now, False: None})
+    elif collection == 'actions':
+        overdue = values['due_date'] < today_iso
+        derived = overdue.map({True: 'Overdue', False: 'Not Started'})
+        values['status'] = values['status'].mask(values['status'] == '', derived)
+    elif collection == 'sytner_bookings':
+        chunk.flag(values['end_date'] < values['start_date'], "end_date is before start_date")
+        values['expenses_estimate'] = values['expenses_estimate'].where(values['travel_required'], 0.0)
+    elif collection == 'learning_resources':
+        values['assigned_date'] = values['assigned_date'].fillna(today_iso)
+        next_year = (pd.to_datetime(values['assigned_date']) + timedelta(days=365)).dt.strftime('%Y-%m-%d')
+        values['expiry_date'] = values['expiry_date'].fillna(next_year)
+    values['created_at'] = now
+
+
+def import_csv(store, roster, team_id, collection, source, dry_run=False, today=None):
+    """Import a CSV file (path or file object) into one team's collection.
+
+    Returns an ImportResult; errors are (row, message) with row counted as
+    in a spreadsheet (the header is row 1). With dry_run nothing is added.
+    Raises ImportFileError if the file itself is unusable.
+    """
+    columns = IMPORT_COLUMNS[collection]
+    unique, duplicate_message = UNIQUE_FIELDS.get(collection, (None, None))
+    seen = set()
+    if unique:
+        seen = {tuple(r[f] for f in unique) for r in store.snapshot()[collection]}
+    today = today or datetime.now().date()
+    now = datetime.now().isoformat()
+
+    errors = []
+    counts = {'rows': 0, 'imported': 0, 'errors': 0}
+    ignored = []
+
+    def valid_records():
+        """Checked records, one chunk at a time, so only a chunk's rows are held as dicts."""
+        for number, raw in enumerate(read_chunks(source)):
+            if number == 0:
+                present = set(raw.columns)
+                missing = [c for c, (_, default) in columns.items() if default is REQUIRED and c not in present]
+                if not present & set(MEMBER_COLUMNS):
+                    missing.insert(0, 'team_member')
+                if missing:
+                    raise ImportFileError(f"Missing column(s): {', '.join(missing)}")
+                ignored.extend(sorted(present - set(columns) - set(MEMBER_COLUMNS)))
+            counts['rows'] += len(raw)
+
+            chunk = _Chunk(raw)
+            _check_member(chunk, roster, team_id)
+            for column, (kind, default) in columns.items():
+                _check_column(chunk, column, kind, default)
+            _derive(collection, chunk, today, now)
+
+            valid = ~chunk.values.index.isin(list(chunk.problems))
+            if unique:
+                for index, key in zip(chunk.values.index[valid],
+                                      chunk.values.loc[valid, list(unique)].itertuples(index=False, name=None)):
+                    if key in seen:
+                        chunk.problems[index].append(duplicate_message)
+                    else:
+                        seen.add(key)
+                valid = ~chunk.values.index.isin(list(chunk.problems))
+
+            for index in sorted(chunk.problems):
+                counts['errors'] += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append((index + 2, '; '.join(chunk.problems[index])))
+            good = chunk.values[valid].copy()
+            good['member_id'] = good['member_id'].astype(int)
+            good = good.astype(object).where(good.notna(), None)
+            counts['imported'] += len(good)
+            yield from good.to_dict('records')
+
+    if dry_run:
+        for _ in valid_records():
+            pass
+    else:
+        # append_many turns each record into a stored one as it is yielded
+        store.append_many(collection, valid_records())
+    return ImportResult(counts['rows'], counts['imported'], errors, counts['errors'], ignored)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import Manager Hub records from a CSV file")
+    parser.add_argument('collection', choices=list(IMPORT_COLUMNS))
+    parser.add_argument('csv', nargs='?', help="CSV file to import")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--team', default='default')
+    parser.add_argument('--dry-run', action='store_true', help="Check the file without importing")
+    parser.add_argument('--template', action='store_true', help="Print the CSV header for this collection")
+    args = parser.parse_args()
+
+    if args.template:
+        sys.stdout.write(template_csv(args.collection))
+        return
+    if not args.csv:
+        parser.error("a CSV file is needed unless --template is given")
+
+    roster = Roster(args.data_dir)
+    if args.dry_run:
+        store = read_team(roster, args.team)
+    else:
+        try:
+            store, _ = open_team(roster, args.team)
+        except StoreLockedError as e:
+            # The app would overwrite the import with its own copy on its next save
+            print(f"❌ {e}; stop the app first, or use its 📥 Bulk Import page")
+            sys.exit(1)
+    try:
+        result = import_csv(store, roster, args.team, args.collection, args.csv, args.dry_run)
+    except ImportFileError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    for row, message in result.errors:
+        print(f"   - row {row}: {message}")
+    if result.error_count > len(result.errors):
+        print(f"   - ... and {result.error_count - len(result.errors)} more")
+    if result.ignored_columns:
+        print(f"   ⚠️ Ignored column(s): {', '.join(result.ignored_columns)}")
+    verb = "would be imported" if args.dry_run else "imported"
+    print(f"✅ {result.imported} of {result.rows} row(s) {verb} into {args.team}/{args.collection}")
+
+
+if __name__ == '__main__':
+    main()
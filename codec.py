@@ -0,0 +1,150 @@
+"""
+JSON codec for Manager Hub & TAG Training data files
+
+Uses orjson when it is installed and the standard library otherwise; both
+produce the same compact, UTF-8 output. Collection files are written one
+record per line:
+
+    [
+    {"id":1,...},
+    {"id":2,...}
+    ]
+
+That is still a plain JSON array, and it diffs and greps well. Big files
+are read with iter_array, which decodes one element at a time from
+fixed-size chunks, so peak memory is one chunk plus one record instead of
+the whole file plus its parsed copy. All writes go to a temporary file
+that replaces the target, so readers never see a half-written file.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Files up to this size are parsed in one go (faster); larger ones stream
+STREAM_ABOVE_BYTES = 32 * 1024 * 1024
+CHUNK_CHARS = 1024 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def dumps(obj):
+    """Compact JSON text for one value."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+
+
+def loads(data):
+    """Parse JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dump_bytes(obj):
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def atomic_write(path, write):
+    """Call write(binary_file) on a temp file, then move it over path."""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    tmp_path.replace(path)
+
+
+def write_array(path, items):
+    """Atomically write items as a JSON array, one compact element per line."""
+    def write(f):
+        f.write(b'[')
+        separator = b'\n'
+        for item in items:
+            f.write(separator)
+            f.write(_dump_bytes(item))
+            separator = b',\n'
+        f.write(b'\n]\n')
+    atomic_write(path, write)
+
+
+def write_json(path, obj):
+    """Atomically write a single value."""
+    atomic_write(path, lambda f: f.write(_dump_bytes(obj)))
+
+
+def read_json(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def load_array(path):
+    """Iterate the elements of a JSON array file, streaming large files."""
+    if os.path.getsize(path) <= STREAM_ABOVE_BYTES:
+        return iter(read_json(path))
+    return iter_array(path)
+
+
+def iter_array(path, chunk_chars=CHUNK_CHARS):
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer = f.read(chunk_chars)
+        eof = not buffer
+        pos = _skip(buffer, 0)
+        while pos >= len(buffer) and not eof:
+            more = f.read(chunk_chars)
+            eof = not more
+            buffer += more
+            pos = _skip(buffer, pos)
+        if buffer[pos:pos + 1] != '[':
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+        expect_item = True
+        while True:
+            pos = _skip(buffer, pos)
+            if pos < len(buffer):
+                if buffer[pos] == ']':
+                    return
+                if not expect_item:
+                    if buffer[pos] != ',':
+                        raise ValueError(f"{path}: expected ',' or ']' between array elements")
+                    pos += 1
+                    expect_item = True
+                    continue
+                try:
+                    item, end = _decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    end = None
+                # A value that runs to the end of the buffer may continue
+                # in the next chunk (a number, say), so only trust it once
+                # something follows it
+                if end is not None and (_skip(buffer, end) < len(buffer) or eof):
+                    yield item
+                    pos = end
+                    expect_item = False
+                    continue
+            elif eof:
+                raise ValueError(f"{path}: unexpected end of JSON array")
+            # Drop what has been consumed and read the next chunk
+            buffer = buffer[pos:]
+            pos = 0
+            more = f.read(chunk_chars)
+            eof = not more
+            buffer += more
+
+
+def _skip(buffer, pos):
+    return _WHITESPACE.match(buffer, pos).end()
@@ -0,0 +1,242 @@
+"""
+Columnar snapshots for Manager Hub & TAG Training analytics
+
+The JSON collection files stay the source of truth. Next to them, each
+team keeps a read-only columnar copy of every collection (active plus
+archived records) under columns/<collection>/: one NumPy .npy file per
+field, plus meta.json. Numbers and flags are stored as-is and enum fields
+as small integer codes. Text is stored as UTF-8 bytes (<field>.utf8.npy)
+plus an array of row offsets into them, so one long note doesn't pad
+every row to its width. Analytics pages memory-map the files and build a
+DataFrame straight from the arrays, without parsing JSON or walking lists
+of dicts.
+
+Each build goes into a new directory (columns/<collection>/<build>/), and
+meta.json, which names the build, is replaced last. A reader takes every
+array from the build its meta.json named, so it never mixes files from
+two builds; older builds are removed once the new meta.json is in place
+(open memory maps stay valid).
+
+meta.json records the size and mtime of the files the copy was built
+from. When they have changed since, the copy is stale: load_frame builds
+the frame from the in-memory records instead, and rewrites the copy at
+most once every COLUMNS_REBUILD_SECONDS, so a busy team doesn't rewrite
+every file after every save. Copies are also written after archiving
+(compaction). Run `python bench.py` to compare against the JSON path.
+"""
+
+import dataclasses
+import json
+import os
+import shutil
+import threading
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Union, get_args, get_origin, get_type_hints
+
+import numpy as np
+import pandas as pd
+
+from data_utils import ARCHIVE_DIR, ARCHIVE_MANIFEST, COLLECTIONS
+from records import RECORD_TYPES
+
+COLUMNS_DIR = 'columns'
+COLUMNS_META = 'meta.json'
+# Bumped when the file layout changes; older copies are treated as stale
+COLUMNS_FORMAT = 3
+COLUMNS_REBUILD_SECONDS = int(os.environ.get('MANAGER_HUB_COLUMNS_SECONDS', 300))
+TAG_SEPARATOR = ', '
+TEXT_KINDS = ('str', 'tags')
+
+_write_lock = threading.Lock()
+
+
+def _column_kind(annotation):
+    """(kind, enum class or None) for a record field annotation."""
+    if get_origin(annotation) is Union:
+        annotation = next(a for a in get_args(annotation) if a is not type(None))
+    if get_origin(annotation) is tuple:
+        return 'tags', None
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return 'enum', annotation
+    if annotation is bool:
+        return 'bool', None
+    if annotation is int:
+        return 'int', None
+    if annotation is float:
+        return 'float', None
+    return 'str', None
+
+
+def _schema(collection):
+    record_type = RECORD_TYPES[collection]
+    hints = get_type_hints(record_type)
+    return [(f.name,) + _column_kind(hints[f.name])
+            for f in dataclasses.fields(record_type) if f.name != 'extra']
+
+
+def _text(kind, values):
+    """Text values as str, with tags joined and None as ''."""
+    if kind == 'tags':
+        return [TAG_SEPARATOR.join(v) for v in values]
+    return ['' if v is None else v for v in values]
+
+
+def _encode(kind, enum_cls, values):
+    if kind in TEXT_KINDS:
+        return np.array(_text(kind, values), dtype=object)
+    if kind == 'enum':
+        return np.array([-1 if v is None else v.code for v in values], dtype=np.int8)
+    if kind == 'bool':
+        return np.array(values, dtype=np.bool_)
+    if kind == 'int':
+        return np.array(values, dtype=np.int64)
+    return np.array(values, dtype=np.float64)
+
+
+def _encode_text(kind, values):
+    """(offsets, UTF-8 bytes) for a text column; row i is bytes[offsets[i]:offsets[i + 1]]."""
+    encoded = [text.encode('utf-8') for text in _text(kind, values)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)))
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def _decode_text(offsets, data):
+    data = data.tobytes()
+    bounds = offsets.tolist()
+    return np.array([data[start:end].decode('utf-8') for start, end in zip(bounds, bounds[1:])],
+                    dtype=object)
+
+
+def columns_dir(data_dir, collection):
+    return Path(data_dir) / COLUMNS_DIR / collection
+
+
+def source_fingerprint(data_dir, collection):
+    """Size and mtime of the files a collection's records are read from."""
+    data_dir = Path(data_dir)
+    fingerprint = []
+    for path in (data_dir / COLLECTIONS[collection], data_dir / ARCHIVE_DIR / ARCHIVE_MANIFEST):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            fingerprint.append(None)
+        else:
+            fingerprint.append([stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+def write_columns(store, collection=None):
+    """Write the columnar copy of one collection (default all of them)."""
+    collections = [collection] if collection else list(COLLECTIONS)
+    with _write_lock:
+        for key in collections:
+            # Fingerprint before reading, so a write landing in between
+            # leaves the copy looking stale rather than falsely current
+            fingerprint = source_fingerprint(store.data_dir, key)
+            records = store.snapshot(include_archive=True)[key]
+            _write(columns_dir(store.data_dir, key), key, records, fingerprint)
+
+
+def _write(path, collection, records, fingerprint):
+    build = f"build-{time.time_ns()}-{os.getpid()}"
+    build_dir = path / build
+    build_dir.mkdir(parents=True)
+    fields = []
+    for name, kind, enum_cls in _schema(collection):
+        values = [record[name] for record in records]
+        if kind in TEXT_KINDS:
+            offsets, data = _encode_text(kind, values)
+            arrays = {name: offsets, f"{name}.utf8": data}
+        else:
+            arrays = {name: _encode(kind, enum_cls, values)}
+        for filename, array in arrays.items():
+            np.save(build_dir / f"{filename}.npy", array)
+        field = {'name': name, 'kind': kind}
+        if enum_cls is not None:
+            field['categories'] = [member.value for member in enum_cls]
+        fields.append(field)
+    tmp_meta = path / 'meta.tmp.json'
+    with open(tmp_meta, 'w') as f:
+        json.dump({'format': COLUMNS_FORMAT, 'build': build, 'fingerprint': fingerprint,
+                   'rows': len(records), 'fields': fields}, f)
+    tmp_meta.replace(path / COLUMNS_META)
+    # Earlier builds, and the flat files of older formats
+    for old in path.iterdir():
+        if old.name in (build, COLUMNS_META):
+            continue
+        if old.is_dir():
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            old.unlink(missing_ok=True)
+
+
+def read_columns(data_dir, collection):
+    """DataFrame over the memory-mapped columnar copy, or None if it is missing or stale.
+
+    Needs only the team directory, not a loaded store.
+    """
+    path = columns_dir(data_dir, collection)
+    try:
+        with open(path / COLUMNS_META, 'r') as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    if (meta.get('format') != COLUMNS_FORMAT
+            or meta['fingerprint'] != source_fingerprint(data_dir, collection)):
+        return None
+    build_dir = path / meta['build']
+    columns = {}
+    try:
+        for field in meta['fields']:
+            array = np.load(build_dir / f"{field['name']}.npy", mmap_mode='r')
+            if field['kind'] == 'enum':
+                columns[field['name']] = pd.Categorical.from_codes(array, field['categories'])
+            elif field['kind'] in TEXT_KINDS:
+                data = np.load(build_dir / f"{field['name']}.utf8.npy", mmap_mode='r')
+                columns[field['name']] = _decode_text(array, data)
+            else:
+                columns[field['name']] = array
+    except FileNotFoundError:
+        return None
+    return pd.DataFrame(columns, copy=False)
+
+
+def records_to_frame(collection, records):
+    """The same frame as read_columns, built directly from records."""
+    columns = {}
+    for name, kind, enum_cls in _schema(collection):
+        values = [record[name] for record in records]
+        if kind == 'enum':
+            columns[name] = pd.Categorical([None if v is None else v.value for v in values],
+                                           categories=[member.value for member in enum_cls])
+        else:
+            columns[name] = _encode(kind, enum_cls, values)
+    return pd.DataFrame(columns, copy=False)
+
+
+def rebuild_due(data_dir, collection):
+    """True if a collection's copy is missing or older than COLUMNS_REBUILD_SECONDS."""
+    try:
+        written = (columns_dir(data_dir, collection) / COLUMNS_META).stat().st_mtime
+    except FileNotFoundError:
+        return True
+    return time.time() - written >= COLUMNS_REBUILD_SECONDS
+
+
+def load_frame(store, collection):
+    """All records (active and archived) of a collection as a DataFrame.
+
+    Reads the columnar copy when it is current; otherwise builds the frame
+    from the store, refreshing the copy for later readers if it is due.
+    """
+    df = read_columns(store.data_dir, collection)
+    if df is None and not store.read_only and rebuild_due(store.data_dir, collection):
+        write_columns(store, collection)
+        df = read_columns(store.data_dir, collection)
+    if df is None:
+        # Changed again while writing; the records are still authoritative
+        df = records_to_frame(collection, store.snapshot(include_archive=True)[collection])
+    return df
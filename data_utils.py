@@ -0,0 +1,1107 @@
+"""
+Shared data store for Manager Hub & TAG Training
+
+One DataStore per data directory is shared by every browser session.
+Sessions read immutable snapshots; every mutation builds a new snapshot
+that reuses all unchanged records from the previous one.
+
+Closed and old records are moved out of the active ("hot") files into
+compressed archive segments, which are only read for All Time views and
+exports. Run `python data_utils.py archive` from cron to archive on a
+schedule.
+
+Note/update histories live in append-only logs under data/notes, keyed by
+parent record id, so adding a note never rewrites the parent collection.
+
+Every committed change is published as a ChangeEvent to in-process
+subscribers (see views.py) and appended to data/changes.jsonl, which
+external tools can follow with `python data_utils.py tail --team <id> --follow`.
+
+Records are the typed classes from records.py. Records that fail
+validation on load are set aside in rejected.jsonl rather than loaded.
+schema.json records the schema version each collection file was written
+at; older records are migrated as they are read and the file is stored at
+the current version on its next write (or by `python data_utils.py migrate`).
+
+Each version keeps only the records it changed, so a session can undo its
+own changes (UndoStack) and DataStore.as_of() can roll the change log back
+to show the data as it stood at an earlier time.
+"""
+
+import argparse
+import bisect
+import gzip
+import heapq
+import os
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import chain, islice
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows): writers in different processes aren't kept apart
+    fcntl = None
+
+from codec import dumps, load_array, loads, read_json, write_array, write_json
+from records import RECORD_TYPES, SCHEMA_VERSIONS, RecordError, from_json, upgrade
+
+COLLECTIONS = {
+    'checkins': 'checkins.json',
+    'actions': 'actions.json',
+    'training_plans': 'training_plans.json',
+    'training_matrix': 'training_matrix.json',
+    'sytner_bookings': 'sytner_bookings.json',
+    'learning_resources': 'learning_resources.json'
+}
+
+# Closed records (and check-ins with no open follow-up) older than this many days are archived
+ARCHIVE_AFTER_DAYS = int(os.environ.get('MANAGER_HUB_ARCHIVE_DAYS', 180))
+
+ARCHIVE_DIR = 'archive'
+ARCHIVE_MANIFEST = 'manifest.json'
+
+# collection -> (whether a record is closed, date field the age is measured from)
+# Archived records are read-only, so anything still open stays active.
+ARCHIVE_RULES = {
+    'checkins': (lambda r: not r['follow_up'], 'date'),
+    'actions': (lambda r: r['status'] == 'Completed', 'due_date'),
+    'training_plans': (lambda r: r['status'] in ('Completed', 'Cancelled'), 'end_date'),
+    'sytner_bookings': (lambda r: r['status'] in ('Completed', 'Cancelled'), 'end_date')
+}
+
+
+NOTES_DIR = 'notes'
+
+# collection -> record field that used to hold its note history inline
+NOTE_FIELDS = {
+    'actions': 'updates',
+    'training_plans': 'notes',
+    'training_matrix': 'notes',
+    'learning_resources': 'notes'
+}
+
+# How many of the latest notes per record are kept in memory
+NOTES_PREVIEW = 3
+
+
+CHANGE_LOG = 'changes.jsonl'
+# {collection: schema version its file was written at}; files it doesn't list are version 0
+SCHEMA_FILE = 'schema.json'
+REJECTED_FILE = 'rejected.jsonl'
+LOCK_FILE = 'store.lock'
+# Highest id per collection removed by an undo, so ids are never handed out twice
+REMOVED_IDS_FILE = 'removed_ids.json'
+
+# Lock files held by this process, by resolved path; kept until it exits
+_held_locks = {}
+
+# Recent versions kept in memory for undo; each holds only its changed records
+HISTORY_VERSIONS = int(os.environ.get('MANAGER_HUB_HISTORY_VERSIONS', 200))
+
+# op is 'insert', 'update', 'delete' (an undone insert) or 'archive';
+# before/after are whole records (None where there is no record on that
+# side); at is the commit time (None in logs written before it was kept)
+ChangeEvent = namedtuple('ChangeEvent', 'version collection record_id op before after at', defaults=(None,))
+
+# One committed version: its number, commit time and ChangeEvents
+HistoryEntry = namedtuple('HistoryEntry', 'version at events')
+
+# What one thread committed inside DataStore.recording(): version numbers,
+# and (collection, parent_id, offset, note) for each note it added
+Recording = namedtuple('Recording', 'versions notes')
+
+
+class StoreLockedError(RuntimeError):
+    """Another process has the data directory open for writing."""
+
+
+def lock_data_dir(data_dir):
+    """Take the data directory's writer lock for the rest of this process.
+
+    Each writable DataStore keeps its records in memory and rewrites whole
+    files, so a second writer process would silently undo the first's
+    changes. Raises StoreLockedError if another process holds the lock.
+    """
+    path = (Path(data_dir) / LOCK_FILE).resolve()
+    if fcntl is None or path in _held_locks:
+        return
+    f = open(path, 'a')
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        raise StoreLockedError(f"{data_dir} is open for writing in another process (is the app running?)") from None
+    _held_locks[path] = f
+
+
+class HistoryError(Exception):
+    """A change can't be undone, or the history doesn't reach back far enough."""
+
+
+def event_to_json(event):
+    data = event._asdict()
+    for side in ('before', 'after'):
+        if data[side] is not None:
+            data[side] = data[side].to_json()
+    return dumps(data)
+
+
+def tail_changes(path, offset=0, follow=False, poll_interval=1.0):
+    """Yield (next_offset, ChangeEvent) from a change log, optionally following it."""
+    path = Path(path)
+    while True:
+        if path.exists():
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # writer is mid-line; pick it up next poll
+                    offset += len(line)
+                    yield offset, ChangeEvent(**loads(line))
+        if not follow:
+            return
+        time.sleep(poll_interval)
+
+
+def _reversed_lines(path, block_size=1 << 16):
+    """Complete lines of a file, last first, reading backwards in blocks."""
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        buffer = b''
+        # The text after the last newline is a line still being written
+        skip_tail = True
+        while position > 0:
+            start = max(0, position - block_size)
+            f.seek(start)
+            buffer = f.read(position - start) + buffer
+            position = start
+            lines = buffer.split(b'\n')
+            buffer = lines.pop(0)  # may continue in the previous block
+            if skip_tail and lines:
+                lines.pop()
+                skip_tail = False
+            yield from reversed(lines)
+        if not skip_tail:
+            yield buffer
+
+
+# Fields with posting lists ({value: {id: record}}) for equality filters
+INDEXED_FIELDS = {
+    'checkins': ('member_id', 'type'),
+    'actions': ('member_id', 'status', 'priority'),
+    'training_plans': ('member_id', 'status', 'approval_status'),
+    'training_matrix': ('member_id', 'category'),
+    'sytner_bookings': ('member_id', 'status'),
+    'learning_resources': ('member_id', 'type', 'status')
+}
+
+# Fields with sorted [(value, id)] lists for range filters and ordering
+SORTED_FIELDS = {
+    'checkins': ('date',),
+    'actions': ('due_date',),
+    'training_plans': ('start_date', 'end_date'),
+    'training_matrix': ('target_date',),
+    'sytner_bookings': ('start_date', 'end_date'),
+    'learning_resources': ('expiry_date',)
+}
+
+
+def is_archivable(collection, record, cutoff):
+    rule = ARCHIVE_RULES.get(collection)
+    if rule is None:
+        return False
+    closed, date_field = rule
+    if not closed(record):
+        return False
+    return datetime.fromisoformat(record[date_field]).date() < cutoff
+
+
+def _parse_filters(collection, filters):
+    """Split query keyword filters into {field: values} and {field: [low, high]}."""
+    fields = RECORD_TYPES[collection].field_names()
+    equals, ranges = {}, {}
+    for key, value in filters.items():
+        if value is None:
+            continue
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        for suffix, bound in (('_from', 0), ('_before', 1)):
+            if key.endswith(suffix) and key[:-len(suffix)] in fields:
+                ranges.setdefault(key[:-len(suffix)], [None, None])[bound] = value
+                break
+        else:
+            if key not in fields:
+                raise TypeError(f"query() got an unknown filter '{key}' for {collection}")
+            equals[key] = frozenset(value) if isinstance(value, (list, tuple, set, frozenset)) else {value}
+    return equals, ranges
+
+
+def _matches(record, equals, ranges):
+    for field, values in equals.items():
+        if record[field] not in values:
+            return False
+    for field, (low, high) in ranges.items():
+        value = record[field]
+        if value is None or (low is not None and value < low) or (high is not None and value >= high):
+            return False
+    return True
+
+
+def _sorted_span(entries, low, high):
+    """Index range of [(value, id)] entries with low <= value < high."""
+    start = 0 if low is None else bisect.bisect_left(entries, (low,))
+    end = len(entries) if high is None else bisect.bisect_left(entries, (high,))
+    return start, max(start, end)
+
+
+def _sorted_remove(entries, entry):
+    i = bisect.bisect_left(entries, entry)
+    if i < len(entries) and entries[i] == entry:
+        del entries[i]
+
+
+class Snapshot:
+    """Read-only view of every collection at one version.
+
+    Collections are tuples of record dicts. Records are shared between
+    snapshots (and therefore between sessions), so never mutate them in
+    place - go through DataStore instead.
+    """
+
+    __slots__ = ('version', '_collections')
+
+    def __init__(self, version, collections):
+        self.version = version
+        self._collections = collections
+
+    def __getattr__(self, name):
+        try:
+            return self._collections[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __getitem__(self, name):
+        return self._collections[name]
+
+
+class NoteStore:
+    """Append-only note logs, one JSONL file per collection.
+
+    Only the count and latest NOTES_PREVIEW entries per parent are held in
+    memory; the full history is read back from recorded file offsets.
+    A read_only store keeps notes appended to it (such as inline notes
+    found in legacy records) in memory instead of writing them.
+
+    An undone note is withdrawn by appending a line that retracts it
+    ({"parent_id": ..., "retracts": <offset of the note>}), so the log
+    stays append-only.
+    """
+
+    def __init__(self, notes_dir, read_only=False):
+        self.notes_dir = Path(notes_dir)
+        self.read_only = read_only
+        if not read_only:
+            self.notes_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._offsets = {}
+        self._latest = {}
+        self._unsaved = {}
+        for collection in NOTE_FIELDS:
+            self._offsets[collection] = defaultdict(list)
+            self._unsaved[collection] = defaultdict(list)
+            self._latest[collection] = defaultdict(lambda: deque(maxlen=NOTES_PREVIEW))
+            self._scan(collection)
+
+    def _path(self, collection):
+        return self.notes_dir / f"{collection}.jsonl"
+
+    def _scan(self, collection):
+        path = self._path(collection)
+        if not path.exists():
+            return
+        retracted = set()
+        with open(path, 'rb') as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    entry = loads(line)
+                    if 'retracts' in entry:
+                        offsets = self._offsets[collection][entry['parent_id']]
+                        if entry['retracts'] in offsets:
+                            offsets.remove(entry['retracts'])
+                        retracted.add(entry['parent_id'])
+                    else:
+                        self._index(collection, entry, offset)
+                offset += len(line)
+        for parent_id in retracted:
+            self._refresh_latest(collection, parent_id)
+
+    def _index(self, collection, entry, offset):
+        parent_id = entry['parent_id']
+        self._offsets[collection][parent_id].append(offset)
+        self._latest[collection][parent_id].append({'date': entry['date'], 'note': entry['note']})
+
+    def _read_at(self, collection, offsets):
+        notes = []
+        with open(self._path(collection), 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                entry = loads(f.readline())
+                notes.append({'date': entry['date'], 'note': entry['note']})
+        return notes
+
+    def _refresh_latest(self, collection, parent_id):
+        latest = self._latest[collection][parent_id]
+        latest.clear()
+        latest.extend(self._read_at(collection, self._offsets[collection][parent_id][-NOTES_PREVIEW:]))
+
+    def count(self, collection, parent_id):
+        return (len(self._offsets[collection].get(parent_id, ()))
+                + len(self._unsaved[collection].get(parent_id, ())))
+
+    def latest(self, collection, parent_id):
+        """Most recent notes (oldest first), at most NOTES_PREVIEW of them."""
+        return list(self._latest[collection].get(parent_id, ()))
+
+    def history(self, collection, parent_id):
+        """Full note history for one record, read from disk."""
+        offsets = self._offsets[collection].get(parent_id)
+        notes = self._read_at(collection, list(offsets)) if offsets else []
+        return notes + list(self._unsaved[collection].get(parent_id, ()))
+
+    def append_many(self, collection, parent_id, notes):
+        """Add notes to a record's history; returns their offsets in the log."""
+        with self._lock:
+            if self.read_only:
+                for note in notes:
+                    note = {'date': note['date'], 'note': note['note']}
+                    self._unsaved[collection][parent_id].append(note)
+                    self._latest[collection][parent_id].append(note)
+                return []
+            path = self._path(collection)
+            offsets = []
+            with open(path, 'ab') as f:
+                offset = f.tell()
+                for note in notes:
+                    entry = {'parent_id': parent_id, 'date': note['date'], 'note': note['note']}
+                    line = (dumps(entry) + '\n').encode('utf-8')
+                    f.write(line)
+                    self._index(collection, entry, offset)
+                    offsets.append(offset)
+                    offset += len(line)
+            recording = getattr(self._local, 'recording', None)
+            if recording is not None:
+                recording.extend((collection, parent_id, offset, note) for offset, note in zip(offsets, notes))
+            return offsets
+
+    def retract(self, collection, parent_id, offset):
+        """Withdraw one note, given the offset append_many returned for it."""
+        with self._lock:
+            self._check_writable()
+            self._offsets[collection][parent_id].remove(offset)
+            with open(self._path(collection), 'ab') as f:
+                f.write((dumps({'parent_id': parent_id, 'retracts': offset}) + '\n').encode('utf-8'))
+            self._refresh_latest(collection, parent_id)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f"{self.notes_dir} is open read-only")
+
+    def append(self, collection, parent_id, note, date=None):
+        """Add one note to a record's history; returns its offset in the log."""
+        date = date or datetime.now().isoformat()
+        offsets = self.append_many(collection, parent_id, [{'date': date, 'note': note}])
+        return offsets[0] if offsets else None
+
+
+class DataStore:
+    """Copy-on-write store backed by one JSON file per collection.
+
+    migrations are fn(collection, raw_dict) -> raw_dict applied to every
+    record read from disk, before it is built into its typed record;
+    upgraded active records are written back on load. Records that fail
+    validation are listed in self.rejected and appended to rejected.jsonl.
+    Records are indexed by id, INDEXED_FIELDS and SORTED_FIELDS; query()
+    answers filter combinations from those indexes.
+
+    Records are upgraded to the current schema version as they are read
+    (records.upgrade); a collection's file is only rewritten at the new
+    version when the collection is next written.
+
+    The last HISTORY_VERSIONS commits are kept as HistoryEntry deltas, so
+    revert() can commit the inverse of one of them (undo and redo, see
+    UndoStack); as_of() rolls back through changes.jsonl instead, which
+    reaches back as far as the log does.
+
+    A writable store takes the data directory's writer lock (see
+    lock_data_dir), so only one process at a time can write a team.
+
+    A read_only store (for readers in another process, like api_server.py)
+    never writes to the data directory, not even to create it: migrations,
+    extracted inline notes and rejections only apply in memory, and any
+    write raises PermissionError.
+    """
+
+    def __init__(self, data_dir, change_log=True, migrations=(), read_only=False):
+        self.data_dir = Path(data_dir)
+        self.read_only = read_only
+        if not read_only:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            lock_data_dir(self.data_dir)
+        self.archive_dir = self.data_dir / ARCHIVE_DIR
+        self.change_log = self.data_dir / CHANGE_LOG if change_log else None
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._commit_hooks = []
+        self._history = deque(maxlen=HISTORY_VERSIONS)
+        self._local = threading.local()
+        removed_path = self.data_dir / REMOVED_IDS_FILE
+        self._removed_max_id = read_json(removed_path) if removed_path.exists() else {}
+        self.migrations = list(migrations)
+        self._by_id = None
+        self.rejected = []
+        self.notes = NoteStore(self.data_dir / NOTES_DIR, read_only)
+        schema_path = self.data_dir / SCHEMA_FILE
+        self.schema_versions = read_json(schema_path) if schema_path.exists() else {}
+        collections, migrated = self._load()
+        self._snapshot = Snapshot(0, collections)
+        if migrated and not read_only:
+            with self._lock:
+                self._commit({key: collections[key] for key in migrated})
+        self._manifest = self._load_manifest()
+        self._archived = {}
+        self._full_snapshot = None
+        self._build_indexes()
+
+    def _read_records(self, collection, raw_records, source, version=None):
+        """Migrate and type raw records stored at a schema version (default current).
+
+        Returns (records, changed); schema upgrades alone don't count as changes.
+        """
+        records = []
+        changed = False
+        rejected = []
+        stale = version is not None and version < SCHEMA_VERSIONS[collection]
+        for raw in raw_records:
+            upgraded = raw
+            for migration in self.migrations:
+                upgraded = migration(collection, upgraded)
+            upgraded = self._extract_inline_notes(collection, upgraded)
+            changed = changed or upgraded is not raw
+            if stale:
+                upgraded = upgrade(collection, upgraded, version)
+            try:
+                records.append(from_json(collection, upgraded))
+            except RecordError as e:
+                rejected.append({'collection': collection, 'source': source,
+                                 'error': str(e), 'record': upgraded})
+        if rejected:
+            self.rejected.extend(rejected)
+            if source == 'active' and not self.read_only:
+                # Keep them on disk before the collection is rewritten without them
+                with open(self.data_dir / REJECTED_FILE, 'a', encoding='utf-8') as f:
+                    f.write(''.join(dumps(r) + '\n' for r in rejected))
+                changed = True
+        return tuple(records), changed
+
+    def _load(self):
+        collections = {}
+        migrated = []
+        for key, filename in COLLECTIONS.items():
+            file_path = self.data_dir / filename
+            if file_path.exists():
+                raw_records = load_array(file_path)
+            else:
+                raw_records = []
+            collections[key], changed = self._read_records(
+                key, raw_records, 'active', self.schema_versions.get(key, 0))
+            if changed:
+                migrated.append(key)
+        return collections, migrated
+
+    # ---- indexes (always reflect the latest version) ----
+
+    def _build_indexes(self):
+        self._by_id = {}
+        self._postings = {}
+        self._sorted = {}
+        for collection in COLLECTIONS:
+            records = self._snapshot[collection]
+            self._by_id[collection] = {}
+            self._postings[collection] = {field: defaultdict(dict) for field in INDEXED_FIELDS[collection]}
+            self._sorted[collection] = {field: sorted((r[field], r['id']) for r in records)
+                                        for field in SORTED_FIELDS[collection]}
+            for record in records:
+                self._by_id[collection][record['id']] = record
+                for field, postings in self._postings[collection].items():
+                    postings[record.get(field)][record['id']] = record
+
+    def _index_add(self, collection, record):
+        self._by_id[collection][record['id']] = record
+        for field, postings in self._postings[collection].items():
+            postings[record.get(field)][record['id']] = record
+        for field, entries in self._sorted[collection].items():
+            bisect.insort(entries, (record[field], record['id']))
+
+    def _index_remove(self, collection, record):
+        self._by_id[collection].pop(record['id'], None)
+        for field, postings in self._postings[collection].items():
+            posting = postings.get(record.get(field))
+            if posting is not None:
+                posting.pop(record['id'], None)
+                if not posting:
+                    del postings[record.get(field)]
+        for field, entries in self._sorted[collection].items():
+            _sorted_remove(entries, (record[field], record['id']))
+
+    def _index_replace(self, collection, before, after):
+        # Records keep their place in postings whose value did not change
+        self._by_id[collection][after['id']] = after
+        for field, postings in self._postings[collection].items():
+            if before.get(field) == after.get(field):
+                postings[after.get(field)][after['id']] = after
+            else:
+                postings[before.get(field)].pop(before['id'], None)
+                if not postings[before.get(field)]:
+                    del postings[before.get(field)]
+                postings[after.get(field)][after['id']] = after
+        for field, entries in self._sorted[collection].items():
+            if before[field] != after[field]:
+                _sorted_remove(entries, (before[field], before['id']))
+                bisect.insort(entries, (after[field], after['id']))
+
+    def get(self, collection, record_id):
+        return self._by_id[collection].get(record_id)
+
+    # ---- queries ----
+
+    def query(self, collection, member=None, order_by=None, descending=False,
+              limit=None, offset=0, include_archive=False, **filters):
+        """Records matching every filter, read through the most selective index.
+
+        Filters are field=value (a list/tuple/set matches any of its values,
+        None matches everything), field_from=value (inclusive) and
+        field_before=value (exclusive); dates may be given as date objects.
+        member is short for member_id. Results are in insertion order
+        unless order_by names a field. With a limit, only offset + limit
+        results are ever sorted.
+        """
+        if member is not None:
+            filters['member_id'] = member
+        equals, ranges = _parse_filters(collection, filters)
+        order_by = order_by or 'id'
+        stop = None if limit is None else offset + limit
+        with self._lock:
+            source, in_order = self._plan(collection, equals, ranges, order_by, descending)
+            matches = (r for r in source if _matches(r, equals, ranges))
+            if in_order and not include_archive:
+                return list(islice(matches, offset, stop))
+            results = list(matches)
+        if include_archive:
+            results = [r for r in self.archived(collection) if _matches(r, equals, ranges)] + results
+        # Ties break on id, matching the order of the sorted indexes
+        key = lambda record: (record[order_by], record['id'])
+        if stop is not None:
+            pick = heapq.nlargest if descending else heapq.nsmallest
+            return pick(stop, results, key=key)[offset:]
+        return sorted(results, key=key, reverse=descending)[offset:]
+
+    def _plan(self, collection, equals, ranges, order_by, descending):
+        """Pick the smallest candidate set: (records, already in order_by order?)."""
+        postings = self._postings[collection]
+        sorted_index = self._sorted[collection]
+        # (size, prefer, make_source, in_order); prefer breaks size ties
+        # in favour of sources that come out already ordered
+        options = []
+        for field, values in equals.items():
+            if field in postings:
+                lists = [postings[field].get(value, {}) for value in values]
+                # Postings are only roughly in id order (moves append), so
+                # their results are always sorted afterwards
+                options.append((sum(map(len, lists)), True,
+                                lambda lists=lists: chain.from_iterable(d.values() for d in lists),
+                                False))
+        for field, (low, high) in ranges.items():
+            if field in sorted_index:
+                start, end = _sorted_span(sorted_index[field], low, high)
+                options.append((end - start, field != order_by,
+                                lambda field=field, start=start, end=end:
+                                    self._sorted_span_records(collection, field, start, end,
+                                                              descending and field == order_by),
+                                field == order_by))
+        if not options:
+            if order_by in sorted_index:
+                entries = sorted_index[order_by]
+                return self._sorted_span_records(collection, order_by, 0, len(entries), descending), True
+            records = self._snapshot[collection]
+            if order_by == 'id':
+                return (reversed(records) if descending else records), True
+            return records, False
+        size, _, make_source, in_order = min(options, key=lambda option: option[:2])
+        return make_source(), in_order
+
+    def _sorted_span_records(self, collection, field, start, end, descending=False):
+        entries = self._sorted[collection][field]
+        by_id = self._by_id[collection]
+        positions = range(end - 1, start - 1, -1) if descending else range(start, end)
+        return (by_id[entries[i][1]] for i in positions)
+
+    def _extract_inline_notes(self, collection, record):
+        """Move a note list still stored inside a raw record into the note log."""
+        field = NOTE_FIELDS.get(collection)
+        if field is None or not isinstance(record.get(field), list):
+            return record
+        # Skip parents already in the log in case a previous
+        # migration stopped before the collection was rewritten
+        if record[field] and not self.notes.count(collection, record['id']):
+            self.notes.append_many(collection, record['id'], record[field])
+        return {k: v for k, v in record.items() if k != field}
+
+    def _save(self, collection, records):
+        write_array(self.data_dir / COLLECTIONS[collection], (r.to_json() for r in records))
+        if self.schema_versions.get(collection) != SCHEMA_VERSIONS[collection]:
+            # After the file, so a crash in between only means migrating again
+            self.schema_versions = {**self.schema_versions, collection: SCHEMA_VERSIONS[collection]}
+            write_json(self.data_dir / SCHEMA_FILE, self.schema_versions)
+
+    def stale_collections(self):
+        """Collections whose file was written at an older schema version."""
+        return [collection for collection, filename in COLLECTIONS.items()
+                if (self.data_dir / filename).exists()
+                and self.schema_versions.get(collection, 0) < SCHEMA_VERSIONS[collection]]
+
+    def migrate(self):
+        """Rewrite every stale collection at the current schema version now."""
+        with self._lock:
+            stale = self.stale_collections()
+            if stale:
+                self._commit({collection: self._snapshot[collection] for collection in stale})
+        return stale
+
+    def snapshot(self, include_archive=False):
+        """Current snapshot; include_archive adds cold records (loaded lazily)."""
+        snapshot = self._snapshot
+        if not include_archive:
+            return snapshot
+        full = self._full_snapshot
+        if full is None or full.version != snapshot.version:
+            collections = {
+                key: self.archived(key) + records
+                for key, records in snapshot._collections.items()
+            }
+            full = self._full_snapshot = Snapshot(snapshot.version, collections)
+        return full
+
+    # ---- archive (cold storage) ----
+
+    def _load_manifest(self):
+        manifest_path = self.archive_dir / ARCHIVE_MANIFEST
+        if manifest_path.exists():
+            return read_json(manifest_path)
+        return {}
+
+    def archived(self, collection):
+        """All archived records of a collection, read from disk on first use."""
+        records = self._archived.get(collection)
+        if records is None:
+            raw_records = self._iter_segments(collection)
+            records = self._archived[collection] = self._read_records(collection, raw_records, 'archive')[0]
+        return records
+
+    def archived_segment(self, collection, segment):
+        """Records of one archive segment, read from disk every time (not cached)."""
+        return self._read_records(collection, self._read_segment(collection, segment), 'archive')[0]
+
+    def _iter_segments(self, collection):
+        for segment in self._manifest.get(collection, {}).get('segments', []):
+            yield from self._read_segment(collection, segment)
+
+    def _read_segment(self, collection, segment):
+        version = self._manifest[collection].get('segment_versions', {}).get(segment, 0)
+        with gzip.open(self.archive_dir / segment, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    raw = loads(line)
+                    yield upgrade(collection, raw, version) if version < SCHEMA_VERSIONS[collection] else raw
+
+    def archive(self, max_age_days=None, today=None):
+        """Move closed/old records into a new compressed archive segment.
+
+        Returns {collection: number of records archived}.
+        """
+        self._check_writable()
+        max_age_days = ARCHIVE_AFTER_DAYS if max_age_days is None else max_age_days
+        cutoff = (today or datetime.now().date()) - timedelta(days=max_age_days)
+        moved = {}
+        with self._lock:
+            changes = {}
+            events = []
+            manifest = dict(self._manifest)
+            stamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
+            for collection in ARCHIVE_RULES:
+                hot, cold = [], []
+                for record in self._snapshot[collection]:
+                    (cold if is_archivable(collection, record, cutoff) else hot).append(record)
+                if not cold:
+                    continue
+                segment = f"{collection}/{stamp}.jsonl.gz"
+                (self.archive_dir / collection).mkdir(parents=True, exist_ok=True)
+                with gzip.open(self.archive_dir / segment, 'wt', encoding='utf-8') as f:
+                    for record in cold:
+                        f.write(dumps(record.to_json()) + '\n')
+                entry = manifest.get(collection, {'count': 0, 'max_id': 0, 'segments': []})
+                manifest[collection] = {
+                    'count': entry['count'] + len(cold),
+                    'max_id': max([entry['max_id']] + [r['id'] for r in cold]),
+                    'segments': entry['segments'] + [segment],
+                    'segment_versions': {**entry.get('segment_versions', {}),
+                                         segment: SCHEMA_VERSIONS[collection]}
+                }
+                if collection in self._archived:
+                    self._archived[collection] = self._archived[collection] + tuple(cold)
+                changes[collection] = tuple(hot)
+                moved[collection] = len(cold)
+                events.extend((collection, r['id'], 'archive', r, None) for r in cold)
+            if changes:
+                # Manifest first: a crash before the hot files are rewritten
+                # leaves records duplicated, never lost
+                write_json(self.archive_dir / ARCHIVE_MANIFEST, manifest)
+                self._manifest = manifest
+                self._commit(changes, events)
+        return moved
+
+    def archived_count(self, collection):
+        return self._manifest.get(collection, {}).get('count', 0)
+
+    def subscribe(self, callback, include_archive=False):
+        """Call callback(event) for every future change.
+
+        Returns the snapshot the subscriber should start from; no change can
+        land between taking it and the subscription becoming active.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+            return self.snapshot(include_archive)
+
+    def subscribe_segments(self, callback):
+        """subscribe() returning (active snapshot, {collection: archive segments}).
+
+        The segments are exactly those holding the records archived before
+        that snapshot, so the two together cover every record once.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+            segments = {collection: list(entry.get('segments', [])) for collection, entry in self._manifest.items()}
+            return self._snapshot, segments
+
+    def on_commit(self, callback):
+        """Call callback(snapshot) once after each commit's events are published."""
+        with self._lock:
+            self._commit_hooks.append(callback)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f"{self.data_dir} is open read-only")
+
+    def _commit(self, changes, events=()):
+        # changes: {collection: new tuple of records}
+        # events: (collection, record_id, op, before, after) tuples
+        # caller holds the lock
+        self._check_writable()
+        collections = dict(self._snapshot._collections)
+        collections.update(changes)
+        for collection, records in changes.items():
+            self._save(collection, records)
+        version = self._snapshot.version + 1
+        at = datetime.now().isoformat(timespec='seconds')
+        self._snapshot = Snapshot(version, collections)
+        if self._by_id is not None:
+            for collection, _, _, before, after in events:
+                if before is not None and after is not None:
+                    self._index_replace(collection, before, after)
+                elif before is not None:
+                    self._index_remove(collection, before)
+                else:
+                    self._index_add(collection, after)
+        published = [ChangeEvent(version, *event, at) for event in events]
+        if published:
+            self._history.append(HistoryEntry(version, at, published))
+            recording = getattr(self._local, 'recording', None)
+            if recording is not None:
+                recording.append(version)
+        self._publish(published)
+        for callback in self._commit_hooks:
+            callback(self._snapshot)
+        return self._snapshot
+
+    def _publish(self, events):
+        if not events:
+            return
+        if self.change_log is not None:
+            with open(self.change_log, 'a', encoding='utf-8') as f:
+                f.write(''.join(event_to_json(e) + '\n' for e in events))
+        for event in events:
+            for callback in self._subscribers:
+                callback(event)
+
+    def next_id(self, collection):
+        records = self._snapshot[collection]
+        archived_max = self._manifest.get(collection, {}).get('max_id', 0)
+        removed_max = self._removed_max_id.get(collection, 0)
+        return max(max((r['id'] for r in records), default=0), archived_max, removed_max) + 1
+
+    def append(self, collection, record):
+        """Add a record (a plain dict), assigning the next free id if it has none.
+
+        Raises RecordError if the record does not fit the collection schema.
+        """
+        return self.append_many(collection, [record])[0]
+
+    def append_many(self, collection, records):
+        """Add plain-dict records as a single new version (one file write).
+
+        Records without an id get consecutive free ids. All or nothing:
+        raises RecordError, adding none of them, if any does not fit.
+        """
+        with self._lock:
+            next_id = self.next_id(collection)
+            added = []
+            for record in records:
+                record = dict(record)
+                if record.get('id') is None:
+                    record['id'] = next_id
+                    next_id += 1
+                added.append(from_json(collection, record))
+            if added:
+                self._commit({collection: self._snapshot[collection] + tuple(added)},
+                             [(collection, r['id'], 'insert', None, r) for r in added])
+            return added
+
+    def update(self, collection, record_id, **changes):
+        """Replace one record with an updated copy."""
+        return self.update_many(collection, {record_id: changes})
+
+    def update_many(self, collection, changes_by_id):
+        """Apply {record_id: {field: value}} as a single new version."""
+        with self._lock:
+            records = list(self._snapshot[collection])
+            events = []
+            for i, record in enumerate(records):
+                changes = changes_by_id.get(record['id'])
+                if changes:
+                    records[i] = record.replace(**changes)
+                    events.append((collection, record['id'], 'update', record, records[i]))
+            return self._commit({collection: tuple(records)}, events)
+
+    def mark_overdue_actions(self, today=None):
+        """Flag open actions past their due date as Overdue."""
+        today = today or datetime.now().date()
+        overdue = {
+            a['id']: {'status': 'Overdue'}
+            for a in self._snapshot.actions
+            if a['status'] not in ('Completed', 'Overdue')
+            and datetime.fromisoformat(a['due_date']).date() < today
+        }
+        if overdue:
+            self.update_many('actions', overdue)
+
+    # ---- history ----
+
+    @contextmanager
+    def recording(self):
+        """Collect the versions and notes the calling thread commits inside the block."""
+        recording = Recording([], [])
+        self._local.recording = recording.versions
+        self.notes._local.recording = recording.notes
+        try:
+            yield recording
+        finally:
+            self._local.recording = self.notes._local.recording = None
+
+    def revert(self, version):
+        """Commit the inverse of one version's changes; returns the new version.
+
+        Raises HistoryError, changing nothing, if the version has left the
+        in-memory history, archived records, or touched a record that has
+        changed since.
+        """
+        self._check_writable()
+        with self._lock:
+            entry = next((e for e in self._history if e.version == version), None)
+            if entry is None:
+                raise HistoryError(f"Version {version} is too old to undo")
+            working = {}
+            events = []
+            removed = {}
+            for event in reversed(entry.events):
+                if event.op == 'archive':
+                    raise HistoryError("Archiving can't be undone")
+                records = working.get(event.collection)
+                if records is None:
+                    records = working[event.collection] = {r['id']: r for r in self._snapshot[event.collection]}
+                if records.get(event.record_id) != event.after:
+                    raise HistoryError(f"{event.collection} #{event.record_id} has changed since")
+                if event.before is None:
+                    del records[event.record_id]
+                    op = 'delete'
+                    removed[event.collection] = max(removed.get(event.collection, 0), event.record_id)
+                else:
+                    records[event.record_id] = event.before
+                    op = 'insert' if event.after is None else 'update'
+                events.append((event.collection, event.record_id, op, event.after, event.before))
+            if any(record_id > self._removed_max_id.get(collection, 0) for collection, record_id in removed.items()):
+                # Saved before the records go, so a crash can't free their ids
+                removed_max = dict(self._removed_max_id)
+                for collection, record_id in removed.items():
+                    removed_max[collection] = max(removed_max.get(collection, 0), record_id)
+                write_json(self.data_dir / REMOVED_IDS_FILE, removed_max)
+                self._removed_max_id = removed_max
+            changes = {collection: tuple(records.values()) for collection, records in working.items()}
+            return self._commit(changes, events).version
+
+    def as_of(self, when):
+        """Snapshot of active and archived records as they stood at `when` (a datetime).
+
+        Rolls the current records back through changes.jsonl, so the cost
+        grows with the changes made since, not with the data. Records from
+        before the log was started count as always having been there. The
+        snapshot's version is None. Raises HistoryError if the log has no
+        commit times back to `when`.
+        """
+        if self.change_log is None or not self.change_log.exists():
+            raise HistoryError("No change log to read history from")
+        cutoff = when.isoformat(timespec='seconds')
+        current = self.snapshot(include_archive=True)
+        working = {}
+        earliest = None
+        for line in _reversed_lines(self.change_log):
+            if not line.strip():
+                continue
+            event = ChangeEvent(**loads(line))
+            if event.at is None:
+                raise HistoryError(f"The change log has no commit times before {earliest or 'now'}")
+            if event.at <= cutoff:
+                break
+            earliest = event.at
+            if event.op == 'archive':
+                continue  # archived records are in the snapshot either way
+            records = working.get(event.collection)
+            if records is None:
+                records = working[event.collection] = {r['id']: r for r in current[event.collection]}
+            if event.before is None:
+                records.pop(event.record_id, None)
+            else:
+                records[event.record_id] = from_json(event.collection, upgrade(event.collection, event.before, 0))
+        collections = dict(current._collections)
+        collections.update((collection, tuple(records.values())) for collection, records in working.items())
+        return Snapshot(None, collections)
+
+
+class UndoStack:
+    """One session's undo/redo over a store shared with other sessions.
+
+    Wrap each user action in track(); undo commits the inverse of that
+    action's versions and retracts the notes it added, so other sessions'
+    later changes are kept. An undo fails with HistoryError if someone has
+    changed the same records since; the action then stays on the stack.
+    """
+
+    def __init__(self, store, limit=50):
+        self.store = store
+        # (Recording, label) per action
+        self._undo = deque(maxlen=limit)
+        self._redo = []
+
+    @contextmanager
+    def track(self, label):
+        with self.store.recording() as recording:
+            yield
+        if recording.versions or recording.notes:
+            self._undo.append((recording, label))
+            self._redo.clear()
+
+    def undo_label(self):
+        return self._undo[-1][1] if self._undo else None
+
+    def redo_label(self):
+        return self._redo[-1][1] if self._redo else None
+
+    def undo(self):
+        """Undo the latest tracked action; returns its label."""
+        recording, label = self._undo[-1]
+        versions = [self.store.revert(version) for version in reversed(recording.versions)]
+        for collection, parent_id, offset, _ in reversed(recording.notes):
+            self.store.notes.retract(collection, parent_id, offset)
+        self._undo.pop()
+        self._redo.append((Recording(versions, recording.notes), label))
+        return label
+
+    def redo(self):
+        """Redo the latest undone action; returns its label."""
+        recording, label = self._redo[-1]
+        versions = [self.store.revert(version) for version in reversed(recording.versions)]
+        notes = [(collection, parent_id, self.store.notes.append_many(collection, parent_id, [note])[0], note)
+                 for collection, parent_id, _, note in recording.notes]
+        self._redo.pop()
+        self._undo.append((Recording(versions, notes), label))
+        return label
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manager Hub data maintenance")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--team', help="Team id (default: every team in the roster)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    archive_parser = subparsers.add_parser('archive', help="Move closed/old records to cold storage")
+    archive_parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS)
+    subparsers.add_parser('migrate', help="Rewrite files stored at an older schema version now")
+    tail_parser = subparsers.add_parser('tail', help="Print the change feed as JSON lines")
+    tail_parser.add_argument('--offset', type=int, default=0)
+    tail_parser.add_argument('--follow', action='store_true')
+    args = parser.parse_args()
+
+    from roster import Roster, open_team
+    try:
+        from columnar import write_columns
+    except ImportError:
+        # numpy/pandas are only needed for the analytics copy
+        write_columns = None
+    roster = Roster(args.data_dir)
+    team_ids = [args.team] if args.team else [team['id'] for team in roster.teams]
+
+    if args.command == 'tail':
+        if len(team_ids) != 1:
+            parser.error("tail needs --team")
+        change_log = roster.team_dir(team_ids[0]) / CHANGE_LOG
+        for _, event in tail_changes(change_log, args.offset, args.follow):
+            print(event_to_json(event), flush=True)
+        return
+
+    for team_id in team_ids:
+        try:
+            store, _ = open_team(roster, team_id)
+        except StoreLockedError as e:
+            print(f"❌ {team_id}: {e}")
+            continue
+        if args.command == 'archive':
+            moved = store.archive(args.days)
+            for collection, count in moved.items():
+                print(f"   - {team_id}/{collection}: {count} archived")
+            print(f"✅ {team_id}: archived {sum(moved.values())} record(s) older than {args.days} days")
+            if write_columns is not None:
+                write_columns(store)
+        elif args.command == 'migrate':
+            migrated = store.migrate()
+            for collection in migrated:
+                print(f"   - {team_id}/{collection}: now at schema version {SCHEMA_VERSIONS[collection]}")
+            print(f"✅ {team_id}: {len(migrated)} collection(s) migrated")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,580 @@
+"""
+Integrity check and repair for Manager Hub & TAG Training data
+
+Reads every team's collection files directly (not through DataStore,
+which would quietly set bad records aside) and reports:
+
+    schema            missing fields, wrong types, unknown enum values, bad dates
+    duplicate_id      an id used twice in a collection, or also used by an archived record
+    orphaned_member   a member id that is not on the team (or not on the roster at all),
+                      or a legacy team_member name that is not on the team
+    matrix_completed  a matrix skill whose `completed` flag disagrees with its levels
+
+Collection files hold one record per line, so each file is cut into
+line-aligned chunks and the chunks of every file are checked on a process
+pool. Records are first checked against plain type/value tests derived
+from the records.py schema; only records that fail those are built with
+records.from_json, which has the final say and gives the error message.
+Legacy records that still name their member (team_member) are resolved
+through the roster and checked like the rest. Without --repair nothing
+is written, roster.json included.
+
+With --repair:
+- Fixable schema problems are corrected: enum values in the wrong case,
+  DD/MM/YYYY dates, and numbers or flags stored as text. Records that
+  still fail are moved to rejected.jsonl, as the app would do on load.
+- A duplicate keeps its first record; later copies get new ids, and the
+  notes logged under the shared id are copied to each new id.
+- A member on the roster but not on the team is added to the team, and
+  so is an unknown legacy name (as the app would on load). Unknown member
+  ids are only reported.
+- A matrix skill's completed flag is set to follow its levels
+  (records.skill_completed); the levels are left alone.
+Stop the app before repairing, or it may write its old copy back.
+
+Usage:
+    python fsck.py                                # check every team
+    python fsck.py --team north --repair --report fsck_report.csv
+"""
+
+import argparse
+import csv
+import dataclasses
+import gzip
+import multiprocessing
+import os
+import time
+from array import array
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from enum import Enum
+from pathlib import Path
+from typing import Union, get_args, get_origin, get_type_hints
+
+from codec import atomic_write, dumps, load_array, loads, read_json
+from data_utils import (ARCHIVE_DIR, ARCHIVE_MANIFEST, COLLECTIONS, NOTE_FIELDS, NOTES_DIR, REJECTED_FILE,
+                        SCHEMA_FILE, NoteStore)
+from records import (IsoDate, Level, RecordError, RECORD_TYPES, SCHEMA_VERSIONS, Timestamp, from_json,
+                     skill_completed, upgrade)
+from roster import ROSTER_FILE, SUMMARY_FILE, Roster
+
+CHECKS = ('schema', 'duplicate_id', 'orphaned_member', 'matrix_completed')
+# Files are checked in chunks of about this many bytes
+CHUNK_BYTES = 4 * 1024 * 1024
+MAX_PRINTED = 20
+DATE_FORMATS = ('%d/%m/%Y', '%Y/%m/%d', '%d-%m-%Y', '%d.%m.%Y')
+TIMESTAMP_FORMATS = DATE_FORMATS + ('%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S')
+TRUE_TEXT = ('true', 'yes', 'y', '1')
+FALSE_TEXT = ('false', 'no', 'n', '0', '')
+# Stands in for the member id of a legacy record whose name is not on the team
+# while the rest of it is checked; real member ids start at 1
+UNKNOWN_MEMBER_ID = 0
+
+Issue = namedtuple('Issue', 'team_id collection line record_id check problem repair')
+# Per chunk: lines read, (line, id) of every good record, issues as
+# (line, id, check, problem, repair), {line: fixed raw record},
+# {line: (raw record or text, error)} to reject, and (line, id, member_id) orphans,
+# where member_id is the name itself for a legacy record whose name is not on the team
+ChunkResult = namedtuple('ChunkResult', 'lines record_lines ids issues fixes rejects orphans')
+# new_ids maps file line -> new id; renumbered holds (old id, new id) pairs
+CollectionResult = namedtuple('CollectionResult',
+                              'records issues fixes rejects new_ids renumbered members_to_add names_to_add')
+
+_REQUIRED = object()
+_validators = {}
+
+
+# ---- per-record checks (run in the pool workers) ----
+
+def _value_check(annotation):
+    """fn(value) -> bool, True when the value is certainly valid for the annotation."""
+    if get_origin(annotation) is Union:
+        inner = _value_check(next(a for a in get_args(annotation) if a is not type(None)))
+        return lambda value: value is None or inner(value)
+    if get_origin(annotation) is tuple:
+        inner = _value_check(get_args(annotation)[0])
+        return lambda value: isinstance(value, list) and all(map(inner, value))
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        values = frozenset(member.value for member in annotation)
+        return lambda value: isinstance(value, str) and value in values
+    if annotation is IsoDate:
+        def check_date(value):
+            try:
+                date.fromisoformat(value[:10])
+                return True
+            except (TypeError, ValueError):
+                return False
+        return check_date
+    if annotation is Timestamp:
+        def check_timestamp(value):
+            try:
+                datetime.fromisoformat(value)
+                return True
+            except (TypeError, ValueError):
+                return False
+        return check_timestamp
+    if annotation is float:
+        return lambda value: type(value) in (int, float)
+    return lambda value: type(value) is annotation
+
+
+def _fields(collection):
+    """[(name, annotation, check, default or _REQUIRED)] for a collection's schema."""
+    fields = _validators.get(collection)
+    if fields is None:
+        record_type = RECORD_TYPES[collection]
+        hints = get_type_hints(record_type)
+        fields = _validators[collection] = [
+            (f.name, hints[f.name], _value_check(hints[f.name]),
+             _REQUIRED if f.default is dataclasses.MISSING and f.default_factory is dataclasses.MISSING
+             else f.default)
+            for f in dataclasses.fields(record_type) if f.name != 'extra']
+    return fields
+
+
+def quick_valid(collection, raw):
+    for name, _, check, default in _fields(collection):
+        if name in raw:
+            if not check(raw[name]):
+                return False
+        elif default is _REQUIRED:
+            return False
+    return True
+
+
+def _parse_formats(text, formats):
+    for fmt in formats:
+        try:
+            return datetime.strptime(text.strip(), fmt)
+        except ValueError:
+            pass
+    raise ValueError(text)
+
+
+def coerce(annotation, value):
+    """The value converted to what the annotation expects, or ValueError/TypeError."""
+    if get_origin(annotation) is Union:
+        if value is None or value == '':
+            return None
+        return coerce(next(a for a in get_args(annotation) if a is not type(None)), value)
+    if get_origin(annotation) is tuple:
+        if isinstance(value, str):
+            value = [part for part in value.split(',') if part.strip()]
+        return [coerce(get_args(annotation)[0], v) for v in value]
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        wanted = str(value).strip().casefold()
+        for member in annotation:
+            if member.value.casefold() == wanted:
+                return member.value
+        raise ValueError(value)
+    if annotation is IsoDate:
+        try:
+            date.fromisoformat(value[:10])
+            return value
+        except ValueError:
+            return _parse_formats(value, DATE_FORMATS).date().isoformat()
+    if annotation is Timestamp:
+        try:
+            datetime.fromisoformat(value)
+            return value
+        except ValueError:
+            return _parse_formats(value, TIMESTAMP_FORMATS).isoformat()
+    if annotation is float:
+        if isinstance(value, str):
+            return float(value.replace('£', '').replace(',', '').strip())
+        if isinstance(value, bool):
+            raise TypeError(value)
+        return float(value)
+    if annotation is int:
+        if isinstance(value, str) or (isinstance(value, float) and value.is_integer()):
+            return int(float(value))
+        raise TypeError(value)
+    if annotation is bool:
+        if isinstance(value, str) and value.strip().casefold() in TRUE_TEXT + FALSE_TEXT:
+            return value.strip().casefold() in TRUE_TEXT
+        if value in (0, 1):
+            return bool(value)
+        raise TypeError(value)
+    if annotation is str:
+        if value is None:
+            return ''
+        if isinstance(value, (int, float)):
+            return str(value)
+    raise TypeError(value)
+
+
+def repair_schema(collection, raw):
+    """(fixed copy, [field names changed]) with every bad field coerced; raises if one cannot be."""
+    fixed = dict(raw)
+    changed = []
+    for name, annotation, check, _ in _fields(collection):
+        if name in fixed and not check(fixed[name]):
+            fixed[name] = coerce(annotation, fixed[name])
+            changed.append(name)
+    return fixed, changed
+
+
+def _matrix_repair(raw, today):
+    """(problem, repair, fixed copy) for an inconsistent matrix skill, or None.
+
+    The completed flag is made to follow the levels (records.skill_completed);
+    the levels themselves are never changed.
+    """
+    completed = skill_completed(Level(raw['current_level']), Level(raw['required_level']))
+    if raw['completed'] and not completed:
+        return (f"completed at {raw['current_level']}, not the required {raw['required_level']}",
+                "marked not completed", dict(raw, completed=False, completion_date=None))
+    if not raw['completed'] and completed:
+        return (f"at {raw['current_level']} (required {raw['required_level']}) but not completed",
+                "marked completed", dict(raw, completed=True, completion_date=raw.get('completion_date') or today))
+    if raw['completed'] and not raw.get('completion_date'):
+        return "completed without a completion date", "completion_date set", dict(raw, completion_date=today)
+    return None
+
+
+def _with_name(raw, name):
+    """A checked legacy record put back as stored, with its team_member name."""
+    restored = {key: value for key, value in raw.items() if key != 'member_id'}
+    restored['team_member'] = name
+    return restored
+
+
+def check_lines(collection, lines, members, names, version, first_line=1):
+    """ChunkResult for record lines (one JSON object per line, trailing commas allowed).
+
+    Records are checked after upgrading them from the schema version they were stored at.
+    Legacy records naming their member (team_member) are resolved through names
+    ({name: member id} for the team), as the app's member migration does; fixes
+    to them are written with the member id, or the name if it is not on the team.
+    """
+    stale = version < SCHEMA_VERSIONS[collection]
+    today = datetime.now().isoformat()
+    record_lines, ids = array('q'), array('q')
+    issues, fixes, rejects, orphans = [], {}, {}, []
+    for i, line in enumerate(lines, first_line):
+        text = line.strip().strip(b',')
+        if text in (b'[', b']', b''):
+            continue
+        try:
+            raw = loads(text)
+        except ValueError as e:
+            raw, error = None, f"not valid JSON ({e})"
+        else:
+            error = None if isinstance(raw, dict) else "not a JSON object"
+        if error:
+            issues.append((i, None, 'schema', error, "moved to rejected.jsonl"))
+            rejects[i] = (text.decode('utf-8', 'replace'), error)
+            continue
+        if stale:
+            raw = upgrade(collection, raw, version)
+        unknown_name = None
+        if 'team_member' in raw and 'member_id' not in raw:
+            name = raw['team_member']
+            raw = {key: value for key, value in raw.items() if key != 'team_member'}
+            raw['member_id'] = names.get(name, UNKNOWN_MEMBER_ID)
+            if raw['member_id'] == UNKNOWN_MEMBER_ID:
+                unknown_name = name
+        stored = (lambda r: r) if unknown_name is None else (lambda r: _with_name(r, unknown_name))
+        if not quick_valid(collection, raw):
+            try:
+                from_json(collection, raw)
+            except RecordError as e:
+                try:
+                    fixed, changed = repair_schema(collection, raw)
+                    from_json(collection, fixed)
+                except (RecordError, TypeError, ValueError, AttributeError):
+                    issues.append((i, raw.get('id'), 'schema', str(e), "moved to rejected.jsonl"))
+                    rejects[i] = (stored(raw), str(e))
+                    continue
+                issues.append((i, raw['id'], 'schema', str(e), f"fixed {', '.join(changed)}"))
+                raw = fixed
+                fixes[i] = stored(fixed)
+        record_lines.append(i)
+        ids.append(raw['id'])
+        if unknown_name is not None:
+            orphans.append((i, raw['id'], unknown_name))
+        elif raw['member_id'] not in members:
+            orphans.append((i, raw['id'], raw['member_id']))
+        if collection == 'training_matrix':
+            problem = _matrix_repair(raw, today)
+            if problem is not None:
+                issues.append((i, raw['id'], 'matrix_completed', problem[0], problem[1]))
+                fixes[i] = stored(problem[2])
+    return ChunkResult(len(lines), record_lines, ids, issues, fixes, rejects, orphans)
+
+
+def check_chunk(collection, path, start, end, members, names, version):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    lines = data.split(b'\n')
+    if lines and lines[-1] == b'':
+        lines.pop()
+    return check_lines(collection, lines, members, names, version)
+
+
+# ---- files and chunks ----
+
+def is_line_format(path):
+    """Whether a collection file has one record per line (as codec.write_array writes)."""
+    with open(path, 'rb') as f:
+        first = f.readline().strip()
+        second = f.readline().strip()
+    return first == b'[' and (second in (b']', b'') or (second.startswith(b'{') and second.rstrip(b',').endswith(b'}')))
+
+
+def chunk_ranges(path, chunk_bytes=CHUNK_BYTES):
+    """[(start, end)] byte ranges covering the file, each ending after a newline."""
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+    with open(path, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def iter_record_texts(path):
+    """(line number, record text) for every record line of a line-format file."""
+    with open(path, 'rb') as f:
+        for i, line in enumerate(f, 1):
+            text = line.strip().strip(b',')
+            if text not in (b'[', b']', b''):
+                yield i, text
+
+
+def archived_ids(team_dir, collection):
+    """Ids of a collection's archived records."""
+    archive_dir = team_dir / ARCHIVE_DIR
+    manifest_path = archive_dir / ARCHIVE_MANIFEST
+    if not manifest_path.exists():
+        return set(), 0
+    entry = read_json(manifest_path).get(collection, {})
+    ids = set()
+    for segment in entry.get('segments', []):
+        with gzip.open(archive_dir / segment, 'rb') as f:
+            ids.update(loads(line)['id'] for line in f if line.strip())
+    return ids, entry.get('max_id', 0)
+
+
+# ---- whole run ----
+
+class Checker:
+    """Checks (and optionally repairs) the collections of some teams."""
+
+    def __init__(self, roster, team_ids=None, workers=None, chunk_bytes=CHUNK_BYTES):
+        self.roster = roster
+        self.team_ids = team_ids or [team['id'] for team in roster.teams]
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunk_bytes = chunk_bytes
+        self.issues = []
+        self.records = 0
+        self._results = {}
+
+    def _jobs(self):
+        """(team_id, collection, [(fn, args)] checking the file in pieces)."""
+        for team_id in self.team_ids:
+            team_dir = self.roster.team_dir(team_id)
+            members = frozenset(self.roster.members(team_id))
+            # The first member with a name wins, as in Roster.member_migration
+            names = {}
+            for member_id in reversed(self.roster.members(team_id)):
+                names[self.roster.name(member_id)] = member_id
+            schema_path = team_dir / SCHEMA_FILE
+            versions = read_json(schema_path) if schema_path.exists() else {}
+            for collection, filename in COLLECTIONS.items():
+                path = team_dir / filename
+                if not path.exists():
+                    continue
+                version = versions.get(collection, 0)
+                if is_line_format(path):
+                    pieces = [(check_chunk, (collection, path, start, end, members, names, version))
+                              for start, end in chunk_ranges(path, self.chunk_bytes)]
+                else:
+                    # Older indented files are checked in one piece, record by record
+                    lines = [dumps(r).encode('utf-8') for r in load_array(path)]
+                    pieces = [(check_lines, (collection, lines, members, names, version, 2))]
+                yield team_id, collection, pieces
+
+    def run(self):
+        """Check everything; returns the issues found."""
+        jobs = list(self._jobs())
+        if self.workers == 1:
+            chunk_results = [[fn(*args) for fn, args in pieces] for _, _, pieces in jobs]
+        else:
+            fork = 'fork' in multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if fork else None)
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+                futures = [[executor.submit(fn, *args) for fn, args in pieces] for _, _, pieces in jobs]
+                chunk_results = [[future.result() for future in group] for group in futures]
+        for (team_id, collection, _), chunks in zip(jobs, chunk_results):
+            self._merge(team_id, collection, chunks)
+        return self.issues
+
+    def _merge(self, team_id, collection, chunks):
+        """Combine a file's chunk results, then check ids and members across the whole file."""
+        issues, fixes, rejects = [], {}, {}
+        record_lines, ids, orphans = [], [], []
+        base = 0
+        for chunk in chunks:
+            # Chunks number their lines from 1; shift them to file line numbers
+            shift = base
+            issues += [(line + shift, *rest) for line, *rest in chunk.issues]
+            fixes.update((line + shift, raw) for line, raw in chunk.fixes.items())
+            rejects.update((line + shift, reject) for line, reject in chunk.rejects.items())
+            record_lines.append(array('q', (line + shift for line in chunk.record_lines)))
+            ids.append(chunk.ids)
+            orphans += [(line + shift, record_id, member_id) for line, record_id, member_id in chunk.orphans]
+            base += chunk.lines
+
+        archived, archived_max = archived_ids(self.roster.team_dir(team_id), collection)
+        next_id = max([archived_max] + [max(chunk_ids, default=0) for chunk_ids in ids]) + 1
+        seen = set(archived)
+        new_ids, renumbered = {}, []
+        for lines, chunk_ids in zip(record_lines, ids):
+            for line, record_id in zip(lines, chunk_ids):
+                if record_id in seen:
+                    where = "an archived record" if record_id in archived else "an earlier record"
+                    issues.append((line, record_id, 'duplicate_id', f"id {record_id} also used by {where}",
+                                   f"id changed to {next_id}"))
+                    new_ids[line] = next_id
+                    renumbered.append((record_id, next_id))
+                    next_id += 1
+                else:
+                    seen.add(record_id)
+
+        members_to_add, names_to_add = set(), set()
+        for line, record_id, member_id in orphans:
+            if isinstance(member_id, str):
+                # Legacy name; the app would add it to the team as a new member on load
+                names_to_add.add(member_id)
+                issues.append((line, record_id, 'orphaned_member',
+                               f"'{member_id}' is not a member of team {team_id}", "added to the team"))
+            elif self.roster.is_member(member_id):
+                members_to_add.add(member_id)
+                issues.append((line, record_id, 'orphaned_member',
+                               f"{self.roster.name(member_id)} (#{member_id}) is not on team {team_id}",
+                               "added to the team"))
+            else:
+                issues.append((line, record_id, 'orphaned_member',
+                               f"member #{member_id} is not on the roster", ""))
+
+        issues.sort(key=lambda issue: issue[0])
+        self.issues += [Issue(team_id, collection, *issue) for issue in issues]
+        self.records += sum(len(chunk_ids) for chunk_ids in ids)
+        self._results[team_id, collection] = CollectionResult(
+            sum(len(chunk_ids) for chunk_ids in ids), issues, fixes, rejects, new_ids, renumbered,
+            members_to_add, names_to_add)
+
+    def repair(self):
+        """Write the repairs found by run(). Returns the number of records changed or removed."""
+        changed = 0
+        for (team_id, collection), result in self._results.items():
+            for member_id in sorted(result.members_to_add):
+                self.roster.add_to_team(team_id, member_id)
+            for name in sorted(result.names_to_add):
+                # Other collections of the team may have added the same name already
+                if self.roster.member_id(name, team_id) is None:
+                    self.roster.add_member(team_id, name)
+            if not (result.fixes or result.rejects or result.new_ids):
+                continue
+            team_dir = self.roster.team_dir(team_id)
+            path = team_dir / COLLECTIONS[collection]
+            changed += len(set(result.fixes) | set(result.rejects) | set(result.new_ids))
+            self._rewrite(path, collection, result)
+            if result.renumbered and collection in NOTE_FIELDS:
+                # Notes are keyed by id, so there is no telling which copy
+                # they were written for: each renumbered copy keeps them too
+                notes = NoteStore(team_dir / NOTES_DIR)
+                for old_id, new_id in result.renumbered:
+                    notes.append_many(collection, new_id, notes.history(collection, old_id))
+            if result.rejects:
+                with open(team_dir / REJECTED_FILE, 'a', encoding='utf-8') as f:
+                    f.write(''.join(dumps({'collection': collection, 'source': 'active', 'error': error,
+                                           'record': record}) + '\n'
+                                    for record, error in result.rejects.values()))
+            # Rebuilt from the repaired files on next use
+            (team_dir / SUMMARY_FILE).unlink(missing_ok=True)
+        return changed
+
+    def _rewrite(self, path, collection, result):
+        if is_line_format(path):
+            texts = iter_record_texts(path)
+        else:
+            texts = ((i, dumps(r).encode('utf-8')) for i, r in enumerate(load_array(path), 2))
+
+        def write(f):
+            f.write(b'[')
+            separator = b'\n'
+            for line, text in texts:
+                if line in result.rejects:
+                    continue
+                raw = result.fixes.get(line)
+                if line in result.new_ids:
+                    raw = dict(raw if raw is not None else loads(text), id=result.new_ids[line])
+                f.write(separator)
+                f.write(text if raw is None else dumps(raw).encode('utf-8'))
+                separator = b',\n'
+            f.write(b'\n]\n')
+        atomic_write(path, write)
+
+
+def write_report(path, issues):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Team', 'Collection', 'Line', 'Record Id', 'Check', 'Problem', 'Repair'])
+        writer.writerows(issues)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check (and repair) Manager Hub data files")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--team', action='append', help="Only this team (repeatable; default every team)")
+    parser.add_argument('--repair', action='store_true', help="Fix what can be fixed (stop the app first)")
+    parser.add_argument('--report', help="Write every issue to this CSV")
+    parser.add_argument('--workers', type=int, help="Worker processes (default one per CPU)")
+    args = parser.parse_args()
+
+    if not args.repair and not (Path(args.data_dir) / ROSTER_FILE).exists():
+        print(f"❌ No {ROSTER_FILE} in {args.data_dir}; open the app once (or use --repair) to set it up")
+        raise SystemExit(1)
+    # Only --repair may change anything, the roster included
+    roster = Roster(args.data_dir, read_only=not args.repair)
+    for team_id in args.team or ():
+        if team_id not in {team['id'] for team in roster.teams}:
+            print(f"❌ No such team: {team_id}")
+            raise SystemExit(1)
+
+    started = time.perf_counter()
+    checker = Checker(roster, args.team, args.workers)
+    issues = checker.run()
+    elapsed = time.perf_counter() - started
+    print(f"📊 Checked {checker.records:,} records in {len(checker.team_ids)} team(s) in {elapsed:.2f}s "
+          f"on {checker.workers} worker(s)")
+    counts = Counter(issue.check for issue in issues)
+    for check in CHECKS:
+        print(f"   - {check}: {counts[check]}")
+    for issue in issues[:MAX_PRINTED]:
+        repair = f" -> {issue.repair}" if issue.repair else " (not repairable)"
+        print(f"       {issue.team_id}/{issue.collection} line {issue.line}: {issue.problem}{repair}")
+    if len(issues) > MAX_PRINTED:
+        print(f"       ... and {len(issues) - MAX_PRINTED} more")
+    if args.report:
+        write_report(args.report, issues)
+        print(f"✅ Report written to {args.report}")
+
+    if args.repair and issues:
+        changed = checker.repair()
+        print(f"✅ Repaired {changed} record(s) in {time.perf_counter() - started:.2f}s")
+    unrepairable = sum(not issue.repair for issue in issues)
+    if issues and (not args.repair or unrepairable):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
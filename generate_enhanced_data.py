@@ -8,13 +8,33 @@ from datetime import datetime, timedelta
 from pathlib import Path
 
 DATA_DIR = Path("data")
-DATA_DIR.mkdir(exist_ok=True)
+TEAM_DIR = DATA_DIR / "teams" / "default"
+TEAM_DIR.mkdir(parents=True, exist_ok=True)
+
+# Demo roster with a single team; records refer to members by id
+ALICE, BOB, CAROL, DAVID = 1, 2, 3, 4
+roster = {
+    'members': [
+        {'id': ALICE, 'name': 'Alice Johnson'},
+        {'id': BOB, 'name': 'Bob Smith'},
+        {'id': CAROL, 'name': 'Carol Williams'},
+        {'id': DAVID, 'name': 'David Brown'}
+    ],
+    'teams': [
+        {
+            'id': 'default',
+            'name': 'My Team',
+            'manager': 'Manager',
+            'members': [ALICE, BOB, CAROL, DAVID]
+        }
+    ]
+}
 
 # Sample check-ins
 sample_checkins = [
     {
         'id': 1,
-        'team_member': 'Alice Johnson',
+        'member_id': ALICE,
         'date': (datetime.now() - timedelta(days=2)).isoformat()[:10],
         'type': 'Training Discussion',
         'notes': 'Discussed progress on Python certification. Alice is doing well and should complete by end of quarter. Also talked about upcoming Sytner sales training.',
@@ -24,7 +44,7 @@ sample_checkins = [
     },
     {
         'id': 2,
-        'team_member': 'Bob Smith',
+        'member_id': BOB,
         'date': (datetime.now() - timedelta(days=5)).isoformat()[:10],
         'type': 'Wellbeing Check',
         'notes': 'Bob mentioned feeling overwhelmed with balancing current role and new training requirements. Agreed to spread out training matrix items over longer period.',
@@ -34,7 +54,7 @@ sample_checkins = [
     },
     {
         'id': 3,
-        'team_member': 'Carol Williams',
+        'member_id': CAROL,
         'date': (datetime.now() - timedelta(days=7)).isoformat()[:10],
         'type': 'Progress Update',
         'notes': 'Carol completed leadership training ahead of schedule. Excellent feedback from facilitators. Ready to take on team lead responsibilities.',
@@ -48,7 +68,7 @@ sample_checkins = [
 sample_actions = [
     {
         'id': 1,
-        'team_member': 'Alice Johnson',
+        'member_id': ALICE,
         'action': 'Complete final module of Python certification',
         'priority': 'High',
         'owner': 'Team Member',
@@ -66,7 +86,7 @@ sample_actions = [
     },
     {
         'id': 2,
-        'team_member': 'Bob Smith',
+        'member_id': BOB,
         'action': 'Review and prioritize training matrix items with manager',
         'priority': 'High',
         'owner': 'Both',
@@ -79,7 +99,7 @@ sample_actions = [
     },
     {
         'id': 3,
-        'team_member': 'Carol Williams',
+        'member_id': CAROL,
         'action': 'Submit expenses for leadership training',
         'priority': 'Medium',
         'owner': 'Team Member',
@@ -96,7 +116,7 @@ sample_actions = [
 sample_training = [
     {
         'id': 1,
-        'team_member': 'Alice Johnson',
+        'member_id': ALICE,
         'course_name': 'Advanced Python for Data Analysis',
         'type': 'Online Course',
         'start_date': (datetime.now() - timedelta(days=45)).isoformat()[:10],
@@ -123,7 +143,7 @@ sample_training = [
     },
     {
         'id': 2,
-        'team_member': 'Bob Smith',
+        'member_id': BOB,
         'course_name': 'Time Management & Productivity',
         'type': 'Self-Study',
         'start_date': (datetime.now() - timedelta(days=5)).isoformat()[:10],
@@ -141,7 +161,7 @@ sample_training = [
     },
     {
         'id': 3,
-        'team_member': 'Carol Williams',
+        'member_id': CAROL,
         'course_name': 'Leadership Fundamentals',
         'type': 'In-Person Training',
         'start_date': (datetime.now() - timedelta(days=21)).isoformat()[:10],
@@ -168,7 +188,7 @@ sample_training = [
 sample_training_matrix = [
     {
         'id': 1,
-        'team_member': 'Alice Johnson',
+        'member_id': ALICE,
         'skill_name': 'Python Programming',
         'category': 'Technical',
         'required_level': 'Advanced',
@@ -188,7 +208,7 @@ sample_training_matrix = [
     },
     {
         'id': 2,
-        'team_member': 'Alice Johnson',
+        'member_id': ALICE,
         'skill_name': 'SQL Database Management',
         'category': 'Technical',
         'required_level': 'Intermediate',
@@ -203,7 +223,7 @@ sample_training_matrix = [
     },
     {
         'id': 3,
-        'team_member': 'Alice Johnson',
+        'member_id': ALICE,
         'skill_name': 'Data Visualization',
         'category': 'Technical',
         'required_level': 'Intermediate',
@@ -223,7 +243,7 @@ sample_training_matrix = [
     },
     {
         'id': 4,
-        'team_member': 'Bob Smith',
+        'member_id': BOB,
         'skill_name': 'Sytner Product Range',
         'category': 'Product Knowledge',
         'required_level': 'Advanced',
@@ -238,7 +258,7 @@ sample_training_matrix = [
     },
     {
         'id': 5,
-        'team_member': 'Bob Smith',
+        'member_id': BOB,
         'skill_name': 'Customer Service Excellence',
         'category': 'Soft Skills',
         'required_level': 'Advanced',
@@ -253,7 +273,7 @@ sample_training_matrix = [
     },
     {
         'id': 6,
-        'team_member': 'Carol Williams',
+        'member_id': CAROL,
         'skill_name': 'Team Leadership',
         'category': 'Leadership',
         'required_level': 'Intermediate',
@@ -273,7 +293,7 @@ sample_training_matrix = [
     },
     {
         'id': 7,
-        'team_member': 'Carol Williams',
+        'member_id': CAROL,
         'skill_name': 'Conflict Resolution',
         'category': 'Soft Skills',
         'required_level': 'Advanced',
@@ -288,7 +308,7 @@ sample_training_matrix = [
     },
     {
         'id': 8,
-        'team_member': 'David Brown',
+        'member_id': DAVID,
         'skill_name': 'CRM System',
         'category': 'Systems/Tools',
         'required_level': 'Expert',
@@ -303,7 +323,7 @@ sample_training_matrix = [
     },
     {
         'id': 9,
-        'team_member': 'David Brown',
+        'member_id': DAVID,
         'skill_name': 'Project Management',
         'category': 'Leadership',
         'required_level': 'Intermediate',
@@ -322,7 +342,7 @@ sample_training_matrix = [
 sample_sytner_bookings = [
     {
         'id': 1,
-        'team_member': 'Bob Smith',
+        'member_id': BOB,
         'course_name': 'Sytner Sales Excellence Programme',
         'location': 'Regional Centre',
         'start_date': (datetime.now() + timedelta(days=21)).isoformat()[:10],
@@ -340,7 +360,7 @@ sample_sytner_bookings = [
     },
     {
         'id': 2,
-        'team_member': 'Alice Johnson',
+        'member_id': ALICE,
         'course_name': 'Digital Marketing Fundamentals',
         'location': 'Virtual',
         'start_date': (datetime.now() + timedelta(days=7)).isoformat()[:10],
@@ -358,7 +378,7 @@ sample_sytner_bookings = [
     },
     {
         'id': 3,
-        'team_member': 'Carol Williams',
+        'member_id': CAROL,
         'course_name': 'Advanced Leadership Workshop',
         'location': 'Head Office',
         'start_date': (datetime.now() - timedelta(days=21)).isoformat()[:10],
@@ -376,7 +396,7 @@ sample_sytner_bookings = [
     },
     {
         'id': 4,
-        'team_member': 'David Brown',
+        'member_id': DAVID,
         'course_name': 'Customer Experience Excellence',
         'location': 'Regional Centre',
         'start_date': (datetime.now() + timedelta(days=35)).isoformat()[:10],
@@ -398,7 +418,7 @@ sample_sytner_bookings = [
 sample_learning_resources = [
     {
         'id': 1,
-        'team_member': 'Alice Johnson',
+        'member_id': ALICE,
         'title': 'Python for Data Analysis (O\'Reilly)',
         'type': 'Book',
         'provider': 'O\'Reilly Media',
@@ -419,7 +439,7 @@ sample_learning_resources = [
     },
     {
         'id': 2,
-        'team_member': 'Alice Johnson',
+        'member_id': ALICE,
         'title': 'LinkedIn Learning Premium',
         'type': 'License/Subscription',
         'provider': 'LinkedIn',
@@ -435,7 +455,7 @@ sample_learning_resources = [
     },
     {
         'id': 3,
-        'team_member': 'Bob Smith',
+        'member_id': BOB,
         'title': 'Getting Things Done (David Allen)',
         'type': 'Book',
         'provider': 'Amazon',
@@ -451,7 +471,7 @@ sample_learning_resources = [
     },
     {
         'id': 4,
-        'team_member': 'Carol Williams',
+        'member_id': CAROL,
         'title': 'Leaders Eat Last (Simon Sinek)',
         'type': 'Book',
         'provider': 'Amazon',
@@ -472,7 +492,7 @@ sample_learning_resources = [
     },
     {
         'id': 5,
-        'team_member': 'David Brown',
+        'member_id': DAVID,
         'title': 'Project Management Professional (PMP) Prep Course',
         'type': 'Online Course',
         'provider': 'Udemy',
@@ -493,7 +513,7 @@ sample_learning_resources = [
     },
     {
         'id': 6,
-        'team_member': 'David Brown',
+        'member_id': DAVID,
         'title': 'Automotive Industry Conference 2024',
         'type': 'Conference',
         'provider': 'SMMT',
@@ -510,22 +530,25 @@ sample_learning_resources = [
 ]
 
 # Write all data to JSON files
-with open(DATA_DIR / 'checkins.json', 'w') as f:
+with open(DATA_DIR / 'roster.json', 'w') as f:
+    json.dump(roster, f, indent=2)
+
+with open(TEAM_DIR / 'checkins.json', 'w') as f:
     json.dump(sample_checkins, f, indent=2)
 
-with open(DATA_DIR / 'actions.json', 'w') as f:
+with open(TEAM_DIR / 'actions.json', 'w') as f:
     json.dump(sample_actions, f, indent=2)
 
-with open(DATA_DIR / 'training_plans.json', 'w') as f:
+with open(TEAM_DIR / 'training_plans.json', 'w') as f:
     json.dump(sample_training, f, indent=2)
 
-with open(DATA_DIR / 'training_matrix.json', 'w') as f:
+with open(TEAM_DIR / 'training_matrix.json', 'w') as f:
     json.dump(sample_training_matrix, f, indent=2)
 
-with open(DATA_DIR / 'sytner_bookings.json', 'w') as f:
+with open(TEAM_DIR / 'sytner_bookings.json', 'w') as f:
     json.dump(sample_sytner_bookings, f, indent=2)
 
-with open(DATA_DIR / 'learning_resources.json', 'w') as f:
+with open(TEAM_DIR / 'learning_resources.json', 'w') as f:
     json.dump(sample_learning_resources, f, indent=2)
 
 print("✅ Enhanced sample data created successfully!")
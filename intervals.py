@@ -0,0 +1,176 @@
+"""
+Date-range indexes for Manager Hub & TAG Training
+
+LiveIntervals follows a store's change feed (like views.LiveAggregates)
+and keeps every Sytner booking and every in-person training plan as a
+closed [start_date, end_date] interval, indexed per member, per location
+and team-wide. The Sytner page uses it to flag double bookings when a
+course is booked and to draw a calendar of how many staff are away each
+day.
+"""
+
+import bisect
+import threading
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+
+# Training plan types that take someone away from their desk on the plan's dates
+AWAY_TRAINING_TYPES = ('In-Person Training', 'Sytner Training')
+
+Interval = namedtuple('Interval', 'start end collection record_id member_id location label')
+
+
+def record_interval(collection, record):
+    """Interval a record occupies, or None if it does not take anyone away."""
+    if record['status'] == 'Cancelled':
+        return None
+    if collection == 'sytner_bookings':
+        return Interval(record['start_date'][:10], record['end_date'][:10], collection,
+                        record['id'], record['member_id'], record['location'], record['course_name'])
+    if collection == 'training_plans' and record['type'] in AWAY_TRAINING_TYPES:
+        return Interval(record['start_date'][:10], record['end_date'][:10], collection,
+                        record['id'], record['member_id'], None, record['course_name'])
+    return None
+
+
+class IntervalIndex:
+    """Intervals sorted by start, with a running maximum of their ends.
+
+    Every interval that can overlap [start, end] begins at or before end
+    (a bisect on the starts) and lies at or after the first position
+    whose running max end reaches start (a bisect on the running max).
+    That first interval itself overlaps, so an overlap check is two
+    binary searches and listing overlaps only walks the span between.
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._intervals = []
+        self._max_end = []
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def add(self, interval):
+        i = bisect.bisect_right(self._starts, interval.start)
+        self._starts.insert(i, interval.start)
+        self._intervals.insert(i, interval)
+        self._max_end.insert(i, interval.end)
+        self._refresh_max_end(i)
+
+    def remove(self, interval):
+        i = bisect.bisect_left(self._starts, interval.start)
+        while i < len(self._intervals) and self._intervals[i] != interval:
+            i += 1
+        if i == len(self._intervals):
+            return
+        del self._starts[i], self._intervals[i], self._max_end[i]
+        self._refresh_max_end(i)
+
+    def _refresh_max_end(self, i):
+        running = self._max_end[i - 1] if i else ''
+        for j in range(i, len(self._intervals)):
+            running = max(running, self._intervals[j].end)
+            self._max_end[j] = running
+
+    def _span(self, start, end):
+        k = bisect.bisect_right(self._starts, end)
+        j = bisect.bisect_left(self._max_end, start, 0, k)
+        return j, k
+
+    def has_overlap(self, start, end):
+        j, k = self._span(start, end)
+        return j < k
+
+    def overlapping(self, start, end):
+        """Intervals sharing at least one day with [start, end] (ISO dates)."""
+        j, k = self._span(start, end)
+        return [interval for interval in self._intervals[j:k] if interval.end >= start]
+
+
+class LiveIntervals:
+    """Interval indexes per member, per location and team-wide, kept current from a store."""
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        self._by_member = defaultdict(IntervalIndex)
+        self._by_location = defaultdict(IntervalIndex)
+        self._all = IntervalIndex()
+        # Unlike counters, removals must follow the adds they undo, so
+        # events landing before the snapshot is indexed are held back
+        self._pending = []
+        snapshot = store.subscribe(self.apply)
+        with self._lock:
+            for collection in ('sytner_bookings', 'training_plans'):
+                for record in snapshot[collection]:
+                    self._add(record_interval(collection, record))
+            pending, self._pending = self._pending, None
+            for event in pending:
+                self._apply(event)
+
+    def _indexes(self, interval):
+        yield self._all
+        yield self._by_member[interval.member_id]
+        if interval.location is not None:
+            yield self._by_location[interval.location]
+
+    def _add(self, interval):
+        if interval is not None:
+            for index in self._indexes(interval):
+                index.add(interval)
+
+    def _remove(self, interval):
+        if interval is not None:
+            for index in self._indexes(interval):
+                index.remove(interval)
+
+    def apply(self, event):
+        if event.collection not in ('sytner_bookings', 'training_plans'):
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(event)
+            else:
+                self._apply(event)
+
+    def _apply(self, event):
+        if event.before is not None:
+            self._remove(record_interval(event.collection, event.before))
+        if event.after is not None:
+            self._add(record_interval(event.collection, event.after))
+
+    def clashes(self, member_id, start, end, exclude=None):
+        """A member's bookings/plans overlapping [start, end]; exclude is (collection, id)."""
+        start, end = _iso(start), _iso(end)
+        with self._lock:
+            found = self._by_member[member_id].overlapping(start, end)
+        return [i for i in found if (i.collection, i.record_id) != exclude]
+
+    def at_location(self, location, start, end):
+        start, end = _iso(start), _iso(end)
+        with self._lock:
+            return self._by_location[location].overlapping(start, end)
+
+    def away_calendar(self, start, end, members=None):
+        """[(day, sorted member ids away that day)] for every day in [start, end]."""
+        start, end = _as_date(start), _as_date(end)
+        with self._lock:
+            found = self._all.overlapping(start.isoformat(), end.isoformat())
+        days = (end - start).days + 1
+        away = [set() for _ in range(days)]
+        for interval in found:
+            if members is not None and interval.member_id not in members:
+                continue
+            first = max((_as_date(interval.start) - start).days, 0)
+            last = min((_as_date(interval.end) - start).days, days - 1)
+            for offset in range(first, last + 1):
+                away[offset].add(interval.member_id)
+        return [(start + timedelta(days=offset), sorted(ids)) for offset, ids in enumerate(away)]
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, date) else value[:10]
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(value[:10])
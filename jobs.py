@@ -0,0 +1,87 @@
+"""
+Background jobs for Manager Hub & TAG Training
+
+Heavy work (CSV exports, the Matrix View frame) runs on a shared thread
+pool instead of the Streamlit script thread, so a session keeps
+responding while a big export builds. Jobs are keyed by what they compute
+and the data version they compute it from: asking for the same key again
+returns the running or finished job instead of starting another, and a
+new data version naturally starts a fresh one.
+
+A job function is called as fn(progress, *args) and may report progress
+with progress(fraction, message).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = 4
+# Finished jobs kept for reuse; the oldest are dropped first
+MAX_FINISHED = 32
+
+
+class Job:
+    def __init__(self, key):
+        self.key = key
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.started = time.time()
+        self.finished = None
+        self._done = threading.Event()
+
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def report(self, fraction, message=""):
+        self.progress = min(max(fraction, 0.0), 1.0)
+        self.message = message
+
+    def _run(self, fn, args):
+        try:
+            self.result = fn(self.report, *args)
+            self.progress = 1.0
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = time.time()
+            self._done.set()
+
+
+class JobManager:
+    """Runs jobs on a thread pool and keeps their results by key."""
+
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='manager-hub-job')
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def submit(self, key, fn, *args):
+        """The job for key, starting fn(progress, *args) if there is none yet.
+
+        Failed jobs are not reused, so asking again retries them.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not (job.done() and job.error is not None):
+                self._jobs.move_to_end(key)
+                return job
+            job = self._jobs[key] = Job(key)
+            self._evict()
+        self._executor.submit(job._run, fn, args)
+        return job
+
+    def get(self, key):
+        with self._lock:
+            return self._jobs.get(key)
+
+    def _evict(self):
+        finished = [key for key, job in self._jobs.items() if job.done()]
+        for key in finished[:max(0, len(finished) - MAX_FINISHED)]:
+            del self._jobs[key]
@@ -0,0 +1,184 @@
+"""
+Skill-gap recommendations for Manager Hub & TAG Training
+
+LiveRecommendations follows a store's change feed (like
+intervals.LiveIntervals) and keeps an inverted index from terms to the
+learning resources and Sytner courses that team members have completed.
+Terms are the words of each item's title and description, plus the
+skills and categories of matrix items the same person has completed, so
+a resource that colleagues finished on their way to closing a skill is
+linked to that skill. Suggestions for an open matrix gap are lookups on
+the gap's own terms; nothing is scanned per render.
+
+Completed Sytner bookings are archived after a while, so the index is
+also seeded from the archive segments that exist when it subscribes, and
+ignores later archive events: archived completions keep counting, across
+restarts too.
+"""
+
+import re
+import threading
+from collections import Counter, defaultdict, namedtuple
+
+# Points per matching term: a colleague who closed the same skill, a word
+# shared between the skill name and the item, a colleague who closed a
+# skill in the same category
+SKILL_WEIGHT = 3
+WORD_WEIGHT = 2
+CATEGORY_WEIGHT = 1
+
+STOP_WORDS = frozenset(('and', 'for', 'the', 'with', 'from', 'into', 'your', 'our', 'skills', 'training'))
+
+Recommendation = namedtuple('Recommendation', 'collection title kind cost completions colleagues score')
+
+
+def terms(text):
+    """Lower-case words of a title or skill name, without short and filler words."""
+    return {word for word in re.findall(r'[a-z0-9]+', text.casefold())
+            if len(word) > 2 and word not in STOP_WORDS}
+
+
+def completed_item(collection, record):
+    """(item key, title, kind, cost, text) for a completed resource or course, else None.
+
+    Records with the same title are one item, however many people took it.
+    """
+    if collection == 'learning_resources' and record['status'] == 'Completed':
+        return ((collection, record['title'].casefold().strip()), record['title'], record['type'].value,
+                record['cost'], f"{record['title']} {record['description']}")
+    if (collection == 'sytner_bookings' and record['status'] == 'Completed'
+            and record['attendance'] != 'Did Not Attend'):
+        return ((collection, record['course_name'].casefold().strip()), record['course_name'],
+                record['location'].value, record['cost'] + record['expenses_estimate'],
+                f"{record['course_name']} {record['objectives']}")
+    return None
+
+
+def completed_skill(record):
+    """(normalised skill name, category) of a completed matrix item, else None."""
+    if record['completed']:
+        return record['skill_name'].casefold().strip(), record['category'].value
+    return None
+
+
+def _count(counter, key, sign):
+    """Add sign to counter[key]; True if the key just appeared or disappeared."""
+    before = counter[key]
+    if before + sign > 0:
+        counter[key] = before + sign
+    else:
+        counter.pop(key, None)
+    return (before > 0) != (before + sign > 0)
+
+
+class LiveRecommendations:
+    """Inverted index of terms to completed items, kept current from a store.
+
+    postings[term] is a Counter of item key -> weight, where term is
+    ('word', w), ('skill', name) or ('category', category). Word weights
+    count completions whose text has the word; skill and category weights
+    count colleagues who completed both the skill and the item.
+    """
+
+    def __init__(self, store):
+        self._lock = threading.Lock()
+        self._postings = defaultdict(Counter)
+        # item key -> [title, kind, completions, total cost, Counter of member ids]
+        self._items = {}
+        self._member_items = defaultdict(Counter)
+        self._member_skills = defaultdict(Counter)
+        # Removals must follow the adds they undo, as in LiveIntervals
+        self._pending = []
+        snapshot, segments = store.subscribe_segments(self.apply)
+        with self._lock:
+            for collection in ('training_matrix', 'learning_resources', 'sytner_bookings'):
+                for segment in segments.get(collection, ()):
+                    for record in store.archived_segment(collection, segment):
+                        self._update(collection, record, 1)
+                for record in snapshot[collection]:
+                    self._update(collection, record, 1)
+            pending, self._pending = self._pending, None
+            for event in pending:
+                self._apply(event)
+
+    def apply(self, event):
+        if event.collection not in ('training_matrix', 'learning_resources', 'sytner_bookings'):
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append(event)
+            else:
+                self._apply(event)
+
+    def _apply(self, event):
+        if event.op == 'archive':
+            return  # already counted, and archived completions still count
+        if event.before is not None:
+            self._update(event.collection, event.before, -1)
+        if event.after is not None:
+            self._update(event.collection, event.after, 1)
+
+    def _bump(self, term, key, amount):
+        posting = self._postings[term]
+        _count(posting, key, amount)
+        if not posting:
+            del self._postings[term]
+
+    def _update(self, collection, record, sign):
+        member = record['member_id']
+        if collection == 'training_matrix':
+            skill = completed_skill(record)
+            # Only a person's first completion of a skill links it to their items
+            if skill is not None and _count(self._member_skills[member], skill, sign):
+                for key in self._member_items[member]:
+                    self._link(skill, key, sign)
+            return
+        item = completed_item(collection, record)
+        if item is None:
+            return
+        key, title, kind, cost, text = item
+        entry = self._items.setdefault(key, [title, kind, 0, 0.0, Counter()])
+        entry[2] += sign
+        entry[3] += sign * cost
+        _count(entry[4], member, sign)
+        if entry[2] <= 0:
+            del self._items[key]
+        for word in terms(text):
+            self._bump(('word', word), key, sign)
+        if _count(self._member_items[member], key, sign):
+            for skill in self._member_skills[member]:
+                self._link(skill, key, sign)
+
+    def _link(self, skill, key, sign):
+        name, category = skill
+        self._bump(('skill', name), key, sign)
+        self._bump(('category', category), key, sign)
+
+    def recommend(self, gap, limit=3):
+        """Ranked Recommendations for one open matrix item, best first.
+
+        Items the gap's own member has already completed are left out.
+        """
+        skill = gap['skill_name'].casefold().strip()
+        weights = Counter()
+        with self._lock:
+            lookups = [(('skill', skill), SKILL_WEIGHT), (('category', gap['category'].value), CATEGORY_WEIGHT)]
+            lookups += [(('word', word), WORD_WEIGHT) for word in terms(gap['skill_name'])]
+            for term, weight in lookups:
+                for key, count in self._postings.get(term, {}).items():
+                    # Word matches score once per item, not once per completion
+                    weights[key] += weight * (1 if term[0] == 'word' else count)
+            own = self._member_items.get(gap['member_id'], {})
+            rows = []
+            for key, score in weights.items():
+                if key in own:
+                    continue
+                title, kind, completions, total_cost, members = self._items[key]
+                rows.append(Recommendation(key[0], title, kind, total_cost / completions,
+                                           completions, len(members), score))
+        rows.sort(key=lambda r: (-r.score, -r.completions, r.cost))
+        return rows[:limit]
+
+    def recommendations(self, gaps, limit=3):
+        """[(gap, [Recommendation])] for each open matrix item in gaps."""
+        return [(gap, self.recommend(gap, limit)) for gap in gaps if not gap['completed']]
@@ -0,0 +1,318 @@
+"""
+Expense reconciliation for Manager Hub & TAG Training
+
+Checks that the expenses the hub expects were actually claimed: travel
+estimates on Sytner bookings (travel_required) and the cost of learning
+resources marked link_to_expenses. The claims come from an expense
+system's CSV export, one line per claim, with at least the employee, the
+date and the amount.
+
+The export is read in chunks and only lines for members of the team
+being reconciled are kept; a name shared by two of its members is
+reported as ambiguous instead of guessed. Lines are grouped by member (a
+hash table of date-sorted lines), so each expected item only looks at its
+own member's lines inside its date window, found by binary search. Every
+such line within AMOUNT_BAND of the expected amount is a candidate;
+candidates are ranked (booking reference found in the line first, then
+within tolerance, then by how close the amount is) and assigned greedily,
+so each line pays for at most one item. Lines that are neither within
+tolerance nor carry the reference are held back at first: such a line can
+pay for several of the member's unmatched items whose windows it falls in
+(a split claim), when it is within tolerance of their total. Items end up
+Matched, Over-claimed, Under-claimed or Unmatched.
+
+Usage:
+    python reconcile.py expenses_2025.csv --team north
+    python reconcile.py expenses_2025.csv --team north --output reconciliation.csv
+"""
+
+import argparse
+import bisect
+import sys
+from collections import defaultdict, namedtuple
+from itertools import combinations
+from datetime import date, timedelta
+
+import pandas as pd
+
+from bulk_import import ImportFileError, parse_dates, read_chunks
+from roster import Roster, read_team
+
+# A claim matches when it is within this fraction of the expected amount,
+# or within TOLERANCE_MIN pounds for small amounts
+TOLERANCE = 0.05
+TOLERANCE_MIN = 5.0
+# Lines further from the expected amount than this are not considered at all
+AMOUNT_BAND = (0.5, 2.0)
+# Claims are looked for from DAYS_BEFORE before an item until DAYS_AFTER after it
+DAYS_BEFORE = 14
+DAYS_AFTER = 60
+# Most items one claim line can pay for (e.g. travel for back-to-back courses)
+SPLIT_MAX_ITEMS = 4
+
+# Accepted header names (after lower-casing, spaces as underscores) per field
+EXPENSE_COLUMNS = {
+    'member': ('employee', 'employee_name', 'team_member', 'name', 'claimant'),
+    'date': ('date', 'expense_date', 'transaction_date', 'claim_date'),
+    'amount': ('amount', 'total', 'gross_amount', 'amount_gbp', 'value'),
+    'description': ('description', 'details', 'narrative', 'merchant'),
+    'reference': ('reference', 'claim_id', 'claim_reference', 'ref')
+}
+REQUIRED_EXPENSE_COLUMNS = ('member', 'date', 'amount')
+
+STATUSES = ('Unmatched', 'Under-claimed', 'Over-claimed', 'Matched')
+
+ExpectedClaim = namedtuple('ExpectedClaim', 'collection record_id member_id label expected window_start window_end reference')
+# claimed is the item's share of the line when the line pays for `shared` items
+Reconciled = namedtuple('Reconciled', 'item status claimed difference line shared')
+ExpenseLines = namedtuple('ExpenseLines', 'frame by_member total unknown_members ambiguous_members')
+
+
+def expected_claims(store):
+    """Every Sytner travel estimate and expense-linked resource, archive included."""
+    items = []
+    for booking in store.query('sytner_bookings', travel_required=True,
+                               status=['Booked', 'In Progress', 'Completed'],
+                               include_archive=True, order_by='start_date'):
+        if booking['expenses_estimate'] > 0:
+            items.append(ExpectedClaim(
+                'sytner_bookings', booking['id'], booking['member_id'],
+                f"{booking['course_name']} (travel)", booking['expenses_estimate'],
+                _shift(booking['start_date'], -DAYS_BEFORE), _shift(booking['end_date'], DAYS_AFTER),
+                booking['booking_ref']))
+    for resource in store.query('learning_resources', link_to_expenses=True,
+                                include_archive=True, order_by='assigned_date'):
+        if resource['cost'] > 0:
+            items.append(ExpectedClaim(
+                'learning_resources', resource['id'], resource['member_id'], resource['title'],
+                resource['cost'], _shift(resource['assigned_date'], -DAYS_BEFORE),
+                _shift(resource['assigned_date'], DAYS_AFTER), ''))
+    return items
+
+
+def _shift(iso_date, days):
+    return (date.fromisoformat(iso_date[:10]) + timedelta(days=days)).isoformat()
+
+
+def _find_columns(columns):
+    found = {}
+    for field, names in EXPENSE_COLUMNS.items():
+        found[field] = next((name for name in names if name in columns), None)
+    missing = [field for field in REQUIRED_EXPENSE_COLUMNS if found[field] is None]
+    if missing:
+        raise ImportFileError(
+            "No column for " + ', '.join(f"{field} (e.g. {EXPENSE_COLUMNS[field][0]})" for field in missing))
+    return found
+
+
+def read_expenses(source, roster, team_id):
+    """Expense lines of one team's members, grouped by member.
+
+    by_member is {member_id: (sorted ISO dates, matching row positions)}.
+    Names that are not on the team, or that two of its members share, are
+    left out and listed in unknown_members and ambiguous_members.
+    """
+    ids_by_name = {}
+    shared_names = set()
+    for member_id in roster.members(team_id):
+        name = roster.name(member_id).casefold()
+        if ids_by_name.setdefault(name, member_id) != member_id:
+            shared_names.add(name)
+    for name in shared_names:
+        del ids_by_name[name]
+
+    frames = []
+    total = 0
+    unknown, ambiguous = set(), set()
+    columns = None
+    for raw in read_chunks(source):
+        if columns is None:
+            columns = _find_columns(set(raw.columns))
+        total += len(raw)
+        names = raw[columns['member']].str.strip()
+        member_ids = names.str.casefold().map(ids_by_name)
+        shared = names.str.casefold().isin(shared_names)
+        ambiguous.update(names[shared].unique())
+        unknown.update(names[member_ids.isna() & ~shared & (names != '')].unique())
+        amounts = pd.to_numeric(raw[columns['amount']].str.replace(r'[£,\s]', '', regex=True), errors='coerce')
+        dates = parse_dates(raw[columns['date']].str.strip().str[:10])
+        keep = member_ids.notna() & amounts.notna() & dates.notna()
+        frame = pd.DataFrame({
+            'row': raw.index[keep] + 2,
+            'member_id': member_ids[keep].astype(int),
+            'date': dates[keep],
+            'amount': amounts[keep].astype(float)
+        })
+        for field in ('description', 'reference'):
+            frame[field] = raw.loc[keep, columns[field]].str.strip() if columns[field] else ''
+        frames.append(frame)
+
+    if columns is None:
+        raise ImportFileError("The file is empty")
+    lines = pd.concat(frames, ignore_index=True).sort_values(['member_id', 'date'], kind='stable', ignore_index=True)
+    by_member = {}
+    for member_id, positions in lines.groupby('member_id').indices.items():
+        by_member[int(member_id)] = (lines['date'].values[positions].tolist(), positions.tolist())
+    return ExpenseLines(lines, by_member, total, sorted(unknown), sorted(ambiguous))
+
+
+def _tolerance(expected):
+    return max(expected * TOLERANCE, TOLERANCE_MIN)
+
+
+def reconcile(items, expenses):
+    """Reconciled result for every expected item, each expense line used at most once.
+
+    A line pays for one item, or for several as a split claim.
+    """
+    amounts = expenses.frame['amount'].values
+    texts = (expenses.frame['reference'] + ' ' + expenses.frame['description']).str.casefold().values
+    low_band, high_band = AMOUNT_BAND
+
+    candidates = []
+    for i, item in enumerate(items):
+        dates, positions = expenses.by_member.get(item.member_id, ((), ()))
+        start = bisect.bisect_left(dates, item.window_start)
+        end = bisect.bisect_right(dates, item.window_end)
+        reference = item.reference.strip().casefold()
+        tolerance = _tolerance(item.expected)
+        for position in positions[start:end]:
+            difference = float(amounts[position]) - item.expected
+            by_reference = bool(reference) and reference in texts[position]
+            if not by_reference and not low_band * item.expected <= amounts[position] <= high_band * item.expected:
+                continue
+            rank = (not by_reference, abs(difference) > tolerance, abs(difference))
+            candidates.append((rank, i, position))
+    candidates.sort()
+
+    assigned = {}
+    used = set()
+
+    def assign(accept):
+        for rank, i, position in candidates:
+            if i not in assigned and position not in used and accept(rank):
+                assigned[i] = position
+                used.add(position)
+
+    # Lines that don't fit one item on their own may be split claims, so
+    # those are only assigned once split claims have been looked for
+    assign(lambda rank: not (rank[0] and rank[1]))
+    shares = {}
+    for group, position in _split_claims(items, expenses, assigned, used):
+        total = sum(items[i].expected for i in group)
+        for i in group:
+            assigned[i] = position
+            shares[i] = items[i].expected / total
+    assign(lambda rank: True)
+
+    sharing = defaultdict(int)
+    for position in assigned.values():
+        sharing[position] += 1
+    results = []
+    for i, item in enumerate(items):
+        position = assigned.get(i)
+        if position is None:
+            results.append(Reconciled(item, 'Unmatched', 0.0, -item.expected, None, 0))
+            continue
+        claimed = float(amounts[position]) * shares.get(i, 1.0)
+        difference = claimed - item.expected
+        if abs(difference) <= _tolerance(item.expected):
+            status = 'Matched'
+        else:
+            status = 'Over-claimed' if difference > 0 else 'Under-claimed'
+        results.append(Reconciled(item, status, claimed, difference,
+                                  expenses.frame.iloc[position].to_dict(), sharing[position]))
+    return results
+
+
+def _split_claims(items, expenses, assigned, used):
+    """[(item indexes, line position)] for unused lines that pay for several unmatched items.
+
+    Each line takes the group of up to SPLIT_MAX_ITEMS of its member's
+    unmatched items, all with the line inside their windows, whose total
+    is closest to the line's amount and within tolerance of it.
+    """
+    amounts = expenses.frame['amount'].values
+    open_items = defaultdict(list)
+    for i, item in enumerate(items):
+        if i not in assigned:
+            open_items[item.member_id].append(i)
+    splits = []
+    for member_id, indexes in open_items.items():
+        if len(indexes) < 2:
+            continue
+        dates, positions = expenses.by_member.get(member_id, ((), ()))
+        for line_date, position in zip(dates, positions):
+            if position in used:
+                continue
+            covering = [i for i in indexes if items[i].window_start <= line_date <= items[i].window_end]
+            best = None
+            for size in range(2, min(len(covering), SPLIT_MAX_ITEMS) + 1):
+                for group in combinations(covering, size):
+                    total = sum(items[i].expected for i in group)
+                    gap = abs(float(amounts[position]) - total)
+                    if gap <= _tolerance(total) and (best is None or gap < best[0]):
+                        best = (gap, group)
+            if best is not None:
+                splits.append((best[1], position))
+                used.add(position)
+                indexes = [i for i in indexes if i not in best[1]]
+                if len(indexes) < 2:
+                    break
+    return splits
+
+
+def results_frame(results, member_name):
+    frame = pd.DataFrame([{
+        'Status': r.status,
+        'Team Member': member_name(r.item.member_id),
+        'Item': r.item.label,
+        'Type': 'Sytner travel' if r.item.collection == 'sytner_bookings' else 'Learning resource',
+        'Expected': r.item.expected,
+        'Claimed': r.claimed,
+        'Difference': r.difference,
+        'Claim Date': r.line['date'] if r.line else None,
+        'Claim Row': r.line['row'] if r.line else None,
+        'Claim Reference': r.line['reference'] if r.line else None,
+        'Items on Claim': r.shared if r.line else None
+    } for r in results], columns=['Status', 'Team Member', 'Item', 'Type', 'Expected', 'Claimed',
+                                  'Difference', 'Claim Date', 'Claim Row', 'Claim Reference', 'Items on Claim'])
+    frame['Claim Row'] = frame['Claim Row'].astype('Int64')
+    frame['Items on Claim'] = frame['Items on Claim'].astype('Int64')
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile training spend against an expense export")
+    parser.add_argument('expenses', help="Expense system CSV export")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--team', default='default')
+    parser.add_argument('--output', help="Write every item's result to this CSV")
+    args = parser.parse_args()
+
+    roster = Roster(args.data_dir)
+    store = read_team(roster, args.team)
+    try:
+        expenses = read_expenses(args.expenses, roster, args.team)
+    except ImportFileError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    results = reconcile(expected_claims(store), expenses)
+
+    print(f"📊 {expenses.total} expense lines, {len(expenses.frame)} for members of {args.team}")
+    if expenses.ambiguous_members:
+        print(f"⚠️ Names shared by two members, left unmatched: {', '.join(expenses.ambiguous_members)}")
+    for status in STATUSES:
+        matching = [r for r in results if r.status == status]
+        print(f"   - {status}: {len(matching)}")
+        if status != 'Matched':
+            for r in matching:
+                print(f"       {roster.name(r.item.member_id)}: {r.item.label} "
+                      f"expected £{r.item.expected:,.2f}, claimed £{r.claimed:,.2f}")
+    if args.output:
+        results_frame(results, roster.name).to_csv(args.output, index=False)
+        print(f"✅ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,518 @@
+"""
+Typed record classes for Manager Hub & TAG Training
+
+Each collection has a frozen, slotted dataclass. Repeated values such as
+statuses, priorities, categories and levels are CodedEnum members, so
+every record points at one shared object instead of its own string.
+Records still read like dicts (record['status'], record.get('cost')), so
+rendering code does not care, but they are validated on construction:
+a malformed record fails when the file is loaded, not half-way through
+a page.
+
+from_json/to_json round-trip losslessly; keys the schema does not know
+about are carried along in `extra`.
+
+Each collection's schema has a version (SCHEMA_VERSIONS). Records stored
+under an older version are brought up to date on read by the migrations
+registered with @migration, one version step at a time, and stored at
+the current version the next time their file is written. To add a field:
+add it to the class, bump the collection's version, and register a
+migration from the previous version that fills it in. Migrations must
+leave an already-migrated record as it is.
+"""
+
+import dataclasses
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from enum import Enum
+from typing import NewType, Optional, Tuple, Union, get_args, get_origin, get_type_hints
+
+# ISO date ('2024-05-01') and ISO timestamp strings, validated on construction
+IsoDate = NewType('IsoDate', str)
+Timestamp = NewType('Timestamp', str)
+
+
+class RecordError(ValueError):
+    """A stored record does not match its collection's schema."""
+
+
+class CodedEnum(str, Enum):
+    """String enum that compares, hashes, prints and serialises as its value.
+
+    Members compare equal to their plain string values, so existing
+    filters like `status == 'Completed'` and JSON files keep working.
+    `code` is the member's position, for compact integer storage.
+    """
+
+    __hash__ = str.__hash__
+
+    def __str__(self):
+        return self.value
+
+    def __format__(self, format_spec):
+        return format(self.value, format_spec)
+
+    @property
+    def code(self):
+        return _enum_codes(type(self))[self]
+
+    @classmethod
+    def from_code(cls, code):
+        return list(cls)[code]
+
+
+_ENUM_CODES = {}
+
+
+def _enum_codes(enum_cls):
+    codes = _ENUM_CODES.get(enum_cls)
+    if codes is None:
+        codes = _ENUM_CODES[enum_cls] = {member: i for i, member in enumerate(enum_cls)}
+    return codes
+
+
+class Priority(CodedEnum):
+    LOW = 'Low'
+    MEDIUM = 'Medium'
+    HIGH = 'High'
+
+
+class CheckinType(CodedEnum):
+    QUICK_CATCH_UP = 'Quick Catch-up'
+    PROGRESS_UPDATE = 'Progress Update'
+    CONCERN = 'Concern/Issue'
+    WELLBEING_CHECK = 'Wellbeing Check'
+    TRAINING_DISCUSSION = 'Training Discussion'
+    OTHER = 'Other'
+
+
+class CheckinTag(CodedEnum):
+    PERFORMANCE = 'Performance'
+    DEVELOPMENT = 'Development'
+    WELLBEING = 'Wellbeing'
+    PROJECT = 'Project'
+    TRAINING = 'Training'
+    CONFLICT = 'Conflict'
+    RECOGNITION = 'Recognition'
+
+
+class ActionStatus(CodedEnum):
+    NOT_STARTED = 'Not Started'
+    IN_PROGRESS = 'In Progress'
+    COMPLETED = 'Completed'
+    OVERDUE = 'Overdue'
+
+
+class ActionOwner(CodedEnum):
+    MANAGER = 'Manager'
+    TEAM_MEMBER = 'Team Member'
+    BOTH = 'Both'
+
+
+class ActionCategory(CodedEnum):
+    DEVELOPMENT = 'Development'
+    PERFORMANCE = 'Performance'
+    PROJECT = 'Project'
+    TRAINING = 'Training'
+    ADMIN = 'Admin'
+    OTHER = 'Other'
+
+
+class TrainingType(CodedEnum):
+    ONLINE_COURSE = 'Online Course'
+    IN_PERSON = 'In-Person Training'
+    CERTIFICATION = 'Certification'
+    MENTORING = 'Mentoring'
+    SELF_STUDY = 'Self-Study'
+    SYTNER_TRAINING = 'Sytner Training'
+    ON_THE_JOB = 'On-the-Job'
+    OTHER = 'Other'
+
+
+class TrainingStatus(CodedEnum):
+    NOT_STARTED = 'Not Started'
+    IN_PROGRESS = 'In Progress'
+    COMPLETED = 'Completed'
+    CANCELLED = 'Cancelled'
+
+
+class ApprovalStatus(CodedEnum):
+    PENDING = 'Pending'
+    APPROVED = 'Approved'
+    REJECTED = 'Rejected'
+
+
+class SkillCategory(CodedEnum):
+    TECHNICAL = 'Technical'
+    SOFT_SKILLS = 'Soft Skills'
+    LEADERSHIP = 'Leadership'
+    PRODUCT_KNOWLEDGE = 'Product Knowledge'
+    SYSTEMS_TOOLS = 'Systems/Tools'
+    COMPLIANCE = 'Compliance'
+    SAFETY = 'Safety'
+    OTHER = 'Other'
+
+
+class Level(CodedEnum):
+    """Skill levels in ascending order, so code doubles as rank."""
+    NONE = 'None'
+    BASIC = 'Basic'
+    INTERMEDIATE = 'Intermediate'
+    ADVANCED = 'Advanced'
+    EXPERT = 'Expert'
+
+
+class Location(CodedEnum):
+    HEAD_OFFICE = 'Head Office'
+    REGIONAL_CENTRE = 'Regional Centre'
+    VIRTUAL = 'Virtual'
+    ON_SITE = 'On-site'
+    EXTERNAL_VENUE = 'External Venue'
+    OTHER = 'Other'
+
+
+class BookingStatus(CodedEnum):
+    BOOKED = 'Booked'
+    IN_PROGRESS = 'In Progress'
+    COMPLETED = 'Completed'
+    CANCELLED = 'Cancelled'
+
+
+class Attendance(CodedEnum):
+    ATTENDED = 'Attended'
+    PARTIAL = 'Partial'
+    DID_NOT_ATTEND = 'Did Not Attend'
+
+
+class ResourceType(CodedEnum):
+    BOOK = 'Book'
+    ONLINE_COURSE = 'Online Course'
+    LICENSE = 'License/Subscription'
+    CERTIFICATION = 'Certification'
+    CONFERENCE = 'Conference'
+    VIDEO_COURSE = 'Video Course'
+    OTHER = 'Other'
+
+
+class ResourceStatus(CodedEnum):
+    NOT_STARTED = 'Not Started'
+    IN_PROGRESS = 'In Progress'
+    COMPLETED = 'Completed'
+
+
+def _converter(annotation):
+    """Build a function that validates/coerces one field value."""
+    if get_origin(annotation) is Union:
+        inner = _converter(next(a for a in get_args(annotation) if a is not type(None)))
+        return lambda value: None if value is None else inner(value)
+    if get_origin(annotation) is tuple:
+        item = _converter(get_args(annotation)[0])
+        return lambda value: tuple(item(v) for v in value)
+    if annotation is IsoDate:
+        def check_date(value):
+            date.fromisoformat(value[:10])
+            return value
+        return check_date
+    if annotation is Timestamp:
+        def check_timestamp(value):
+            datetime.fromisoformat(value)
+            return value
+        return check_timestamp
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return annotation
+    if annotation is float:
+        def to_float(value):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise TypeError(f"expected a number, got {value!r}")
+            return float(value)
+        return to_float
+
+    def check_type(value):
+        if not isinstance(value, annotation) or (annotation is int and isinstance(value, bool)):
+            raise TypeError(f"expected {annotation.__name__}, got {value!r}")
+        return value
+    return check_type
+
+
+class Record(Mapping):
+    """Base for typed records: read-only mapping access plus JSON helpers."""
+
+    __slots__ = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._converters = None
+
+    @classmethod
+    def _field_converters(cls):
+        if cls._converters is None:
+            hints = get_type_hints(cls)
+            cls._converters = {f.name: _converter(hints[f.name])
+                               for f in dataclasses.fields(cls) if f.name != 'extra'}
+        return cls._converters
+
+    def __post_init__(self):
+        for name, convert in self._field_converters().items():
+            value = getattr(self, name)
+            try:
+                converted = convert(value)
+            except (TypeError, ValueError, AttributeError) as e:
+                raise RecordError(f"{type(self).__name__} #{self.id}: bad {name} {value!r} ({e})") from None
+            if converted is not value:
+                object.__setattr__(self, name, converted)
+
+    @classmethod
+    def field_names(cls):
+        return tuple(cls._field_converters())
+
+    @classmethod
+    def from_json(cls, raw):
+        names = cls._field_converters()
+        known = {k: v for k, v in raw.items() if k in names}
+        extra = {k: v for k, v in raw.items() if k not in names} or None
+        try:
+            return cls(**known, extra=extra)
+        except TypeError as e:
+            raise RecordError(f"{cls.__name__} #{raw.get('id')}: {e}") from None
+
+    def to_json(self):
+        data = {}
+        for name in self._field_converters():
+            value = getattr(self, name)
+            if isinstance(value, Enum):
+                value = value.value
+            elif isinstance(value, tuple):
+                value = [v.value if isinstance(v, Enum) else v for v in value]
+            data[name] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def replace(self, **changes):
+        """Copy with some fields changed; unknown keys go into extra."""
+        names = self._field_converters()
+        extra_changes = {k: v for k, v in changes.items() if k not in names}
+        known = {k: v for k, v in changes.items() if k in names}
+        if extra_changes:
+            known['extra'] = {**(self.extra or {}), **extra_changes}
+        return dataclasses.replace(self, **known)
+
+    def __getitem__(self, key):
+        if key in self._field_converters():
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        yield from self._field_converters()
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return len(self._field_converters()) + len(self.extra or ())
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Checkin(Record):
+    id: int
+    member_id: int
+    date: IsoDate
+    type: CheckinType
+    notes: str
+    created_at: Timestamp
+    tags: Tuple[CheckinTag, ...] = ()
+    follow_up: bool = False
+    extra: Optional[dict] = field(default=None, repr=False)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Action(Record):
+    id: int
+    member_id: int
+    action: str
+    priority: Priority
+    owner: ActionOwner
+    due_date: IsoDate
+    category: ActionCategory
+    status: ActionStatus
+    created_at: Timestamp
+    notes: str = ''
+    extra: Optional[dict] = field(default=None, repr=False)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class TrainingPlan(Record):
+    id: int
+    member_id: int
+    course_name: str
+    type: TrainingType
+    start_date: IsoDate
+    end_date: IsoDate
+    priority: Priority
+    cost: float
+    approval_required: bool
+    approval_status: ApprovalStatus
+    status: TrainingStatus
+    progress: int
+    created_at: Timestamp
+    objectives: str = ''
+    business_case: str = ''
+    extra: Optional[dict] = field(default=None, repr=False)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class MatrixItem(Record):
+    id: int
+    member_id: int
+    skill_name: str
+    category: SkillCategory
+    required_level: Level
+    current_level: Level
+    priority: Priority
+    target_date: IsoDate
+    completed: bool
+    created_at: Timestamp
+    training_method: str = ''
+    completion_date: Optional[Timestamp] = None
+    extra: Optional[dict] = field(default=None, repr=False)
+
+
+def skill_completed(current_level, required_level):
+    """Whether a matrix skill's levels make it complete: current is the required level.
+
+    The one rule every writer derives `completed` from; takes Levels, or
+    pandas Series of them.
+    """
+    return current_level == required_level
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class SytnerBooking(Record):
+    id: int
+    member_id: int
+    course_name: str
+    location: Location
+    start_date: IsoDate
+    end_date: IsoDate
+    cost: float
+    travel_required: bool
+    status: BookingStatus
+    created_at: Timestamp
+    expenses_estimate: float = 0.0
+    objectives: str = ''
+    booking_ref: str = ''
+    attendance: Optional[Attendance] = None
+    completion_date: Optional[Timestamp] = None
+    feedback: Optional[str] = None
+    extra: Optional[dict] = field(default=None, repr=False)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class LearningResource(Record):
+    id: int
+    member_id: int
+    title: str
+    type: ResourceType
+    cost: float
+    assigned_date: IsoDate
+    expiry_date: IsoDate
+    link_to_expenses: bool
+    status: ResourceStatus
+    created_at: Timestamp
+    provider: str = ''
+    description: str = ''
+    completion_date: Optional[Timestamp] = None
+    extra: Optional[dict] = field(default=None, repr=False)
+
+
+# Current schema version per collection (see migration() below)
+SCHEMA_VERSIONS = {
+    'checkins': 1,
+    'actions': 1,
+    'training_plans': 1,
+    'training_matrix': 1,
+    'sytner_bookings': 1,
+    'learning_resources': 1
+}
+
+# (collection, from_version) -> fn(raw dict) -> raw dict at from_version + 1
+_MIGRATIONS = {}
+
+
+def migration(collection, from_version):
+    """Register fn(raw) -> raw upgrading a collection's records from from_version to the next."""
+    def register(fn):
+        _MIGRATIONS[collection, from_version] = fn
+        return fn
+    return register
+
+
+def upgrade(collection, raw, version):
+    """A raw record stored at `version` brought up to the current schema version."""
+    for from_version in range(version, SCHEMA_VERSIONS[collection]):
+        raw = _MIGRATIONS[collection, from_version](raw)
+    return raw
+
+
+def _fill(raw, **defaults):
+    missing = {k: v for k, v in defaults.items() if k not in raw}
+    return {**raw, **missing} if missing else raw
+
+
+# Version 0 is every file written before schema versions existed. Early
+# versions of the app did not write some fields the records now require.
+
+@migration('checkins', 0)
+def _checkins_v1(raw):
+    return _fill(raw, created_at=raw.get('date'))
+
+
+@migration('actions', 0)
+def _actions_v1(raw):
+    return _fill(raw, owner='Both', category='Other', status='Not Started', created_at=raw.get('due_date'))
+
+
+@migration('training_plans', 0)
+def _training_plans_v1(raw):
+    raw = _fill(raw, status='Not Started', approval_required=False, cost=0.0, created_at=raw.get('start_date'))
+    return _fill(raw, progress=100 if raw['status'] == 'Completed' else 0,
+                 approval_status='Pending' if raw['approval_required'] else 'Approved')
+
+
+@migration('training_matrix', 0)
+def _training_matrix_v1(raw):
+    raw = _fill(raw, current_level='None', created_at=raw.get('target_date'))
+    try:
+        completed = skill_completed(Level(raw['current_level']), Level(raw.get('required_level')))
+    except ValueError:
+        # Left for validation to report
+        completed = False
+    return _fill(raw, completed=completed)
+
+
+@migration('sytner_bookings', 0)
+def _sytner_bookings_v1(raw):
+    return _fill(raw, status='Booked', travel_required=bool(raw.get('expenses_estimate')),
+                 created_at=raw.get('start_date'))
+
+
+@migration('learning_resources', 0)
+def _learning_resources_v1(raw):
+    return _fill(raw, status='Not Started', link_to_expenses=False, created_at=raw.get('assigned_date'))
+
+
+RECORD_TYPES = {
+    'checkins': Checkin,
+    'actions': Action,
+    'training_plans': TrainingPlan,
+    'training_matrix': MatrixItem,
+    'sytner_bookings': SytnerBooking,
+    'learning_resources': LearningResource
+}
+
+
+def from_json(collection, raw):
+    """Build the typed record for one raw JSON object, or raise RecordError."""
+    return RECORD_TYPES[collection].from_json(raw)
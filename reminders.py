@@ -0,0 +1,235 @@
+"""
+Reminder digests for Manager Hub & TAG Training
+
+Finds everything that needs a manager's attention within the next few
+days, across every team: open actions that are overdue or falling due,
+training matrix targets, upcoming Sytner courses and expiring learning
+resources. It writes one digest per manager. Each item is read from the
+store's date indexes with a single range query per collection.
+
+Runs are incremental. data/reminders_state.json remembers which
+reminders have been sent, so running again (e.g. hourly from cron) only
+sends what is new. A reminder is new again if its date changes or it
+becomes overdue.
+
+Usage:
+    python reminders.py                          # digests to data/digests/
+    python reminders.py --days 14 --sender print
+    python reminders.py --sender smtp --smtp-host mail.example.com --smtp-from hub@example.com
+"""
+
+import argparse
+import re
+import smtplib
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from pathlib import Path
+
+from codec import read_json, write_json
+from roster import Roster, read_team
+
+STATE_FILE = 'reminders_state.json'
+DIGESTS_DIR = 'digests'
+DEFAULT_DAYS = 7
+
+Reminder = namedtuple('Reminder', 'key team_id section member_id due text')
+
+# Digest sections in the order they are listed
+SECTIONS = (
+    'Overdue actions',
+    'Actions due soon',
+    'Training matrix targets',
+    'Upcoming Sytner training',
+    'Expiring learning resources'
+)
+
+
+def team_reminders(store, team_id, member_name, today, days):
+    """Every reminder for one team due before today + days."""
+    today_iso = today.isoformat()
+    horizon = today + timedelta(days=days)
+    reminders = []
+
+    def add(section, collection, record, due, text):
+        key = f"{team_id}:{collection}:{record['id']}:{section}:{due}"
+        reminders.append(Reminder(key, team_id, section, record['member_id'], due,
+                                  f"{member_name(record['member_id'])}: {text}"))
+
+    for action in store.query('actions', status=['Not Started', 'In Progress', 'Overdue'],
+                              due_date_before=horizon, order_by='due_date'):
+        section = 'Overdue actions' if action['due_date'] < today_iso else 'Actions due soon'
+        add(section, 'actions', action, action['due_date'], f"{action['action']} (due {action['due_date']})")
+    for item in store.query('training_matrix', completed=False,
+                            target_date_before=horizon, order_by='target_date'):
+        overdue = " - overdue" if item['target_date'] < today_iso else ""
+        add('Training matrix targets', 'training_matrix', item, item['target_date'],
+            f"{item['skill_name']} to {item['required_level']} (target {item['target_date']}{overdue})")
+    for booking in store.query('sytner_bookings', status='Booked', start_date_from=today,
+                               start_date_before=horizon, order_by='start_date'):
+        add('Upcoming Sytner training', 'sytner_bookings', booking, booking['start_date'],
+            f"{booking['course_name']} at {booking['location']} (starts {booking['start_date']})")
+    for resource in store.query('learning_resources', expiry_date_from=today,
+                                expiry_date_before=horizon, order_by='expiry_date'):
+        add('Expiring learning resources', 'learning_resources', resource, resource['expiry_date'],
+            f"{resource['title']} (expires {resource['expiry_date']})")
+    return reminders
+
+
+def collect(roster, today, days):
+    """{manager: [(team, [Reminder])]} for every team, in one pass per team.
+
+    Stores are opened read-only, so a cron job never writes team data
+    (or clashes with the app's writer lock).
+    """
+    by_manager = defaultdict(list)
+    for team in roster.teams:
+        store = read_team(roster, team['id'])
+        reminders = team_reminders(store, team['id'], roster.name, today, days)
+        by_manager[team['manager']].append((team, reminders))
+    return by_manager
+
+
+def format_digest(manager, teams, today):
+    lines = [f"Manager Hub reminders for {manager} - {today.strftime('%a %d %b %Y')}", ""]
+    for team, reminders in teams:
+        if not reminders:
+            continue
+        lines.append(f"{team['name']} ({team['id']})")
+        by_section = defaultdict(list)
+        for reminder in reminders:
+            by_section[reminder.section].append(reminder)
+        for section in SECTIONS:
+            if by_section[section]:
+                lines.append(f"  {section}")
+                lines.extend(f"    - {reminder.text}" for reminder in by_section[section])
+        lines.append("")
+    return "\n".join(lines)
+
+
+# ---- senders: send(manager, teams, subject, body) ----
+
+class FileSender:
+    """Writes each digest to <out_dir>/<date>/<manager>.txt."""
+
+    def __init__(self, out_dir, today):
+        self.out_dir = Path(out_dir) / today.isoformat()
+
+    def send(self, manager, teams, subject, body):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        slug = re.sub(r'[^a-z0-9]+', '-', manager.lower()).strip('-') or 'manager'
+        path = self.out_dir / f"{slug}.txt"
+        # Several runs a day append to the same file
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(body + "\n")
+        print(f"   - {manager}: {path}")
+
+
+class PrintSender:
+    def send(self, manager, teams, subject, body):
+        print(body)
+
+
+class SmtpSender:
+    """Emails each digest to the manager_email of the manager's teams."""
+
+    def __init__(self, host, port, from_address, smtp_class=smtplib.SMTP):
+        self.host = host
+        self.port = port
+        self.from_address = from_address
+        self.smtp_class = smtp_class
+
+    def send(self, manager, teams, subject, body):
+        recipients = sorted({team['manager_email'] for team, _ in teams if team.get('manager_email')})
+        if not recipients:
+            raise ValueError(f"No manager_email in the roster for {manager}")
+        message = EmailMessage()
+        message['Subject'] = subject
+        message['From'] = self.from_address
+        message['To'] = ', '.join(recipients)
+        message.set_content(body)
+        with self.smtp_class(self.host, self.port) as smtp:
+            smtp.send_message(message)
+        print(f"   - {manager}: emailed {', '.join(recipients)}")
+
+
+class OutboxSMTP:
+    """Stand-in for smtplib.SMTP that keeps messages in memory, for tests."""
+
+    outbox = []
+
+    def __init__(self, host, port):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def send_message(self, message):
+        self.outbox.append(message)
+
+
+def run(roster, sender, today, days=DEFAULT_DAYS, resend=False, dry_run=False):
+    """Send new reminders and update the state file. Returns the number sent."""
+    state_path = roster.data_dir / STATE_FILE
+    sent = {} if resend or not state_path.exists() else read_json(state_path)['sent']
+    still_due = {}
+    total = 0
+    for manager, teams in collect(roster, today, days).items():
+        new_teams = []
+        for team, reminders in teams:
+            for reminder in reminders:
+                if reminder.key in sent:
+                    still_due[reminder.key] = sent[reminder.key]
+            new_teams.append((team, [r for r in reminders if r.key not in sent]))
+        new = sum(len(reminders) for _, reminders in new_teams)
+        if not new:
+            continue
+        subject = f"Manager Hub: {new} reminder(s) for {today.strftime('%d %b')}"
+        try:
+            sender.send(manager, new_teams, subject, format_digest(manager, new_teams, today))
+        except (OSError, ValueError) as e:
+            # Left out of the state, so the next run tries again
+            print(f"   ⚠️ {manager}: not sent ({e})")
+            continue
+        total += new
+        for _, reminders in new_teams:
+            for reminder in reminders:
+                still_due[reminder.key] = today.isoformat()
+    if not dry_run:
+        # Reminders no longer due drop out, so the state stays small
+        write_json(state_path, {'updated': datetime.now().isoformat(), 'sent': still_due})
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send Manager Hub reminder digests")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help="Look-ahead window")
+    parser.add_argument('--today', help="Run as of this date (YYYY-MM-DD)")
+    parser.add_argument('--sender', choices=['file', 'print', 'smtp'], default='file')
+    parser.add_argument('--out-dir', help="Digest folder for --sender file (default <data-dir>/digests)")
+    parser.add_argument('--smtp-host', default='localhost')
+    parser.add_argument('--smtp-port', type=int, default=25)
+    parser.add_argument('--smtp-from', default='manager-hub@localhost')
+    parser.add_argument('--resend', action='store_true', help="Ignore the state file and send everything due")
+    parser.add_argument('--dry-run', action='store_true', help="Do not update the state file")
+    args = parser.parse_args()
+
+    today = datetime.strptime(args.today, '%Y-%m-%d').date() if args.today else datetime.now().date()
+    roster = Roster(args.data_dir)
+    if args.sender == 'file':
+        sender = FileSender(args.out_dir or roster.data_dir / DIGESTS_DIR, today)
+    elif args.sender == 'smtp':
+        sender = SmtpSender(args.smtp_host, args.smtp_port, args.smtp_from)
+    else:
+        sender = PrintSender()
+
+    total = run(roster, sender, today, args.days, args.resend, args.dry_run)
+    print(f"✅ {total} new reminder(s) sent")
+
+
+if __name__ == '__main__':
+    main()
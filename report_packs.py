@@ -0,0 +1,236 @@
+"""
+Monthly report packs for Manager Hub & TAG Training
+
+Writes one static HTML page per team with the numbers from the Reports
+page (team activity, training investment, completion metrics, matrix
+completion per member) plus every overdue action and matrix target, and
+an index page linking them. With weasyprint installed each pack is also
+written as a PDF.
+
+Every team is loaded once, read-only, in the main process. Packs are then
+rendered on a process pool: on platforms that fork, the workers inherit
+the loaded stores instead of reading the files again; elsewhere each
+worker loads the team it is given.
+
+Usage:
+    python report_packs.py                        # data/reports/<YYYY-MM>/
+    python report_packs.py --days 90 --pdf --workers 4
+    python report_packs.py --team north --team south --out-dir packs
+"""
+
+import argparse
+import html
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from reminders import team_reminders
+from roster import Roster, read_team
+from views import LiveAggregates
+
+try:
+    from weasyprint import HTML
+except ImportError:
+    HTML = None
+
+REPORTS_DIR = 'reports'
+DEFAULT_DAYS = 30
+# Reminder sections that are overdue when looked up with no look-ahead
+OVERDUE_SECTIONS = ('Overdue actions', 'Training matrix targets')
+
+LoadedTeam = namedtuple('LoadedTeam', 'store aggregates')
+PackResult = namedtuple('PackResult', 'team_id paths seconds')
+
+# {team_id: LoadedTeam}, filled before the pool starts so forked workers share it
+_loaded = {}
+
+STYLE = """
+body { font-family: -apple-system, 'Segoe UI', Helvetica, Arial, sans-serif; margin: 2em; color: #222; }
+h1 { margin-bottom: 0; }
+.meta { color: #666; margin-top: 0.3em; }
+.metrics { display: flex; flex-wrap: wrap; gap: 1em; }
+.metric { border: 1px solid #ddd; border-radius: 6px; padding: 0.6em 1em; min-width: 9em; }
+.metric .value { font-size: 1.4em; font-weight: bold; }
+table { border-collapse: collapse; margin: 0.5em 0 1.5em; }
+th, td { border: 1px solid #ddd; padding: 4px 10px; text-align: left; }
+th { background: #f4f4f4; }
+"""
+
+
+def load_team(roster, team_id):
+    """Read-only store and aggregates over every record, archived ones included.
+
+    Investment and completion cover all time, as on the Reports page; only
+    the check-in activity is limited to the report period.
+    """
+    store = read_team(roster, team_id)
+    return LoadedTeam(store, LiveAggregates(store, include_archive=True))
+
+
+def _metrics(pairs):
+    return '<div class="metrics">' + ''.join(
+        f'<div class="metric"><div>{html.escape(label)}</div><div class="value">{html.escape(value)}</div></div>'
+        for label, value in pairs) + '</div>'
+
+
+def _table(rows, columns, empty):
+    if not rows:
+        return f"<p>{html.escape(empty)}</p>"
+    return pd.DataFrame(rows, columns=columns).to_html(index=False, border=0)
+
+
+def render_pack(team, loaded, member_name, today, days):
+    """HTML report pack for one team."""
+    members = team['members']
+    aggregates = loaded.aggregates
+    since = date.min if days is None else today - timedelta(days=days - 1)
+    period = "All Time" if days is None else f"Last {days} days"
+
+    stats = aggregates.quick_stats(today)
+    investment = aggregates.investment()
+    activity = aggregates.activity(members, since, member_name)
+    matrix = [{
+        'Team Member': member_name(member),
+        'Completed': completed,
+        'Total': total,
+        'Completion': f"{completed / total * 100:.0f}%"
+    } for member, completed, total in aggregates.matrix_completion(members)]
+    overdue = [{
+        'Type': 'Action' if reminder.section == 'Overdue actions' else 'Matrix target',
+        'Due': reminder.due,
+        'Item': reminder.text
+    } for reminder in team_reminders(loaded.store, team['id'], member_name, today, 0)
+        if reminder.section in OVERDUE_SECTIONS]
+
+    body = [
+        f"<h1>{html.escape(team['name'])}</h1>",
+        f'<p class="meta">Manager: {html.escape(team["manager"])} &middot; {period} to '
+        f"{today.strftime('%d %b %Y')} &middot; generated {datetime.now().strftime('%d %b %Y %H:%M')}</p>",
+        _metrics([
+            ("Active Actions", str(stats['active_actions'])),
+            ("Overdue Actions", str(stats['overdue_actions'])),
+            ("Active Training", str(stats['active_training'])),
+            ("Upcoming Sytner", str(stats['upcoming_sytner']))
+        ]),
+        "<h2>Team Activity Overview</h2>",
+        _table(activity, ['Team Member', 'Check-ins', 'Active Actions', 'Training Plans', 'Matrix Items'],
+               "No team members."),
+        "<h2>Training Investment</h2>",
+        _metrics([
+            ("Training Plans", f"£{investment['training']:,.2f}"),
+            ("Sytner Training", f"£{investment['sytner']:,.2f}"),
+            ("Learning Resources", f"£{investment['resources']:,.2f}"),
+            ("Total Investment", f"£{investment['total']:,.2f}")
+        ]),
+        "<h2>Completion Metrics</h2>",
+        _metrics([(label, f"{completed}/{total} ({completed / total * 100:.0f}%)")
+                  for label, completed, total in aggregates.completion()]),
+        "<h2>Matrix Completion</h2>",
+        _table(matrix, ['Team Member', 'Completed', 'Total', 'Completion'], "No training matrix items."),
+        "<h2>Training Plans</h2>",
+        _table(aggregates.training_overview(members, member_name),
+               ['Team Member', 'Total Plans', 'In Progress', 'Completed', 'Avg Progress'], "No training plans."),
+        f"<h2>Overdue Items ({len(overdue)})</h2>",
+        _table(overdue, ['Type', 'Due', 'Item'], "Nothing overdue."),
+    ]
+    return (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+            f"<title>{html.escape(team['name'])} - Manager Hub report</title>"
+            f"<style>{STYLE}</style></head>\n<body>\n" + "\n".join(body) + "\n</body></html>\n")
+
+
+def render_index(teams, today, period):
+    links = "\n".join(f'<li><a href="{html.escape(team["id"])}.html">{html.escape(team["name"])}</a> '
+                      f"- {html.escape(team['manager'])}</li>" for team in teams)
+    return (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Manager Hub reports</title>'
+            f"<style>{STYLE}</style></head>\n<body>\n<h1>Manager Hub reports</h1>\n"
+            f"<p class=\"meta\">{period} to {today.strftime('%d %b %Y')}</p>\n<ul>\n{links}\n</ul>\n</body></html>\n")
+
+
+def write_pack(roster, team_id, out_dir, today, days, pdf):
+    """Render and write one team's pack; runs in a pool worker."""
+    started = time.perf_counter()
+    loaded = _loaded.get(team_id) or load_team(roster, team_id)
+    page = render_pack(roster.team(team_id), loaded, roster.name, today, days)
+    path = Path(out_dir) / f"{team_id}.html"
+    path.write_text(page, encoding='utf-8')
+    paths = [path]
+    if pdf:
+        paths.append(path.with_suffix('.pdf'))
+        HTML(string=page, base_url=str(out_dir)).write_pdf(paths[-1])
+    return PackResult(team_id, [str(p) for p in paths], time.perf_counter() - started)
+
+
+def share_teams(roster, teams, workers):
+    """Load the teams up front when workers can inherit them (fork) or there are no workers."""
+    if workers == 1 or 'fork' in multiprocessing.get_all_start_methods():
+        for team in teams:
+            _loaded[team['id']] = load_team(roster, team['id'])
+    return len(_loaded)
+
+
+def generate(roster, teams, out_dir, today, days=DEFAULT_DAYS, pdf=False, workers=1):
+    """Write each team's pack and the index; yields a PackResult as each team finishes."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    period = "All Time" if days is None else f"Last {days} days"
+    (out_dir / 'index.html').write_text(render_index(teams, today, period), encoding='utf-8')
+    if workers == 1:
+        for team in teams:
+            yield write_pack(roster, team['id'], out_dir, today, days, pdf)
+        return
+    fork = 'fork' in multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if fork else None)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [executor.submit(write_pack, roster, team['id'], out_dir, today, days, pdf) for team in teams]
+        for future in futures:
+            yield future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a static report pack for every team")
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--team', action='append', help="Only this team (repeatable; default every team)")
+    parser.add_argument('--out-dir', help="Output folder (default <data-dir>/reports/<YYYY-MM>)")
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help="Report period; 0 for all time")
+    parser.add_argument('--today', help="Report as of this date (YYYY-MM-DD)")
+    parser.add_argument('--pdf', action='store_true', help="Also write PDFs (needs weasyprint)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default one per CPU)")
+    args = parser.parse_args()
+
+    if args.pdf and HTML is None:
+        print("⚠️ weasyprint is not installed; writing HTML only (pip install weasyprint)")
+        args.pdf = False
+    today = datetime.strptime(args.today, '%Y-%m-%d').date() if args.today else datetime.now().date()
+    days = args.days or None
+    roster = Roster(args.data_dir)
+    try:
+        teams = [roster.team(team_id) for team_id in args.team] if args.team else roster.teams
+    except KeyError as e:
+        print(f"❌ No such team: {e.args[0]}")
+        raise SystemExit(1)
+    out_dir = args.out_dir or roster.data_dir / REPORTS_DIR / today.strftime('%Y-%m')
+    workers = max(1, min(args.workers or os.cpu_count() or 1, len(teams)))
+
+    started = time.perf_counter()
+    loaded = share_teams(roster, teams, workers)
+    if loaded:
+        print(f"📂 Loaded {loaded} team(s) in {time.perf_counter() - started:.2f}s")
+    rendering = time.perf_counter()
+    busy = 0.0
+    for result in generate(roster, teams, out_dir, today, days, args.pdf, workers):
+        busy += result.seconds
+        print(f"   - {result.team_id}: {', '.join(result.paths)} ({result.seconds:.2f}s)")
+    finished = time.perf_counter()
+    print(f"✅ {len(teams)} report pack(s) in {finished - started:.2f}s on {workers} worker(s) "
+          f"(rendering {finished - rendering:.2f}s wall, {busy:.2f}s across workers)")
+    print(f"   - Index: {Path(out_dir) / 'index.html'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+"""
+Team roster and per-team data partitions for Manager Hub & TAG Training
+
+data/roster.json lists every member (with a stable integer id) and every
+team with its manager and member ids. Records store member_id, so a
+rename only touches the roster. Each team's collections live in their
+own DataStore under data/teams/<team_id>, so a session only ever loads
+its own team. Every team store also keeps
+data/teams/<team_id>/summary.json up to date with its aggregate counters
+(archived records included), which the area overview sums without
+opening any team's records.
+
+The app, bulk_import.py and fsck.py --repair may all edit the roster.
+Each edit takes an exclusive lock on data/roster.lock, re-reads
+roster.json, applies itself to that latest copy and saves it, so edits
+from different processes are never lost.
+
+Usage:
+    python roster.py list
+    python roster.py add-team north --name "North Showroom" --manager "Sam Patel" \
+        --member "Alice Johnson" --member "Bob Smith"
+"""
+
+import argparse
+import json
+import shutil
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows): roster edits in different processes aren't kept apart
+    fcntl = None
+
+from data_utils import ARCHIVE_DIR, CHANGE_LOG, COLLECTIONS, NOTES_DIR, DataStore
+from views import Aggregates, LiveAggregates
+
+ROSTER_FILE = 'roster.json'
+ROSTER_LOCK = 'roster.lock'
+TEAMS_DIR = 'teams'
+SUMMARY_FILE = 'summary.json'
+
+DEFAULT_TEAM = {
+    'id': 'default',
+    'name': 'My Team',
+    'manager': 'Manager',
+    'members': ['Alice Johnson', 'Bob Smith', 'Carol Williams', 'David Brown']
+}
+
+
+class Roster:
+    """Members and teams, backed by roster.json.
+
+    Member names are interned once here; everything else refers to
+    members by id. A read_only roster never writes roster.json (or moves a
+    legacy layout), and saving it raises PermissionError.
+    """
+
+    def __init__(self, data_dir, read_only=False):
+        self.data_dir = Path(data_dir)
+        self.read_only = read_only
+        self.path = self.data_dir / ROSTER_FILE
+        # Members added with save=False: member_id -> (team_id, name)
+        self._unsaved = {}
+        if read_only:
+            self._load()
+            return
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        with self._locked():
+            if not self.path.exists():
+                migrate_legacy_layout(self.data_dir)
+            if self._load():
+                self._write()
+
+    def _load(self):
+        """Read roster.json; True if it was in the older names-only format."""
+        with open(self.path, 'r') as f:
+            roster = json.load(f)
+        self.teams = roster['teams']
+        self._teams_by_id = {team['id']: team for team in self.teams}
+        self._names = {m['id']: sys.intern(m['name']) for m in roster.get('members', [])}
+        self._ids_by_name = {}
+        for member_id, name in self._names.items():
+            self._ids_by_name.setdefault(name, member_id)
+        # Older rosters listed member names directly on each team
+        legacy = any(isinstance(m, str) for team in self.teams for m in team['members'])
+        if legacy:
+            for team in self.teams:
+                team['members'] = [self._ensure_id(m) if isinstance(m, str) else m
+                                   for m in team['members']]
+        for member_id, (team_id, name) in self._unsaved.items():
+            if team_id in self._teams_by_id:
+                self._add(team_id, member_id, name)
+        return legacy
+
+    @contextmanager
+    def _locked(self):
+        with open(self.data_dir / ROSTER_LOCK, 'a') as lock:
+            if fcntl is not None:
+                # Released when the file is closed
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    @contextmanager
+    def _editing(self):
+        """Apply an edit to the latest roster.json and save it, under the roster lock."""
+        if self.read_only:
+            raise PermissionError(f"{self.path} is open read-only")
+        with self._locked():
+            self._load()
+            yield
+            self._write()
+
+    def _write(self):
+        members = [{'id': member_id, 'name': name} for member_id, name in self._names.items()
+                   if member_id not in self._unsaved]
+        teams = [dict(team, members=[m for m in team['members'] if m not in self._unsaved])
+                 for team in self.teams]
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({'members': members, 'teams': teams}, f, indent=2)
+        tmp_path.replace(self.path)
+
+    def team(self, team_id):
+        return self._teams_by_id[team_id]
+
+    def members(self, team_id):
+        """Member ids of one team."""
+        return self._teams_by_id[team_id]['members']
+
+    def name(self, member_id):
+        return self._names.get(member_id, f"Unknown member #{member_id}")
+
+    def is_member(self, member_id):
+        """Whether the id belongs to someone on the roster (in any team)."""
+        return member_id in self._names
+
+    def member_id(self, name, team_id=None):
+        """Id of a member by name (within one team if given), or None."""
+        if team_id is None:
+            return self._ids_by_name.get(name)
+        for member_id in self.members(team_id):
+            if self._names.get(member_id) == name:
+                return member_id
+        return None
+
+    def team_dir(self, team_id):
+        return self.data_dir / TEAMS_DIR / team_id
+
+    def _ensure_id(self, name):
+        member_id = self._ids_by_name.get(name)
+        if member_id is None:
+            member_id = max(max(self._names, default=0), 0) + 1
+            self._names[member_id] = sys.intern(name)
+            self._ids_by_name[name] = member_id
+        return member_id
+
+    def _add(self, team_id, member_id, name):
+        self._names[member_id] = sys.intern(name)
+        self._ids_by_name.setdefault(name, member_id)
+        self._teams_by_id[team_id]['members'].append(member_id)
+
+    def add_member(self, team_id, name, save=True):
+        """Add a new person (always a new id, even if the name is taken) to a team.
+
+        With save=False they are only added in memory, with a negative id
+        that no saved member (from this or another process) can take.
+        """
+        if not save:
+            member_id = min(min(self._names, default=0), 0) - 1
+            self._unsaved[member_id] = (team_id, name)
+            self._add(team_id, member_id, name)
+            return member_id
+        with self._editing():
+            member_id = max(max(self._names, default=0), 0) + 1
+            self._add(team_id, member_id, name)
+        return member_id
+
+    def add_to_team(self, team_id, member_id):
+        """Add an existing person to another team as well."""
+        if member_id in self._teams_by_id[team_id]['members']:
+            return
+        with self._editing():
+            members = self._teams_by_id[team_id]['members']
+            if member_id not in members:
+                members.append(member_id)
+
+    def rename_member(self, member_id, new_name):
+        with self._editing():
+            old_name = self._names[member_id]
+            self._names[member_id] = sys.intern(new_name)
+            if self._ids_by_name.get(old_name) == member_id:
+                del self._ids_by_name[old_name]
+            self._ids_by_name.setdefault(new_name, member_id)
+
+    def add_team(self, team_id, name, manager, member_names=(), manager_email=None):
+        with self._editing():
+            if team_id in self._teams_by_id:
+                raise ValueError(f"Team '{team_id}' already exists")
+            team = {'id': team_id, 'name': name, 'manager': manager,
+                    'members': [self._ensure_id(n) for n in member_names]}
+            if manager_email:
+                team['manager_email'] = manager_email
+            self.teams.append(team)
+            self._teams_by_id[team_id] = team
+        return team
+
+    def member_migration(self, team_id, save=True):
+        """Migration replacing legacy team_member names with member ids.
+
+        Unknown names become new members of the team; with save=False (for
+        read-only stores) only in memory.
+        """
+        ids_by_name = {}
+        for member_id in reversed(self.members(team_id)):
+            ids_by_name[self.name(member_id)] = member_id
+
+        def migrate(collection, record):
+            if 'team_member' not in record:
+                return record
+            member_id = ids_by_name.get(record['team_member'])
+            if member_id is None:
+                # Keep orphaned names as members of this team rather than lose them
+                member_id = ids_by_name[record['team_member']] = self.add_member(team_id, record['team_member'], save)
+            migrated = {k: v for k, v in record.items() if k != 'team_member'}
+            migrated['member_id'] = member_id
+            return migrated
+        return migrate
+
+
+def migrate_legacy_layout(data_dir):
+    """Move a single-team data directory into the default team partition."""
+    team_dir = Path(data_dir) / TEAMS_DIR / DEFAULT_TEAM['id']
+    team_dir.mkdir(parents=True, exist_ok=True)
+    legacy = list(COLLECTIONS.values()) + [ARCHIVE_DIR, NOTES_DIR, CHANGE_LOG]
+    for name in legacy:
+        source = Path(data_dir) / name
+        if source.exists():
+            shutil.move(str(source), str(team_dir / name))
+    with open(Path(data_dir) / ROSTER_FILE, 'w') as f:
+        json.dump({'teams': [DEFAULT_TEAM]}, f, indent=2)
+
+
+def write_team_summary(team_dir, aggregates, version):
+    path = Path(team_dir) / SUMMARY_FILE
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': version, 'include_archive': True, 'counts': aggregates.to_json()}, f)
+    tmp_path.replace(path)
+
+
+def open_team(roster, team_id):
+    """Load one team's store with live aggregates that keep summary.json current.
+
+    The aggregates cover archived records too, so totals and each member's
+    last check-in don't change when records are archived.
+    """
+    team_dir = roster.team_dir(team_id)
+    store = DataStore(team_dir, migrations=[roster.member_migration(team_id)])
+    aggregates = LiveAggregates(store, include_archive=True)
+    store.on_commit(lambda snapshot: write_team_summary(team_dir, aggregates, snapshot.version))
+    write_team_summary(team_dir, aggregates, store.snapshot().version)
+    return store, aggregates
+
+
+def read_team(roster, team_id):
+    """Read-only store for one team, for tools that may run alongside the app."""
+    return DataStore(roster.team_dir(team_id), change_log=False, read_only=True,
+                     migrations=[roster.member_migration(team_id, save=False)])
+
+
+def load_team_summary(roster, team_id):
+    """Saved aggregates for a team, counted read-only if it has no current summary yet."""
+    path = roster.team_dir(team_id) / SUMMARY_FILE
+    if path.exists():
+        with open(path, 'r') as f:
+            summary = json.load(f)
+        # Summaries from before archived records were counted are rebuilt
+        if summary.get('include_archive'):
+            return Aggregates.from_json(summary['counts'])
+    # Another process may be writing the team, so don't open it for writing
+    return LiveAggregates(read_team(roster, team_id), include_archive=True)
+
+
+def area_rollup(roster, team_ids=None):
+    """{team_id: Aggregates} for the given teams (default all) plus their sum."""
+    team_ids = team_ids or [team['id'] for team in roster.teams]
+    per_team = {team_id: load_team_summary(roster, team_id) for team_id in team_ids}
+    total = Aggregates()
+    for aggregates in per_team.values():
+        total = total + aggregates
+    return per_team, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage teams in the Manager Hub roster")
+    parser.add_argument('--data-dir', default='data')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help="List teams")
+    add_parser = subparsers.add_parser('add-team', help="Add a team")
+    add_parser.add_argument('team_id')
+    add_parser.add_argument('--name', required=True)
+    add_parser.add_argument('--manager', required=True)
+    add_parser.add_argument('--manager-email', help="Where reminders.py sends digests by email")
+    add_parser.add_argument('--member', action='append', default=[])
+    rename_parser = subparsers.add_parser('rename', help="Rename a member")
+    rename_parser.add_argument('member_id', type=int)
+    rename_parser.add_argument('new_name')
+    args = parser.parse_args()
+
+    roster = Roster(args.data_dir)
+    if args.command == 'add-team':
+        team = roster.add_team(args.team_id, args.name, args.manager, args.member, args.manager_email)
+        print(f"✅ Added team {team['name']} ({len(team['members'])} members)")
+    elif args.command == 'rename':
+        old_name = roster.name(args.member_id)
+        roster.rename_member(args.member_id, args.new_name)
+        print(f"✅ Renamed {old_name} to {args.new_name}")
+    else:
+        for team in roster.teams:
+            print(f"   - {team['id']}: {team['name']} - {team['manager']} ({len(team['members'])} members)")
+            for member_id in team['members']:
+                print(f"       #{member_id} {roster.name(member_id)}")
+
+
+if __name__ == '__main__':
+    main()
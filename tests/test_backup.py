@@ -0,0 +1,46 @@
+"""Grown append-only files are read from where they were, and restore whole."""
+
+import json
+import os
+
+from backup import BackupRepo
+
+
+def change_lines(start, count):
+    return ''.join(json.dumps({'seq': i, 'collection': 'actions', 'record_id': i % 50,
+                               'changes': {'status': 'In Progress', 'note': 'x' * (i % 40)}}) + '\n'
+                   for i in range(start, start + count)).encode()
+
+
+def restored(repo, tmp_path, name):
+    target = tmp_path / 'restored'
+    repo.restore(repo.snapshots()[-1], target, force=True)
+    return (target / name).read_bytes()
+
+
+def test_appended_change_log_is_read_from_its_last_chunk(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    log = data_dir / 'changes.jsonl'
+    log.write_bytes(change_lines(0, 5000))
+    repo = BackupRepo(tmp_path / 'backups')
+    first = repo.backup(data_dir)
+    assert first.bytes_read == log.stat().st_size
+
+    with open(log, 'ab') as f:
+        f.write(change_lines(5000, 20))
+    second = repo.backup(data_dir)
+    assert second.files_read == 1
+    assert second.bytes_read < log.stat().st_size // 4
+    assert restored(repo, tmp_path, 'changes.jsonl') == log.read_bytes()
+    entry = repo.load(second.snapshot_id)['files']['changes.jsonl']
+    assert 'chunks_hash' in entry
+
+    # Replaced rather than appended to: read whole again
+    data = log.read_bytes()
+    tmp = data_dir / 'changes.tmp'
+    tmp.write_bytes(b'{"seq": -1}\n' + data[12:] + change_lines(6000, 5))
+    os.replace(tmp, log)
+    third = repo.backup(data_dir)
+    assert third.bytes_read == log.stat().st_size
+    assert restored(repo, tmp_path, 'changes.jsonl') == log.read_bytes()
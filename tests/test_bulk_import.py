@@ -0,0 +1,33 @@
+"""A CSV import spanning several chunks adds its valid rows as one version."""
+
+import io
+import json
+
+import bulk_import
+from bulk_import import import_csv
+from roster import Roster, open_team
+
+
+def test_import_across_chunks(tmp_path, monkeypatch):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    (data_dir / 'roster.json').write_text(json.dumps({
+        'teams': [{'id': 'north', 'name': 'North', 'manager': 'Sam', 'members': [1]}],
+        'members': [{'id': 1, 'name': 'Alice Johnson'}]
+    }))
+    roster = Roster(data_dir)
+    store, _ = open_team(roster, 'north')
+    monkeypatch.setattr(bulk_import, 'CHUNK_ROWS', 7)
+    lines = ['team_member,action,priority,due_date,colour']
+    for i in range(40):
+        lines.append(f"{'Nobody' if i % 9 == 0 else 'Alice Johnson'},Action {i},High,2027-01-01,x")
+    source = io.StringIO('\n'.join(lines) + '\n')
+    version = store.snapshot().version
+
+    result = import_csv(store, roster, 'north', 'actions', source)
+
+    assert (result.rows, result.imported, result.error_count) == (40, 35, 5)
+    assert [row for row, _ in result.errors] == [2, 11, 20, 29, 38]
+    assert result.ignored_columns == ['colour']
+    assert store.snapshot().version == version + 1
+    assert [r['action'] for r in store.snapshot().actions] == [f"Action {i}" for i in range(40) if i % 9]
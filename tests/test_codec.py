@@ -0,0 +1,67 @@
+"""iter_array streams the same elements load_array parses in one go."""
+
+import json
+
+import pytest
+
+import codec
+from codec import iter_array, load_array, write_array
+
+ITEMS = [
+    {'id': 1, 'note': 'Plain'},
+    {'id': 2, 'note': 'Ünïcode — “quotes”, commas, ] and [ inside', 'cost': 1234.5},
+    {'id': 3, 'tags': ['a', 'b'], 'nested': {'updates': [{'date': '2026-01-02', 'note': 'x' * 300}]}},
+    {'id': 40000000000, 'flag': False, 'empty': None},
+    12345678901234567890,
+    'text',
+    [],
+]
+
+
+def write_indented(path, items):
+    path.write_text(json.dumps(items, indent=2, ensure_ascii=False), encoding='utf-8')
+
+
+@pytest.mark.parametrize('write', [write_array, write_indented], ids=['line format', 'indented'])
+@pytest.mark.parametrize('chunk_chars', [1, 7, 64, codec.CHUNK_CHARS])
+def test_iter_array_matches_load_array(tmp_path, write, chunk_chars):
+    path = tmp_path / 'records.json'
+    write(path, ITEMS)
+
+    assert list(load_array(path)) == ITEMS
+    assert list(iter_array(path, chunk_chars)) == ITEMS
+
+
+def test_load_array_streams_large_files(tmp_path, monkeypatch):
+    path = tmp_path / 'records.json'
+    write_array(path, ITEMS)
+    monkeypatch.setattr(codec, 'STREAM_ABOVE_BYTES', 0)
+
+    assert list(load_array(path)) == ITEMS
+
+
+@pytest.mark.parametrize('chunk_chars', [1, 5, codec.CHUNK_CHARS])
+def test_iter_array_allows_trailing_commas(tmp_path, chunk_chars):
+    path = tmp_path / 'records.json'
+    path.write_text('[\n' + ''.join(json.dumps(item) + ',\n' for item in ITEMS) + ']\n', encoding='utf-8')
+
+    assert list(iter_array(path, chunk_chars)) == ITEMS
+
+
+@pytest.mark.parametrize('text', ['[]', '  [ ]\n', ''])
+def test_iter_array_of_empty_array(tmp_path, text):
+    path = tmp_path / 'records.json'
+    path.write_text(text)
+    if text:
+        assert list(iter_array(path, 1)) == []
+    else:
+        with pytest.raises(ValueError):
+            list(iter_array(path, 1))
+
+
+@pytest.mark.parametrize('text', ['{"id": 1}', '[{"id": 1} {"id": 2}]', '[{"id": 1},'])
+def test_iter_array_rejects_malformed_files(tmp_path, text):
+    path = tmp_path / 'records.json'
+    path.write_text(text)
+    with pytest.raises(ValueError):
+        list(iter_array(path, 3))
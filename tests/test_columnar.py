@@ -0,0 +1,38 @@
+"""The columnar copy reads back as the records it was built from."""
+
+from columnar import COLUMNS_META, columns_dir, read_columns, records_to_frame, write_columns
+from data_utils import DataStore
+
+
+def add_resources(store, count, start=0):
+    store.append_many('learning_resources', [
+        {'member_id': 1, 'title': f"Course {i}", 'type': 'Online Course', 'provider': 'Provider',
+         'description': 'Long description ' * (i % 5), 'assigned_date': '2026-01-01',
+         'expiry_date': '2027-01-01', 'link_to_expenses': False, 'status': 'Not Started', 'cost': float(i),
+         'created_at': '2026-01-01T09:00:00'}
+        for i in range(start, start + count)
+    ])
+
+
+def frame_rows(df):
+    return [tuple(row) for row in df.astype(object).itertuples(index=False)]
+
+
+def test_rebuild_replaces_the_whole_build(tmp_path):
+    store = DataStore(tmp_path / 'team', change_log=False)
+    add_resources(store, 5)
+    write_columns(store, 'learning_resources')
+    path = columns_dir(store.data_dir, 'learning_resources')
+    first = [p.name for p in path.iterdir() if p.is_dir()]
+
+    add_resources(store, 3, start=5)
+    assert read_columns(store.data_dir, 'learning_resources') is None  # stale
+    write_columns(store, 'learning_resources')
+
+    builds = [p.name for p in path.iterdir() if p.is_dir()]
+    assert len(builds) == 1 and builds != first
+    assert sorted(p.name for p in path.iterdir() if not p.is_dir()) == [COLUMNS_META]
+    df = read_columns(store.data_dir, 'learning_resources')
+    records = store.snapshot(include_archive=True).learning_resources
+    assert frame_rows(df) == frame_rows(records_to_frame('learning_resources', records))
+    assert len(df) == 8
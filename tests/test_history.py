@@ -0,0 +1,67 @@
+"""Undo/redo of tracked actions, and snapshots as of a past time."""
+
+from datetime import datetime
+
+import data_utils
+from data_utils import DataStore, UndoStack
+
+
+class Clock(datetime):
+    """datetime whose now() is set by the test."""
+
+    current = datetime(2026, 3, 1, 10, 0, 0)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+def add_action(store):
+    return store.append('actions', {
+        'member_id': 1, 'action': 'Shadow a handover', 'priority': 'High', 'owner': 'Manager',
+        'due_date': '2026-04-01', 'category': 'Development', 'status': 'Not Started',
+        'created_at': '2026-03-01T09:00:00'})
+
+
+def test_undo_and_redo_of_an_update_with_a_note(tmp_path):
+    store = DataStore(tmp_path / 'team')
+    record_id = add_action(store)['id']
+    undo = UndoStack(store)
+    with undo.track("Update action"):
+        store.update('actions', record_id, status='In Progress')
+        store.notes.append('actions', record_id, 'Booked in')
+
+    assert undo.undo() == "Update action"
+    assert store.get('actions', record_id)['status'] == 'Not Started'
+    assert store.notes.history('actions', record_id) == []
+    assert undo.undo_label() is None
+
+    assert undo.redo() == "Update action"
+    assert store.get('actions', record_id)['status'] == 'In Progress'
+    assert [n['note'] for n in store.notes.history('actions', record_id)] == ['Booked in']
+
+    # The log itself records the withdrawal, so a fresh load agrees
+    undo.undo()
+    reopened = DataStore(tmp_path / 'team')
+    assert reopened.get('actions', record_id)['status'] == 'Not Started'
+    assert reopened.notes.count('actions', record_id) == 0
+
+
+def test_as_of_between_two_updates(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_utils, 'datetime', Clock)
+    Clock.current = datetime(2026, 3, 1, 10, 0, 0)
+    store = DataStore(tmp_path / 'team')
+    record_id = add_action(store)['id']
+    Clock.current = datetime(2026, 3, 1, 11, 0, 0)
+    store.update('actions', record_id, status='In Progress')
+    Clock.current = datetime(2026, 3, 1, 12, 0, 0)
+    store.update('actions', record_id, status='Completed')
+
+    def status_at(hour, minute):
+        records = store.as_of(datetime(2026, 3, 1, hour, minute)).actions
+        return [r['status'] for r in records if r['id'] == record_id]
+
+    assert status_at(11, 30) == ['In Progress']
+    assert status_at(10, 30) == ['Not Started']
+    assert status_at(12, 30) == ['Completed']
+    assert status_at(9, 0) == []
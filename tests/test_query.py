@@ -0,0 +1,73 @@
+"""DataStore.query must return what a plain filter over the records would."""
+
+from datetime import date, timedelta
+
+import pytest
+
+from data_utils import DataStore
+
+TODAY = date.today()
+STATUSES = ('Not Started', 'In Progress', 'Completed')
+PRIORITIES = ('High', 'Medium', 'Low')
+
+
+def day(offset):
+    return (TODAY + timedelta(days=offset)).isoformat()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = DataStore(tmp_path / 'team', change_log=False)
+    store.append_many('actions', [
+        {'member_id': 1 + i % 4, 'action': f"Action {i}", 'priority': PRIORITIES[i % 3], 'owner': 'Manager',
+         'due_date': day(-400 + (i * 37) % 500), 'category': 'Development', 'status': STATUSES[i % 3 if i % 7 else 2],
+         'created_at': f"{day(-400)}T09:00:00"}
+        for i in range(120)
+    ])
+    return store
+
+
+def ids(records):
+    return [record['id'] for record in records]
+
+
+def expected(store, keep, order_by='id', descending=False, include_archive=False):
+    records = store.snapshot(include_archive=include_archive).actions
+    return ids(sorted((r for r in records if keep(r)), key=lambda r: (r[order_by], r['id']), reverse=descending))
+
+
+CASES = [
+    ({'status': 'In Progress'}, lambda r: r['status'] == 'In Progress'),
+    ({'status': ['Not Started', 'Completed']}, lambda r: r['status'] in ('Not Started', 'Completed')),
+    ({'member': 2}, lambda r: r['member_id'] == 2),
+    ({'due_date_from': day(-30), 'due_date_before': day(30)}, lambda r: day(-30) <= r['due_date'] < day(30)),
+    ({'due_date_from': TODAY}, lambda r: r['due_date'] >= day(0)),
+    ({'member': 3, 'status': 'Completed', 'due_date_before': day(0)},
+     lambda r: r['member_id'] == 3 and r['status'] == 'Completed' and r['due_date'] < day(0)),
+    ({'priority': 'High', 'status': ['In Progress', 'Not Started'], 'due_date_from': day(-100)},
+     lambda r: r['priority'] == 'High' and r['status'] in ('In Progress', 'Not Started') and r['due_date'] >= day(-100)),
+    ({'status': 'Overdue'}, lambda r: False),
+    ({'due_date_from': day(50), 'due_date_before': day(50)}, lambda r: False),
+]
+
+
+@pytest.mark.parametrize('filters, keep', CASES)
+@pytest.mark.parametrize('order_by, descending', [(None, False), ('due_date', False), ('due_date', True)])
+def test_query_matches_plain_filter(store, filters, keep, order_by, descending):
+    want = expected(store, keep, order_by or 'id', descending)
+    assert ids(store.query('actions', order_by=order_by, descending=descending, **filters)) == want
+    assert ids(store.query('actions', order_by=order_by, descending=descending, limit=5, offset=3,
+                           **filters)) == want[3:8]
+
+
+@pytest.mark.parametrize('filters, keep', CASES)
+def test_query_follows_updates_and_archiving(store, filters, keep):
+    store.update_many('actions', {record_id: {'status': 'Completed', 'due_date': day(-200)}
+                                  for record_id in range(1, 121, 5)})
+    store.update('actions', 2, member_id=3, priority='High', status='In Progress')
+    assert ids(store.query('actions', order_by='due_date', **filters)) == expected(store, keep, 'due_date')
+
+    assert store.archive(90)['actions'] > 0
+    assert ids(store.query('actions', order_by='due_date', **filters)) == expected(store, keep, 'due_date')
+    assert (ids(store.query('actions', order_by='due_date', include_archive=True, **filters))
+            == expected(store, keep, 'due_date', include_archive=True))
@@ -0,0 +1,58 @@
+"""Read-only opens must leave the data directory exactly as it was."""
+
+import json
+
+from roster import Roster, read_team
+
+
+def tree(root):
+    return {str(path.relative_to(root)): path.read_bytes() if path.is_file() else None
+            for path in sorted(root.rglob('*'))}
+
+
+def write_legacy(data_dir):
+    """A roster listing member names, and records with names, inline notes and no schema.json.
+
+    Team south has never been opened, so it has no directory.
+    """
+    team_dir = data_dir / 'teams' / 'north'
+    team_dir.mkdir(parents=True)
+    (data_dir / 'roster.json').write_text(json.dumps({'teams': [
+        {'id': 'north', 'name': 'North', 'manager': 'Sam', 'members': ['Alice Johnson', 'Bob Smith']},
+        {'id': 'south', 'name': 'South', 'manager': 'Kim', 'members': []}
+    ]}))
+    (team_dir / 'actions.json').write_text(json.dumps([
+        {'id': 1, 'team_member': 'Alice Johnson', 'action': 'Shadow a handover', 'priority': 'High',
+         'due_date': '2026-01-10', 'updates': [{'date': '2026-01-02T09:00:00', 'note': 'Booked in'},
+                                               {'date': '2026-01-05T09:00:00', 'note': 'Done half'}]},
+        {'id': 2, 'team_member': 'Former Colleague', 'action': 'Write up process', 'priority': 'Low',
+         'due_date': '2026-02-01'},
+        {'id': 3, 'team_member': 'Bob Smith', 'action': 'Bad priority', 'priority': 'Urgent',
+         'due_date': '2026-02-01'}
+    ]))
+
+
+def test_read_only_open_of_legacy_data_writes_nothing(tmp_path):
+    data_dir = tmp_path / 'data'
+    write_legacy(data_dir)
+    before = tree(data_dir)
+
+    roster = Roster(data_dir, read_only=True)
+    store = read_team(roster, 'north')
+
+    actions = store.snapshot().actions
+    assert [a['id'] for a in actions] == [1, 2]
+    assert [roster.name(a['member_id']) for a in actions] == ['Alice Johnson', 'Former Colleague']
+    assert actions[0]['status'] == 'Not Started'
+    assert [n['note'] for n in store.notes.history('actions', 1)] == ['Booked in', 'Done half']
+    assert len(store.rejected) == 1
+    assert tree(data_dir) == before
+
+
+def test_read_only_open_of_missing_team_creates_nothing(tmp_path):
+    data_dir = tmp_path / 'data'
+    write_legacy(data_dir)
+    store = read_team(Roster(data_dir, read_only=True), 'south')
+
+    assert store.snapshot().actions == ()
+    assert not (data_dir / 'teams' / 'south').exists()
@@ -0,0 +1,51 @@
+"""Reminder runs only send what is new since the last run."""
+
+import json
+from datetime import date
+
+from reminders import OutboxSMTP, SmtpSender, run
+from roster import Roster
+
+
+def action(record_id, text, due_date):
+    return {'id': record_id, 'member_id': 1, 'action': text, 'priority': 'High', 'owner': 'Manager',
+            'due_date': due_date, 'category': 'Development', 'status': 'In Progress',
+            'created_at': '2026-02-01T09:00:00'}
+
+
+def write_team(data_dir, actions):
+    team_dir = data_dir / 'teams' / 'north'
+    team_dir.mkdir(parents=True, exist_ok=True)
+    (data_dir / 'roster.json').write_text(json.dumps({
+        'teams': [{'id': 'north', 'name': 'North', 'manager': 'Sam', 'manager_email': 'sam@example.com',
+                   'members': [1]}],
+        'members': [{'id': 1, 'name': 'Alice Johnson'}]
+    }))
+    (team_dir / 'actions.json').write_text(json.dumps(actions))
+
+
+def sent_bodies(sender, data_dir, today):
+    OutboxSMTP.outbox.clear()
+    run(Roster(data_dir, read_only=True), sender, today)
+    return [message.get_content() for message in OutboxSMTP.outbox]
+
+
+def test_second_run_sends_only_new_reminders(tmp_path):
+    data_dir = tmp_path / 'data'
+    write_team(data_dir, [action(1, 'Shadow a handover', '2026-03-03')])
+    sender = SmtpSender('localhost', 25, 'hub@example.com', smtp_class=OutboxSMTP)
+
+    first = sent_bodies(sender, data_dir, date(2026, 3, 1))
+    assert len(first) == 1
+    assert 'Actions due soon' in first[0] and 'Shadow a handover' in first[0]
+    assert OutboxSMTP.outbox[0]['To'] == 'sam@example.com'
+
+    assert sent_bodies(sender, data_dir, date(2026, 3, 1)) == []
+
+    # Past its due date the action is a new (overdue) reminder; nothing else is resent
+    write_team(data_dir, [action(1, 'Shadow a handover', '2026-03-03'),
+                          action(2, 'Write up process', '2026-04-30')])
+    later = sent_bodies(sender, data_dir, date(2026, 3, 5))
+    assert len(later) == 1
+    assert 'Overdue actions' in later[0] and 'Shadow a handover' in later[0]
+    assert 'Write up process' not in later[0]
@@ -0,0 +1,43 @@
+"""Roster edits from different processes are all kept."""
+
+import json
+
+from roster import Roster
+
+
+def write_roster(data_dir):
+    data_dir.mkdir(parents=True)
+    (data_dir / 'roster.json').write_text(json.dumps({
+        'teams': [{'id': 'north', 'name': 'North', 'manager': 'Sam', 'members': [1]}],
+        'members': [{'id': 1, 'name': 'Alice Johnson'}]
+    }))
+
+
+def test_edits_from_two_open_rosters_are_both_saved(tmp_path):
+    data_dir = tmp_path / 'data'
+    write_roster(data_dir)
+    app = Roster(data_dir)
+    cli = Roster(data_dir)
+
+    bob = cli.add_member('north', 'Bob Smith')
+    carol = app.add_member('north', 'Carol Davis')
+    app.rename_member(1, 'Alice Jones')
+    cli.add_team('south', 'South', 'Kim', ['Dan Brown'])
+
+    assert len({bob, carol}) == 2
+    saved = Roster(data_dir, read_only=True)
+    assert [saved.name(m) for m in saved.members('north')] == ['Alice Jones', 'Bob Smith', 'Carol Davis']
+    assert [saved.name(m) for m in saved.members('south')] == ['Dan Brown']
+
+
+def test_members_added_in_memory_are_not_saved(tmp_path):
+    data_dir = tmp_path / 'data'
+    write_roster(data_dir)
+    roster = Roster(data_dir)
+    guest = roster.add_member('north', 'Former Colleague', save=False)
+    Roster(data_dir).add_member('north', 'Bob Smith')
+
+    roster.add_member('north', 'Carol Davis')
+    assert roster.name(guest) == 'Former Colleague'
+    saved = Roster(data_dir, read_only=True)
+    assert [saved.name(m) for m in saved.members('north')] == ['Alice Johnson', 'Bob Smith', 'Carol Davis']
@@ -0,0 +1,69 @@
+"""
+Shared Streamlit widgets for Manager Hub & TAG Training
+"""
+
+import io
+
+import streamlit as st
+
+from columnar import load_frame
+
+# How long a page waits for a background job before showing progress instead
+JOB_WAIT_SECONDS = 0.3
+EXPORT_CHUNK_ROWS = 10000
+
+
+def render_notes(notes, collection, parent_id, label="Notes"):
+    """Show the latest notes for a record, with the full history on request."""
+    count = notes.count(collection, parent_id)
+    if not count:
+        return
+    st.markdown(f"**{label}:**")
+    shown = notes.latest(collection, parent_id)
+    if count > len(shown) and st.checkbox(f"Show all {count} notes", key=f"all_notes_{collection}_{parent_id}"):
+        shown = notes.history(collection, parent_id)
+    for note in shown:
+        st.caption(f"{note['date']}: {note['note']}")
+
+
+def records_frame(df, member_name):
+    """Copy of a records DataFrame with the member's current name next to member_id."""
+    df = df.copy()
+    if 'member_id' in df:
+        df.insert(df.columns.get_loc('member_id') + 1, 'team_member', df['member_id'].map(member_name))
+    return df
+
+
+def export_csv(progress, store, collection, member_name):
+    """Job: every record of a collection (archive included) as CSV text."""
+    progress(0.0, "reading records")
+    df = records_frame(load_frame(store, collection), member_name)
+    if df.empty:
+        return ""
+    out = io.StringIO()
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        end = min(start + EXPORT_CHUNK_ROWS, len(df))
+        df.iloc[start:end].to_csv(out, index=False, header=start == 0)
+        progress(end / len(df), f"{end:,} of {len(df):,} rows")
+    return out.getvalue()
+
+
+def job_result(jobs, key, fn, *args, label="Working"):
+    """Result of a background job, or None while it runs (with a progress bar)."""
+    job = jobs.submit(key, fn, *args)
+    job.wait(JOB_WAIT_SECONDS)
+    if not job.done():
+        _job_progress(job, label)
+        return None
+    if job.error is not None:
+        st.error(f"❌ {label} failed: {job.error}")
+        return None
+    return job.result
+
+
+@st.fragment(run_every=1)
+def _job_progress(job, label):
+    # Only this fragment reruns while the job works; the page reruns once it is done
+    if job.done():
+        st.rerun()
+    st.progress(job.progress, text=f"{label}... {job.message}")
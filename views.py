@@ -0,0 +1,316 @@
+"""
+Incrementally maintained aggregates for Manager Hub & TAG Training
+
+LiveAggregates subscribes to a DataStore's change feed and keeps running
+counts and totals, so the sidebar, Dashboard, TAG Hub overview and
+Reports read them instead of rescanning every collection on each rerun.
+
+The counts are plain additive counters, so per-team aggregates can be
+saved (see roster.py) and summed into area-wide rollups. Counters keyed
+by date also keep a sorted list of their dates, so "since" totals and
+each member's last check-in are binary searches rather than scans; the
+check-in cadence of a whole area costs O(members).
+
+Archived records are counted from totals cached per archive segment in
+archive/aggregates.json, so they never need to be loaded to be included.
+"""
+
+import bisect
+import os
+import threading
+from collections import Counter, defaultdict, namedtuple
+from datetime import date, datetime, timedelta
+
+from codec import read_json, write_json
+
+# Counter keys ending in an ISO date, indexed by date
+DATED_KEYS = ('checkins_on', 'member_checkins_on', 'sytner_open_on',
+              'resources_expiring_on', 'renewal_cost_on')
+
+# Learning resource types whose cost recurs when they expire
+RENEWABLE_TYPES = ('License/Subscription',)
+
+# Members are due a check-in this many days after their last one
+CHECKIN_CADENCE_DAYS = int(os.environ.get('MANAGER_HUB_CHECKIN_DAYS', 14))
+# Window the rolling check-in frequency is measured over
+CADENCE_WINDOW_DAYS = 90
+
+# Per-segment totals of archived records, next to the archive manifest
+ARCHIVE_AGGREGATES = 'aggregates.json'
+# Bump when record_contributions changes, so cached segment totals are rebuilt
+CONTRIBUTIONS_VERSION = 1
+
+MemberCadence = namedtuple('MemberCadence',
+                           'member_id last_checkin days_since recent_checkins per_month open_follow_ups overdue')
+
+
+def record_contributions(collection, record):
+    """Yield (key, amount) pairs one record adds to the aggregates."""
+    member = record['member_id']
+    if collection == 'checkins':
+        day = record['date'][:10]
+        yield ('checkins_on', day), 1
+        yield ('member_checkins_on', member, day), 1
+        if record['follow_up']:
+            yield ('member_follow_ups', member), 1
+    elif collection == 'actions':
+        yield ('member_actions', member), 1
+        if record['status'] != 'Completed':
+            yield ('open_actions',), 1
+        if record['status'] == 'Overdue':
+            yield ('overdue_actions',), 1
+    elif collection == 'training_plans':
+        yield ('plans',), 1
+        yield ('plans_status', record['status']), 1
+        yield ('training_cost',), record['cost']
+        yield ('member_plans', member), 1
+        yield ('member_plans_status', member, record['status']), 1
+        yield ('member_plans_progress', member), record['progress']
+    elif collection == 'training_matrix':
+        yield ('matrix',), 1
+        yield ('member_matrix', member), 1
+        if record['completed']:
+            yield ('matrix_completed',), 1
+            yield ('member_matrix_completed', member), 1
+    elif collection == 'sytner_bookings':
+        yield ('sytner',), 1
+        yield ('sytner_cost',), record['cost'] + record['expenses_estimate']
+        if record['status'] == 'Completed':
+            yield ('sytner_completed',), 1
+        else:
+            yield ('sytner_open_on', record['start_date'][:10]), 1
+    elif collection == 'learning_resources':
+        yield ('resources_cost',), record['cost']
+        day = record['expiry_date'][:10]
+        yield ('resources_expiring_on', day), 1
+        if record['type'] in RENEWABLE_TYPES:
+            yield ('renewal_cost_on', day), record['cost']
+
+
+def archived_counts(store, segments):
+    """Counter of the contributions of every record in the given archive segments.
+
+    segments is {collection: [segment]}; each segment's totals are computed
+    once and cached (unless the store is read-only).
+    """
+    path = store.archive_dir / ARCHIVE_AGGREGATES
+    cache = read_json(path) if path.exists() else {}
+    if cache.get('version') != CONTRIBUTIONS_VERSION:
+        cache = {'version': CONTRIBUTIONS_VERSION, 'segments': {}}
+    cached = cache['segments']
+    counts = Counter()
+    missing = False
+    for collection, names in segments.items():
+        for segment in names:
+            if segment not in cached:
+                segment_counts = Counter()
+                for record in store.archived_segment(collection, segment):
+                    for key, amount in record_contributions(collection, record):
+                        segment_counts[key] += amount
+                cached[segment] = [[list(key), count] for key, count in segment_counts.items() if count]
+                missing = True
+            for key, count in cached[segment]:
+                counts[tuple(key)] += count
+    if missing and not store.read_only:
+        write_json(path, cache)
+    return counts
+
+
+class Aggregates:
+    """Query methods over a Counter of record contributions."""
+
+    def __init__(self, counts=None):
+        self._lock = threading.Lock()
+        self.counts = Counter(counts or {})
+        # key without its date -> sorted dates whose count is positive
+        self._dates = defaultdict(list)
+        for key, count in self.counts.items():
+            if key[0] in DATED_KEYS and count > 0:
+                self._dates[key[:-1]].append(key[-1])
+        for dates in self._dates.values():
+            dates.sort()
+
+    def _bump(self, key, amount):
+        # caller holds the lock
+        before = self.counts[key]
+        after = self.counts[key] = before + amount
+        if key[0] in DATED_KEYS and (before > 0) != (after > 0):
+            dates = self._dates[key[:-1]]
+            if after > 0:
+                bisect.insort(dates, key[-1])
+            else:
+                del dates[bisect.bisect_left(dates, key[-1])]
+
+    def __add__(self, other):
+        return Aggregates(self.to_counter() + other.to_counter())
+
+    def to_counter(self):
+        with self._lock:
+            return Counter(self.counts)
+
+    def to_json(self):
+        return [[list(key), count] for key, count in self.to_counter().items() if count]
+
+    @classmethod
+    def from_json(cls, pairs):
+        return cls({tuple(key): count for key, count in pairs})
+
+    def _dated(self, prefix, start, end, *key_parts):
+        # [(day, count)] for start <= day < end (ISO strings, None = open)
+        key = (prefix,) + key_parts
+        with self._lock:
+            dates = self._dates.get(key, ())
+            i = 0 if start is None else bisect.bisect_left(dates, start)
+            j = len(dates) if end is None else bisect.bisect_left(dates, end)
+            return [(day, self.counts[key + (day,)]) for day in dates[i:j]]
+
+    def _sum_since(self, prefix, since, *key_parts):
+        # since: inclusive ISO date string; keys end with the ISO date
+        return sum(count for _, count in self._dated(prefix, since, None, *key_parts))
+
+    def get(self, *key):
+        return self.counts[key]
+
+    def quick_stats(self, today=None):
+        """Sidebar numbers: open/overdue actions, active training, upcoming Sytner."""
+        today = today or datetime.now().date()
+        return {
+            'active_actions': self.get('open_actions'),
+            'overdue_actions': self.get('overdue_actions'),
+            'active_training': self.get('plans_status', 'In Progress'),
+            'upcoming_sytner': self._sum_since('sytner_open_on', today.isoformat())
+        }
+
+    def checkins_since(self, since, member=None):
+        if member is None:
+            return self._sum_since('checkins_on', since.isoformat())
+        return self._sum_since('member_checkins_on', since.isoformat(), member)
+
+    def recent_checkins(self, days=7, today=None):
+        today = today or datetime.now().date()
+        return self.checkins_since(today - timedelta(days=days))
+
+    def last_checkin(self, member, today=None):
+        """Date of a member's latest check-in on or before today, or None."""
+        today = (today or datetime.now().date()).isoformat()
+        with self._lock:
+            dates = self._dates.get(('member_checkins_on', member), ())
+            i = bisect.bisect_right(dates, today)
+            return dates[i - 1] if i else None
+
+    def cadence(self, members, cadence_days=CHECKIN_CADENCE_DAYS, today=None):
+        """MemberCadence per member; overdue if never seen or last seen over cadence_days ago."""
+        today = today or datetime.now().date()
+        window_start = (today - timedelta(days=CADENCE_WINDOW_DAYS)).isoformat()
+        rows = []
+        for member in members:
+            last = self.last_checkin(member, today)
+            days_since = None if last is None else (today - date.fromisoformat(last)).days
+            recent = self._sum_since('member_checkins_on', window_start, member)
+            rows.append(MemberCadence(
+                member, last, days_since, recent, recent * 30 / CADENCE_WINDOW_DAYS,
+                self.get('member_follow_ups', member), days_since is None or days_since > cadence_days))
+        return rows
+
+    def renewal_forecast(self, days, today=None):
+        """[(month, resources expiring, renewal cost)] for the next `days` days, by month."""
+        today = today or datetime.now().date()
+        start, end = today.isoformat(), (today + timedelta(days=days + 1)).isoformat()
+        months = {}
+        for prefix, column in (('resources_expiring_on', 0), ('renewal_cost_on', 1)):
+            for day, amount in self._dated(prefix, start, end):
+                months.setdefault(day[:7], [0, 0.0])[column] += amount
+        return [(month, count, cost) for month, (count, cost) in sorted(months.items())]
+
+    def matrix_completion(self, members):
+        rows = []
+        for member in members:
+            total = self.get('member_matrix', member)
+            if total:
+                rows.append((member, self.get('member_matrix_completed', member), total))
+        return rows
+
+    def training_overview(self, members, member_name):
+        rows = []
+        for member in members:
+            total = self.get('member_plans', member)
+            if total:
+                rows.append({
+                    'Team Member': member_name(member),
+                    'Total Plans': total,
+                    'In Progress': self.get('member_plans_status', member, 'In Progress'),
+                    'Completed': self.get('member_plans_status', member, 'Completed'),
+                    'Avg Progress': f"{self.get('member_plans_progress', member) / total:.0f}%"
+                })
+        return rows
+
+    def activity(self, members, since, member_name):
+        return [{
+            'Team Member': member_name(member),
+            'Check-ins': self.checkins_since(since, member),
+            'Active Actions': self.get('member_actions', member),
+            'Training Plans': self.get('member_plans_status', member, 'In Progress'),
+            'Matrix Items': self.get('member_matrix', member) - self.get('member_matrix_completed', member)
+        } for member in members]
+
+    def completion(self):
+        """[(label, completed, total)] for plans, matrix skills and Sytner courses that have any."""
+        rows = []
+        for label, total_key, completed_key in (
+                ('Training Plans', ('plans',), ('plans_status', 'Completed')),
+                ('Matrix Skills', ('matrix',), ('matrix_completed',)),
+                ('Sytner Courses', ('sytner',), ('sytner_completed',))):
+            total = self.get(*total_key)
+            if total:
+                rows.append((label, self.get(*completed_key), total))
+        return rows
+
+    def investment(self):
+        training_cost = self.get('training_cost')
+        sytner_cost = self.get('sytner_cost')
+        resources_cost = self.get('resources_cost')
+        return {
+            'training': training_cost,
+            'sytner': sytner_cost,
+            'resources': resources_cost,
+            'total': training_cost + sytner_cost + resources_cost
+        }
+
+
+class LiveAggregates(Aggregates):
+    """Running totals kept up to date from a store's change events.
+
+    With include_archive the totals also cover archived records (from
+    their cached segment totals); archiving then moves records without
+    changing them. Without it they cover active records only.
+    """
+
+    def __init__(self, store, include_archive=False):
+        super().__init__()
+        self.include_archive = include_archive
+        if include_archive:
+            snapshot, segments = store.subscribe_segments(self.apply)
+            archived = archived_counts(store, segments)
+        else:
+            snapshot, archived = store.subscribe(self.apply), {}
+        # Events landing while we build are deltas on top of this snapshot,
+        # and additions commute, so they can be applied in either order
+        with self._lock:
+            for key, count in archived.items():
+                self._bump(key, count)
+            for collection in snapshot._collections:
+                for record in snapshot[collection]:
+                    self._add(collection, record, 1)
+
+    def _add(self, collection, record, sign):
+        for key, amount in record_contributions(collection, record):
+            self._bump(key, sign * amount)
+
+    def apply(self, event):
+        if event.op == 'archive' and self.include_archive:
+            return
+        with self._lock:
+            if event.before is not None:
+                self._add(event.collection, event.before, -1)
+            if event.after is not None:
+                self._add(event.collection, event.after, 1)